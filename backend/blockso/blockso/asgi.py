@@ -2,6 +2,8 @@
 ASGI config for blockso project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The Alchemy Notify webhook is answered by an async app in front of Django,
+see blockso_app.webhooks.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
@@ -13,4 +15,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blockso.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from blockso_app.webhooks import AlchemyWebhookApp  # noqa: E402
+
+application = AlchemyWebhookApp(django_application)
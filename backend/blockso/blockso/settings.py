@@ -180,10 +180,47 @@ AUTH_NONCE_AGE = config("AUTH_NONCE_AGE", cast=int)
 
 # covalent api config
 COVALENT_API_KEY = config("COVALENT_API_KEY", cast=str)
+# pages of tx history processed by a backfill job before re-enqueueing itself
+TX_HISTORY_CHUNK_PAGES = config("TX_HISTORY_CHUNK_PAGES", default=10, cast=int)
+# seconds before the tx history of an address is checked for new txs again
+TX_HISTORY_SYNC_INTERVAL = config(
+    "TX_HISTORY_SYNC_INTERVAL",
+    default=300,
+    cast=int
+)
+# seconds before fetching the tx history of an address is retried after failing
+TX_HISTORY_RETRY_INTERVAL = config(
+    "TX_HISTORY_RETRY_INTERVAL",
+    default=60,
+    cast=int
+)
 
 
 # redis and rq config
 REDIS_URL = config("REDIS_URL", cast=str)
+# connections in the redis pool of each process, and seconds to wait for one
+REDIS_MAX_CONNECTIONS = config("REDIS_MAX_CONNECTIONS", default=20, cast=int)
+REDIS_POOL_TIMEOUT = config("REDIS_POOL_TIMEOUT", default=5, cast=int)
+# seconds a pooled connection may be idle before it is checked on use
+REDIS_HEALTH_CHECK_INTERVAL = config(
+    "REDIS_HEALTH_CHECK_INTERVAL",
+    default=30,
+    cast=int
+)
+# certificate verification of rediss:// urls: required, optional or none
+REDIS_SSL_CERT_REQS = config("REDIS_SSL_CERT_REQS", default="required")
+
+
+# materialized timelines config
+TIMELINE_MAX_LENGTH = config("TIMELINE_MAX_LENGTH", default=1000, cast=int)
+TIMELINE_TTL = config("TIMELINE_TTL", default=86400, cast=int)
+
+
+# explore page config
+# seconds before the stored explore page is refreshed in the background
+EXPLORE_MAX_AGE = config("EXPLORE_MAX_AGE", default=60, cast=int)
+# seconds that a stale explore page may still be served
+EXPLORE_TTL = config("EXPLORE_TTL", default=86400, cast=int)
 
 
 # alchemy configuration
@@ -191,6 +228,14 @@ ALCHEMY_HTTPS_URL = config("ALCHEMY_HTTPS_URL", cast=str)
 ALCHEMY_WH_SIGNING_KEY = config("ALCHEMY_WH_SIGNING_KEY", cast=str)
 ALCHEMY_WH_ID = config("ALCHEMY_WH_ID", cast=str)
 ALCHEMY_NOTIFY_TOKEN = config("ALCHEMY_NOTIFY_TOKEN", cast=str)
+# seconds to wait for a response to a JSON-RPC batch
+ALCHEMY_RPC_TIMEOUT = config("ALCHEMY_RPC_TIMEOUT", default=10, cast=int)
+# seconds that webhook events and activities are remembered for dedupe
+ALCHEMY_WH_DEDUPE_TTL = config(
+    "ALCHEMY_WH_DEDUPE_TTL",
+    default=86400,
+    cast=int
+)
 
 
 # nft.storage configuration
@@ -2,26 +2,51 @@
 Module that interfaces with the Alchemy API.
 """
 # std lib imports
+import hashlib
+import hmac
+import json
+import logging
 
 # third party imports
 from django.conf import settings
 import requests
 
 # our imports
+from blockso_app.jobs import alchemy_jobs, watchlist_jobs
 from blockso_app.models import Feed, Profile
-from blockso_app import utils
+from blockso_app import redis_client, utils
 
 
+logger = logging.getLogger(__name__)
+
 url = "https://dashboard.alchemy.com/api/update-webhook-addresses"
 api_token = settings.ALCHEMY_NOTIFY_TOKEN
 webhook_id = settings.ALCHEMY_WH_ID
 session = requests.Session()
+dedupe_ttl = settings.ALCHEMY_WH_DEDUPE_TTL
+
+# redis keys of the addresses the Notify webhook watches, and of the
+# addresses whose watch status may have changed since the last sync
+watched_key = "alchemy-watch:watched"
+dirty_key = "alchemy-watch:dirty"
+sync_queued_key = "alchemy-watch:sync-queued"
+sync_job_id = "alchemy-watch-sync"
+
+# seconds a sync job may run for, after which another one can be queued
+# even if the queued flag of a lost job was not cleared
+sync_timeout = 180
+
+# redis lists of the webhook deliveries received by the ASGI webhook app,
+# and of the ones being moved from there onto the rq queues
+intake_key = "alchemy-webhook:intake"
+intake_processing_key = "alchemy-webhook:intake-processing"
 
 
 def update_notify_webhook():
     """
-    Updates the Notify webhook with the current list
+    Replaces the addresses of the Notify webhook with the current list
     of addresses that should be watched.
+    Used to repair the webhook, as it uploads every watched address.
     """
     profiles = utils.get_profiles_to_watch()
 
@@ -34,3 +59,245 @@ def update_notify_webhook():
         "webhook_id": webhook_id, "addresses": addresses
     })
     resp.raise_for_status()
+
+    # remember what the webhook watches
+    redis = redis_client.RedisConnection().redis_client
+    pipe = redis.pipeline()
+    pipe.delete(watched_key)
+    if addresses:
+        pipe.sadd(watched_key, *addresses)
+    pipe.execute()
+
+
+def queue_watch_sync(addresses):
+    """
+    Marks the watch status of the given addresses as possibly changed,
+    and enqueues a job to sync them with the Notify webhook unless one
+    is queued already, so that bursts of changes are synced together.
+    """
+    addresses = list(addresses)
+    if not addresses:
+        return
+
+    redis = redis_client.RedisConnection().redis_client
+    redis.sadd(dirty_key, *addresses)
+    if redis.set(sync_queued_key, 1, nx=True, ex=sync_timeout):
+        queue = redis_client.RedisConnection().get_high_queue()
+        queue.enqueue(
+            watchlist_jobs.sync_watched_addresses,
+            job_id=sync_job_id,
+            job_timeout=sync_timeout
+        )
+
+
+def sync_watched_addresses():
+    """
+    Adds the addresses marked by `queue_watch_sync` that should be
+    watched to the Notify webhook, and removes the ones that should
+    not be watched anymore, using Alchemy's incremental update API.
+    Returns the lists of added and removed addresses.
+    """
+    redis = redis_client.RedisConnection().redis_client
+
+    # let the changes from now on queue another sync
+    redis.delete(sync_queued_key)
+
+    # take the marked addresses
+    pipe = redis.pipeline()
+    pipe.smembers(dirty_key)
+    pipe.delete(dirty_key)
+    dirty, _ = pipe.execute()
+    dirty = set(address.decode() for address in dirty)
+    if not dirty:
+        return [], []
+
+    try:
+        # find out which of them should be watched, and which are
+        should_watch = set(
+            utils.get_profiles_to_watch().filter(user_id__in=dirty)
+            .values_list("user_id", flat=True)
+        )
+        pipe = redis.pipeline()
+        for address in dirty:
+            pipe.sismember(watched_key, address)
+        watched = set(
+            address for address, is_member in zip(dirty, pipe.execute())
+            if is_member
+        )
+        to_add = sorted(should_watch - watched)
+        to_remove = sorted(watched - should_watch)
+
+        # send the changes
+        if to_add or to_remove:
+            session.headers.update({"X-Alchemy-Token": api_token})
+            resp = session.patch(url, json={
+                "webhook_id": webhook_id,
+                "addresses_to_add": to_add,
+                "addresses_to_remove": to_remove
+            })
+            resp.raise_for_status()
+    except Exception:
+        # mark the addresses again so that the next sync retries them,
+        # and let the next change queue that sync
+        pipe = redis.pipeline()
+        pipe.sadd(dirty_key, *dirty)
+        pipe.delete(sync_queued_key)
+        pipe.execute()
+        raise
+
+    # remember what the webhook watches
+    pipe = redis.pipeline()
+    if to_add:
+        pipe.sadd(watched_key, *to_add)
+    if to_remove:
+        pipe.srem(watched_key, *to_remove)
+    pipe.execute()
+
+    return to_add, to_remove
+
+
+def is_removed(data):
+    """ Returns True if the given webhook activity was removed by a re-org. """
+
+    log = data.get("log") or {}
+    return bool(log.get("removed", data.get("removed", False)))
+
+
+def get_activity_key(data):
+    """
+    Returns the redis key that identifies the given webhook activity
+    across deliveries.
+    The block and whether the activity was removed are part of the key,
+    so that re-orgs and re-inclusions are not mistaken for duplicates.
+    """
+    log = data.get("log") or {}
+    return ":".join([
+        "alchemy-activity",
+        data["hash"],
+        str(log.get("logIndex")),
+        data["category"],
+        data["blockNum"],
+        str(log.get("removed", False)),
+    ])
+
+
+def enqueue_webhook_data(data, queue=None):
+    """
+    Enqueues jobs that process the activity of the given webhook data,
+    one per block, so that several workers can process them in parallel,
+    or a single one if any of the activity was removed by a re-org.
+    Uses the given rq queue, or the tx_processing queue by default.
+    Webhook events and activities are remembered for `dedupe_ttl`
+    seconds, and the ones seen already are dropped, e.g. when Alchemy
+    retries a delivery or webhooks overlap.
+    Returns the number of jobs enqueued.
+    """
+    redis = redis_client.RedisConnection().redis_client
+
+    # drop a webhook event that was delivered already
+    event_key = f"alchemy-webhook:{data['id']}"
+    if not redis.set(event_key, 1, nx=True, ex=dedupe_ttl):
+        return 0
+
+    # forget the event and the activities taken below if anything fails,
+    # so that a retry processes them
+    keys = []
+    try:
+        # drop the activities that were seen already
+        activity = data["event"]["activity"]
+        pipe = redis.pipeline()
+        for item in activity:
+            pipe.set(get_activity_key(item), 1, nx=True, ex=dedupe_ttl)
+        is_new = pipe.execute()
+
+        blocks = {}
+        for item, new in zip(activity, is_new):
+            if new:
+                blocks.setdefault(item["blockNum"], []).append(item)
+                keys.append(get_activity_key(item))
+
+        # a re-org removes activity from one block and may re-include it
+        # in another, which must be processed in order, so the activity
+        # of a delivery with a re-org is kept in one job
+        groups = list(blocks.values())
+        if any(is_removed(item) for items in groups for item in items):
+            groups = [[item for items in groups for item in items]]
+
+        # enqueue a job per block
+        if queue is None:
+            queue = redis_client.RedisConnection().get_tx_processing_queue()
+        jobs = [
+            queue.prepare_data(alchemy_jobs.process_activities, (items,))
+            for items in groups
+        ]
+        queue.enqueue_many(jobs)
+    except Exception:
+        redis.delete(event_key, *keys)
+        raise
+
+    return len(jobs)
+
+
+def get_signature(body):
+    """
+    Returns the signature of the given raw body of a webhook request,
+    signed with settings.ALCHEMY_WH_SIGNING_KEY.
+    """
+    return hmac.new(
+        bytes(settings.ALCHEMY_WH_SIGNING_KEY, "utf-8"),
+        msg=body,
+        digestmod=hashlib.sha256,
+    ).hexdigest()
+
+
+def is_valid_signature(body, signature):
+    """
+    Returns True if the given signature of a webhook request
+    matches its given raw body, comparing them in constant time.
+    """
+    if isinstance(signature, str):
+        signature = signature.encode()
+
+    return hmac.compare_digest(get_signature(body).encode(), signature)
+
+
+def process_intake(timeout=5):
+    """
+    Takes the oldest webhook delivery that was pushed to the intake
+    by the ASGI webhook app, waiting up to timeout seconds for one,
+    and enqueues jobs to process it.
+    The delivery is kept in the processing list until it is queued.
+    Returns False if no delivery arrived in time, True otherwise.
+    """
+    redis = redis_client.RedisConnection().redis_client
+
+    body = redis.brpoplpush(intake_key, intake_processing_key, timeout)
+    if body is None:
+        return False
+
+    try:
+        data = json.loads(body)
+    except ValueError:
+        logger.warning("Dropping malformed webhook delivery: %r", body[:100])
+    else:
+        enqueue_webhook_data(data)
+
+    redis.lrem(intake_processing_key, 1, body)
+    return True
+
+
+def requeue_intake():
+    """
+    Moves the webhook deliveries that were taken from the intake
+    but not queued, e.g. because the intake process was stopped,
+    back to the intake. Deliveries that were queued already are
+    dropped by `enqueue_webhook_data` when they are taken again.
+    Returns the number of deliveries moved.
+    """
+    redis = redis_client.RedisConnection().redis_client
+
+    count = 0
+    while redis.rpoplpush(intake_processing_key, intake_key) is not None:
+        count += 1
+
+    return count
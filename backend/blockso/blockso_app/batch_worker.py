@@ -0,0 +1,326 @@
+"""
+Module containing the worker that processes webhook jobs in batches.
+
+Every webhook delivery becomes jobs on the tx_processing queue. Instead
+of performing them one at a time, the batch worker drains up to
+`batch_size` pending jobs, or as many as arrive within `window` seconds,
+merges their activity, and processes it with one set of bulk queries.
+Jobs are kept in the queue's started job registry while they are
+processed, and heartbeated, so that the jobs of a worker that dies are
+moved to the failed job registry by the cleanup, to be requeued.
+Like rq's own worker, a batch or job that runs longer than the timeout
+of its jobs is interrupted, and its jobs stop being heartbeated.
+"""
+# std lib imports
+from collections import Counter
+from contextlib import contextmanager
+import logging
+import signal
+import threading
+import time
+import traceback
+
+# third party imports
+from django.db import close_old_connections
+from rq import Queue
+from rq.defaults import DEFAULT_FAILURE_TTL, DEFAULT_RESULT_TTL
+from rq.exceptions import DequeueTimeout
+from rq.job import JobStatus
+from rq.logutils import setup_loghandlers
+from rq.registry import clean_registries
+from rq.timeouts import JobTimeoutException, UnixSignalDeathPenalty
+from rq.utils import utcnow
+
+# our imports
+from .jobs import alchemy_jobs
+
+
+logger = logging.getLogger(__name__)
+
+# seconds to wait for a first job before checking whether to stop
+idle_timeout = 5
+
+# seconds to wait between polls of an empty queue while filling a batch
+poll_interval = 0.05
+
+# seconds a job stays in the started job registry without a heartbeat,
+# after which the cleanup moves it to the failed job registry
+job_ttl = 60
+heartbeat_interval = 15
+
+# seconds between cleanups of the queue's registries
+cleanup_interval = 60
+
+
+def get_func_name(func):
+    """ Returns the name rq stores for the given job function. """
+
+    return f"{func.__module__}.{func.__name__}"
+
+
+def get_timeout(jobs):
+    """
+    Returns the number of seconds the given jobs may run for when
+    processed together, which is the longest of their timeouts.
+    """
+    return max(job.timeout or Queue.DEFAULT_TIMEOUT for job in jobs)
+
+
+def get_activity(job):
+    """
+    Returns the webhook activity items of the given job,
+    or None if the job does not process webhook activity.
+    """
+    if job.func_name == get_func_name(alchemy_jobs.process_activities):
+        return job.args[0]
+
+    if job.func_name == get_func_name(alchemy_jobs.process_webhook_data):
+        return job.args[0]["event"]["activity"]
+
+    return None
+
+
+class BatchWorker():
+    """ Worker that processes the webhook jobs of a queue in batches. """
+
+    death_penalty_class = UnixSignalDeathPenalty
+
+    def __init__(self, queue, batch_size=100, window=1.0):
+        self.queue = queue
+        self.batch_size = batch_size
+        self.window = window
+        self.stopped = False
+        self.stats = Counter()
+        self.next_cleanup = 0
+
+    def _dequeue(self, timeout=None):
+        """
+        Removes and returns the job at the front of the queue, waiting
+        up to timeout seconds for one if given. Returns None if empty.
+        """
+        try:
+            result = Queue.dequeue_any(
+                [self.queue],
+                timeout,
+                connection=self.queue.connection
+            )
+        except DequeueTimeout:
+            return None
+
+        if result is None:
+            return None
+
+        job = result[0]
+        self._start(job)
+        return job
+
+    def _start(self, job):
+        """ Marks the given job as started, until its ttl runs out. """
+
+        with self.queue.connection.pipeline() as pipe:
+            job.set_status(JobStatus.STARTED, pipeline=pipe)
+            job.heartbeat(utcnow(), job_ttl, pipeline=pipe)
+            pipe.execute()
+
+    @contextmanager
+    def _heartbeat(self, jobs, timeout):
+        """
+        Extends the ttl of the given started jobs every
+        `heartbeat_interval` seconds, until the context exits
+        or timeout seconds have passed.
+        """
+        done = threading.Event()
+        deadline = time.monotonic() + timeout
+
+        def beat():
+            while not done.wait(heartbeat_interval) and \
+                    time.monotonic() < deadline:
+                with self.queue.connection.pipeline() as pipe:
+                    for job in jobs:
+                        job.heartbeat(utcnow(), job_ttl, pipeline=pipe,
+                                      xx=True)
+                    pipe.execute()
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    @contextmanager
+    def _timeout(self, jobs):
+        """
+        Raises JobTimeoutException in the context once it runs longer
+        than the timeout of the given jobs, as rq's worker does.
+        """
+        with self.death_penalty_class(get_timeout(jobs), JobTimeoutException,
+                                      job_id=jobs[0].id):
+            yield
+
+    def drain(self, block=True):
+        """
+        Removes and returns up to `batch_size` jobs from the queue.
+        Waits up to `idle_timeout` seconds for a first job if block is
+        True, then up to `window` seconds for the rest of the batch.
+        """
+        job = self._dequeue(idle_timeout if block else None)
+        if job is None:
+            return []
+
+        jobs = [job]
+        deadline = time.monotonic() + self.window
+        while len(jobs) < self.batch_size:
+            job = self._dequeue()
+            if job is not None:
+                jobs.append(job)
+            elif time.monotonic() < deadline:
+                time.sleep(poll_interval)
+            else:
+                break
+
+        return jobs
+
+    def _finish(self, jobs):
+        """ Marks the given jobs as finished. """
+
+        with self.queue.connection.pipeline() as pipe:
+            for job in jobs:
+                result_ttl = job.get_result_ttl(DEFAULT_RESULT_TTL)
+                job.set_status(JobStatus.FINISHED, pipeline=pipe)
+                self.queue.started_job_registry.remove(job, pipeline=pipe)
+                self.queue.finished_job_registry.add(job, result_ttl, pipe)
+                job.cleanup(result_ttl, pipeline=pipe, remove_from_queue=False)
+            pipe.execute()
+
+    def _fail(self, job, exc_string):
+        """ Marks the given job as failed, so that it can be requeued. """
+
+        with self.queue.connection.pipeline() as pipe:
+            job.set_status(JobStatus.FAILED, pipeline=pipe)
+            self.queue.started_job_registry.remove(job, pipeline=pipe)
+            self.queue.failed_job_registry.add(
+                job,
+                ttl=job.failure_ttl or DEFAULT_FAILURE_TTL,
+                exc_string=exc_string,
+                pipeline=pipe
+            )
+            pipe.execute()
+
+    def _perform(self, job):
+        """ Performs the given job on its own. """
+
+        try:
+            with self._timeout([job]):
+                job.perform()
+        except Exception:
+            self._fail(job, traceback.format_exc())
+            self.stats["failed_jobs"] += 1
+        else:
+            self._finish([job])
+
+    def process(self, jobs):
+        """
+        Processes the activity of the given jobs in one go, and performs
+        the jobs that do not process webhook activity on their own.
+        If processing the merged activity fails, the jobs are performed
+        one by one, so that one bad job does not fail the others.
+        Returns the number of activity items processed.
+        """
+        batched = []
+        activity = []
+        for job in jobs:
+            items = get_activity(job)
+            if items is None:
+                self._perform(job)
+            else:
+                batched.append(job)
+                activity.extend(items)
+
+        if not batched:
+            return 0
+
+        try:
+            with self._timeout(batched):
+                alchemy_jobs.process_activities(activity)
+        except Exception:
+            for job in batched:
+                self._perform(job)
+        else:
+            self._finish(batched)
+
+        return len(activity)
+
+    def work_once(self, block=True):
+        """
+        Drains and processes one batch of jobs, reporting the throughput.
+        The jobs are heartbeated for as long as processing them may take,
+        which is the batch's timeout plus each job's timeout in case the
+        batch fails and its jobs are performed one by one.
+        Returns the number of jobs processed.
+        """
+        jobs = self.drain(block)
+        if not jobs:
+            return 0
+
+        timeout = get_timeout(jobs) + sum(get_timeout([job]) for job in jobs)
+        start = time.monotonic()
+        close_old_connections()
+        try:
+            with self._heartbeat(jobs, timeout):
+                num_activity = self.process(jobs)
+        finally:
+            close_old_connections()
+        elapsed = max(time.monotonic() - start, 1e-6)
+
+        self.stats["jobs"] += len(jobs)
+        self.stats["activities"] += num_activity
+        self.stats["seconds"] += elapsed
+        logger.info(
+            "Processed %d activities of %d jobs in %.2fs: "
+            "%.1f activities/sec",
+            num_activity, len(jobs), elapsed, num_activity / elapsed
+        )
+
+        return len(jobs)
+
+    def clean_registries(self):
+        """
+        Cleans the queue's registries every `cleanup_interval` seconds,
+        which moves the started jobs whose ttl ran out, e.g. because
+        their worker was killed, to the failed job registry.
+        """
+        if time.monotonic() < self.next_cleanup:
+            return
+
+        clean_registries(self.queue)
+        self.next_cleanup = time.monotonic() + cleanup_interval
+
+    def stop(self, *args):
+        """ Stops the worker once the batch in progress is processed. """
+
+        self.stopped = True
+
+    def work(self, burst=False, logging_level="INFO"):
+        """
+        Processes batches of jobs until stopped by SIGINT or SIGTERM,
+        or until the queue is empty when `burst` is True.
+        """
+        setup_loghandlers(logging_level, name=__name__)
+        if not burst:
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+
+        while not self.stopped:
+            self.clean_registries()
+            if self.work_once(block=not burst) == 0 and burst:
+                break
+
+        if self.stats["seconds"]:
+            logger.info(
+                "Processed %d activities of %d jobs: %.1f activities/sec",
+                self.stats["activities"],
+                self.stats["jobs"],
+                self.stats["activities"] / self.stats["seconds"]
+            )
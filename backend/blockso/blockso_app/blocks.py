@@ -0,0 +1,134 @@
+"""
+Module containing the cache of block timestamps.
+
+Activities of a webhook, and txs of a page of tx history, often share
+blocks, and the timestamp of a block never changes once it is final.
+Timestamps are cached in redis so that every worker can use them, with
+a small in-process LRU in front of it.
+Blocks within `reorg_depth` of the newest block seen can still be re-orged,
+so they are only cached in redis for a short time, and never in the LRU.
+"""
+# std lib imports
+from collections import Counter, OrderedDict
+
+# third party imports
+
+# our imports
+from . import redis_client
+
+
+lru_size = 1024
+reorg_depth = 64
+final_ttl = 7 * 24 * 60 * 60
+recent_ttl = 60
+
+
+class BlockTimestampCache():
+    """ Cache of block number to block timestamp, per chain. """
+
+    def __init__(self):
+        self.lru = OrderedDict()
+        self.stats = Counter()
+
+    @staticmethod
+    def _get_key(chain_id, block_num):
+        """ Returns the redis key of the timestamp of the given block. """
+
+        return f"block-timestamp:{chain_id}:{block_num}"
+
+    @staticmethod
+    def _get_head_key(chain_id):
+        """ Returns the redis key of the newest block seen. """
+
+        return f"block-timestamp:{chain_id}:head"
+
+    def _remember(self, chain_id, block_num, timestamp):
+        """ Stores a final block in the LRU, evicting the oldest entry. """
+
+        self.lru[(chain_id, block_num)] = timestamp
+        self.lru.move_to_end((chain_id, block_num))
+        if len(self.lru) > lru_size:
+            self.lru.popitem(last=False)
+
+    def get_many(self, block_nums, chain_id=1):
+        """
+        Returns a dict of block number to timestamp
+        of the given blocks that are cached.
+        """
+        found = {}
+        missing = []
+        for block_num in set(block_nums):
+            timestamp = self.lru.get((chain_id, block_num))
+            if timestamp is None:
+                missing.append(block_num)
+                continue
+
+            self.lru.move_to_end((chain_id, block_num))
+            found[block_num] = timestamp
+            self.stats["memory_hits"] += 1
+
+        if not missing:
+            return found
+
+        # look up the rest in redis
+        redis = redis_client.RedisConnection().redis_client
+        pipe = redis.pipeline()
+        pipe.get(self._get_head_key(chain_id))
+        pipe.mget([self._get_key(chain_id, num) for num in missing])
+        head, timestamps = pipe.execute()
+        head = int(head or 0)
+
+        for block_num, timestamp in zip(missing, timestamps):
+            if timestamp is None:
+                self.stats["misses"] += 1
+                continue
+
+            found[block_num] = int(timestamp)
+            self.stats["redis_hits"] += 1
+            if head - block_num >= reorg_depth:
+                self._remember(chain_id, block_num, int(timestamp))
+
+        return found
+
+    def get(self, block_num, chain_id=1):
+        """ Returns the timestamp of the given block, None if not cached. """
+
+        return self.get_many([block_num], chain_id).get(block_num)
+
+    def set_many(self, timestamps, chain_id=1):
+        """ Caches the given dict of block number to timestamp. """
+
+        if not timestamps:
+            return
+
+        redis = redis_client.RedisConnection().redis_client
+        head_key = self._get_head_key(chain_id)
+        head = max(int(redis.get(head_key) or 0), max(timestamps))
+
+        pipe = redis.pipeline()
+        pipe.set(head_key, head)
+        for block_num, timestamp in timestamps.items():
+            if head - block_num >= reorg_depth:
+                ttl = final_ttl
+                self._remember(chain_id, block_num, timestamp)
+            else:
+                ttl = recent_ttl
+            pipe.set(self._get_key(chain_id, block_num), timestamp, ex=ttl)
+        pipe.execute()
+
+    def invalidate(self, block_num, chain_id=1):
+        """ Drops the given block from the cache, used when it is re-orged. """
+
+        self.lru.pop((chain_id, block_num), None)
+        redis = redis_client.RedisConnection().redis_client
+        redis.delete(self._get_key(chain_id, block_num))
+
+    def clear(self):
+        """ Empties the in-process cache and resets the counters. """
+
+        self.lru.clear()
+        self.stats.clear()
+
+
+# instance of the cache to be used throughout codebase
+block_timestamps = BlockTimestampCache()
@@ -6,36 +6,45 @@ because the logic is not specific to a job.
 # std lib imports
 
 # third party imports
-import rq
+import redis
 
 # local imports
 from blockso_app.jobs import covalent_jobs
-from blockso_app import redis_client, utils
+from blockso_app import redis_client
 
 
 def should_fetch_tx_history(profile):
     """
-    Returns True if the given profile is not being watched
+    Returns True if the given profile is not being watched,
+    their tx history has not been synced or failed to sync recently,
     and there are no jobs fetching their tx history already.
+    Marks the tx history as being fetched when returning True.
     Returns False otherwise.
     """
+    address = profile.user.ethereum_address
+
     # return False if profile is being watched
-    watched = utils.get_profiles_to_watch().filter(pk=profile.pk).exists()
-    if watched:
+    if profile.is_watched:
         return False
 
-    # return False if job is queued or finished
-    client = redis_client.RedisConnection()
-    queue = client.get_high_queue()
-
-    # is job queued already
-    if profile.user.ethereum_address in queue.get_job_ids():
+    # return False if the history is being fetched, was fetched recently,
+    # or failed to be fetched recently, in which case its state is known
+    redis_conn = redis_client.RedisConnection().redis_client
+    key = covalent_jobs.get_state_key(address)
+    if redis_conn.exists(key):
         return False
 
-    # is job finished already
-    if profile.user.ethereum_address in \
-        rq.registry.FinishedJobRegistry(queue=queue):
-        return False
+    # mark the history as being fetched, unless another request does first
+    with redis_conn.pipeline() as pipe:
+        try:
+            pipe.watch(key)
+            if pipe.exists(key):
+                return False
+            pipe.multi()
+            covalent_jobs.set_state(address, covalent_jobs.QUEUED, pipe)
+            pipe.execute()
+        except redis.WatchError:
+            return False
 
     return True
 
@@ -43,7 +52,8 @@ def should_fetch_tx_history(profile):
 def enqueue_fetch_tx_history(profile):
     """
     Enqueues a job that uses Covalent to fetch the
-    tx history of the given profile.
+    tx history of the given profile, resuming from
+    where the previous job left off.
     """
     if should_fetch_tx_history(profile):
         client = redis_client.RedisConnection()
@@ -51,6 +61,5 @@ def enqueue_fetch_tx_history(profile):
         job = queue.enqueue(
             covalent_jobs.process_address_txs,
             profile.user.ethereum_address,
-            1000,
             job_id=profile.user.ethereum_address
         )
@@ -0,0 +1,185 @@
+"""
+Module containing the precomputed Explore page.
+
+The featured feeds and profiles are ranked and serialized ahead of time,
+and the rendered page is stored in redis with the time it goes stale.
+Requests are served the stored page, stale or not, and a stale page
+is refreshed by a single background job (stale-while-revalidate), so
+the cost of a request does not grow with the number of users and feeds.
+Only when there is no stored page at all is it rendered in the request,
+by one process at a time while the others wait briefly for its result,
+and rendered in the request as well if redis is unavailable.
+What the authed user follows is filled into the page per request.
+"""
+# std lib imports
+import json
+import time
+
+# third party imports
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+import redis
+
+# our imports
+from .jobs import explore_jobs
+from .models import Feed, Profile
+from . import redis_client, serializers
+
+
+key = "explore"
+refresh_key = "explore:refresh"
+refresh_job_id = "explore-refresh"
+max_age = settings.EXPLORE_MAX_AGE
+ttl = settings.EXPLORE_TTL
+
+# seconds that a refresh may take before another one can start
+refresh_timeout = 60
+
+# seconds to wait for a page rendered by another process,
+# and between checks for it
+wait_timeout = 1
+poll_interval = 0.05
+
+num_feeds = 4
+num_profiles = 8
+
+
+def render():
+    """
+    Returns the Explore page as it is for anonymous users, that is the
+    most followed feeds and profiles, along with the ids of the profiles
+    in it so that it can be personalized.
+    """
+    feeds = Feed.objects.select_related(
+        "owner__user", "owner__socials"
+    ).order_by("-num_followers")[:num_feeds]
+    profiles = serializers.ProfileSerializer.setup_eager_loading(
+        Profile.objects.all()
+    ).order_by("-num_followers")[:num_profiles]
+
+    return {
+        "stale_at": time.time() + max_age,
+        "feeds": serializers.FeedSerializer(feeds, many=True).data,
+        "feed_owner_ids": [feed.owner_id for feed in feeds],
+        "profiles": serializers.ProfileSerializer(profiles, many=True).data,
+        "profile_ids": [profile.id for profile in profiles],
+    }
+
+
+def store(page):
+    """ Stores the given rendered page. """
+
+    redis = redis_client.RedisConnection().redis_client
+    redis.set(key, json.dumps(page, cls=JSONEncoder), ex=ttl)
+
+
+def load():
+    """ Returns the stored page, None if there is none. """
+
+    redis = redis_client.RedisConnection().redis_client
+    page = redis.get(key)
+    if page is None:
+        return None
+
+    return json.loads(page)
+
+
+def refresh():
+    """
+    Renders and stores the page, and lets the next refresh start.
+    Returns the rendered page.
+    """
+    page = render()
+    store(page)
+    redis_client.RedisConnection().redis_client.delete(refresh_key)
+
+    return page
+
+
+def queue_refresh():
+    """ Enqueues a job to refresh the page unless a refresh is underway. """
+
+    redis = redis_client.RedisConnection().redis_client
+    if redis.set(refresh_key, 1, nx=True, ex=refresh_timeout):
+        queue = redis_client.RedisConnection().get_high_queue()
+        queue.enqueue(explore_jobs.refresh_explore, job_id=refresh_job_id)
+
+
+def _get_stored_page():
+    """
+    Returns the stored page, queueing a refresh if it is stale.
+    If there is no stored page, renders it unless another process is
+    rendering it already, in which case its result is waited for
+    up to `wait_timeout` seconds. Returns None if it did not arrive.
+    """
+    page = load()
+    if page is not None:
+        if page["stale_at"] <= time.time():
+            queue_refresh()
+        return page
+
+    redis_conn = redis_client.RedisConnection().redis_client
+    if redis_conn.set(refresh_key, 1, nx=True, ex=refresh_timeout):
+        return refresh()
+
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        page = load()
+        if page is not None:
+            return page
+
+    return None
+
+
+def get_page():
+    """
+    Returns the stored page, or renders it in the request if it
+    could not be read from redis or is taking long to be rendered.
+    """
+    try:
+        page = _get_stored_page()
+    except redis.exceptions.RedisError:
+        page = None
+
+    if page is None:
+        page = render()
+
+    return page
+
+
+def personalize(page, request):
+    """
+    Returns the body of the Explore page response to the given request
+    from the given rendered page, with whether the authed user follows
+    the feeds and profiles in it, and absolute urls of the feed images.
+    """
+    relations = serializers.get_authed_relations(request)
+    followed_feeds = set()
+    followed_profiles = set()
+    if relations is not None:
+        followed_feeds = relations.followed_feed_ids
+        followed_profiles = relations.followed_profile_ids
+
+    feeds = []
+    for feed, owner_id in zip(page["feeds"], page["feed_owner_ids"]):
+        owner = dict(
+            feed["owner"],
+            followedByMe=owner_id in followed_profiles
+        )
+        image = feed["image"]
+        if image:
+            image = request.build_absolute_uri(image)
+        feeds.append(dict(
+            feed,
+            owner=owner,
+            image=image,
+            followedByMe=feed["id"] in followed_feeds
+        ))
+
+    profiles = [
+        dict(profile, followedByMe=profile_id in followed_profiles)
+        for profile, profile_id in zip(page["profiles"], page["profile_ids"])
+    ]
+
+    return {"feeds": feeds, "profiles": profiles}
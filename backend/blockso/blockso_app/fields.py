@@ -0,0 +1,143 @@
+"""
+Module containing model fields that store on-chain values compactly.
+
+Addresses and hashes are stored as their raw 20 and 32 bytes rather
+than as hex strings, and amounts as numbers rather than decimal strings,
+which makes the tables and their indexes smaller and comparisons
+cheaper. The fields take and give back the same strings as before:
+checksum encoded addresses, 0x prefixed hashes and decimal amounts.
+"""
+# std lib imports
+
+# third party imports
+from django.core.exceptions import ValidationError
+from django.db import models
+from web3 import Web3
+
+# our imports
+
+
+class HexBytesField(models.BinaryField):
+    """
+    Stores a 0x prefixed hex string of `num_bytes` bytes as raw bytes,
+    and reads it back as a lowercase 0x prefixed hex string.
+    """
+    num_bytes = None
+
+    def __init__(self, *args, **kwargs):
+        kwargs["max_length"] = self.num_bytes
+        kwargs.setdefault("editable", True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs["max_length"]
+        if kwargs.get("editable"):
+            del kwargs["editable"]
+
+        return name, path, args, kwargs
+
+    def to_bytes(self, value):
+        """ Returns the bytes of the given hex string or bytes. """
+
+        if isinstance(value, str):
+            try:
+                value = bytes.fromhex(value[2:] if value[:2] in ("0x", "0X")
+                                      else value)
+            except ValueError:
+                raise ValidationError(f"{value} is not a hex string.")
+
+        value = bytes(value)
+        if len(value) != self.num_bytes:
+            raise ValidationError(f"{value} is not {self.num_bytes} bytes.")
+
+        return value
+
+    def to_hex(self, value):
+        """ Returns the string that the given bytes are read back as. """
+
+        return "0x" + bytes(value).hex()
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return None
+
+        return self.to_bytes(value)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+
+        return self.to_hex(value)
+
+    def to_python(self, value):
+        if value is None:
+            return None
+
+        return self.to_hex(self.to_bytes(value))
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+
+class AddressField(HexBytesField):
+    """
+    Stores an ethereum address as its 20 bytes,
+    and reads it back as a checksum encoded address.
+    """
+    num_bytes = 20
+
+    def to_hex(self, value):
+        return Web3.toChecksumAddress(super().to_hex(value))
+
+
+class HashField(HexBytesField):
+    """ Stores a transaction hash as its 32 bytes. """
+
+    num_bytes = 32
+
+
+class UintField(models.Field):
+    """
+    Stores an unsigned integer of up to 256 bits, such as a token amount,
+    as numeric(78, 0), and reads it back as a decimal string.
+    SQLite has no such type, so there it is stored as text.
+    """
+    description = "Unsigned integer of up to 256 bits"
+
+    def db_type(self, connection):
+        if connection.vendor == "postgresql":
+            return "numeric(78, 0)"
+
+        return "text"
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return None
+
+        return int(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is not None and connection.vendor != "postgresql":
+            return str(value)
+
+        return value
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+
+        return str(int(value))
+
+    def to_python(self, value):
+        if value is None:
+            return None
+
+        try:
+            return str(int(value))
+        except (TypeError, ValueError):
+            raise ValidationError(f"{value} is not an integer.")
@@ -1,231 +1,500 @@
 # std lib imports
+from collections import Counter, namedtuple
 import datetime
 
 # third party imports
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction as db_transaction
 from web3.constants import ADDRESS_ZERO
 
 # our imports
+from ..blocks import block_timestamps
 from ..models import ERC20Transfer, ERC721Transfer, Post, Profile, Transaction 
-from ..web3_client import w3
+from ..tokens import token_registry
+from ..web3_client import BatchRequest, w3
+from .. import timelines
 from .abis import erc20_abi, erc721_abi
 
 
 UserModel = get_user_model()
 
+# chain data needed to process webhook activity
+ChainData = namedtuple("ChainData", ["batch", "timestamps", "tokens"])
 
-def _create_tx(data):
-    """
-    Creates a Transaction based on the given data.
-    """
-    object_kwargs = {
-        "chain_id": 1,
-        "tx_hash": data["hash"],
-        "from_address": None,
-        "to_address": None,
-        "block_signed_at": None,
-        "value": None
-    }
 
-    # get block timestamp
-    block_num = w3.toInt(hexstr=data["blockNum"])
-    timestamp = w3.eth.get_block(block_num).timestamp
-    object_kwargs["block_signed_at"] = datetime.datetime.fromtimestamp(
-        timestamp, tz=datetime.timezone.utc
-    )
+def _get_block_num(data):
+    """ Returns the block number of the given activity. """
+
+    return w3.toInt(hexstr=data["blockNum"])
+
 
-    # get transaction details
+def _get_block_request(block_num):
+    """ Returns the JSON-RPC request for the given block. """
+
+    return "eth_getBlockByNumber", [hex(block_num), False]
+
+
+def _get_tx_request(data):
+    """
+    Returns the JSON-RPC request for the transaction of the given activity.
+    """
     # prefer to use block num and tx index as it costs less alchemy units
     if "log" in data:
-        tx_index = w3.toInt(hexstr=data["log"]["transactionIndex"])
-        tx = w3.eth.get_transaction_by_block(block_num, tx_index)
-    else:
-        tx = w3.eth.get_transaction(data["hash"])
+        block_num = hex(_get_block_num(data))
+        tx_index = hex(w3.toInt(hexstr=data["log"]["transactionIndex"]))
+        return "eth_getTransactionByBlockNumberAndIndex", [block_num, tx_index]
 
-    object_kwargs["from_address"] = tx["from"]
-    object_kwargs["to_address"] = tx["to"]
-    object_kwargs["value"] = tx["value"]
+    return "eth_getTransactionByHash", [data["hash"]]
 
-    # create Transaction if it does not exist
-    tx, _ = Transaction.objects.get_or_create(**object_kwargs)
-    
-    return tx
+
+def _get_call_request(contract_address, abi, fn_name):
+    """
+    Returns the JSON-RPC request for calling the given
+    function of a contract, which takes no arguments.
+    """
+    contract = w3.eth.contract(w3.toChecksumAddress(contract_address), abi=abi)
+    call = {"to": contract.address, "data": contract.encodeABI(fn_name)}
+
+    return "eth_call", [call, "latest"]
 
 
-def _create_post(address, tx):
+def _get_call_result(batch, contract_address, abi, fn_name):
     """
-    Creates a Post where the author is the given address,
-    and the reference transaction is the given tx.
-    Does not create a Post if address is the zero address.
+    Returns the decoded result of calling the given
+    function of a contract, which returns a string.
     """
-    # do not create posts for zero address
-    if address == ADDRESS_ZERO:
-        return
+    request = _get_call_request(contract_address, abi, fn_name)
+    result = batch.get(*request)
 
-    # Post details
-    object_kwargs = {
-        "text": "",
-        "imgUrl": "",
-        "isShare": False,
-        "isQuote": False,
-        "refPost": None,
-        "refTx": None,
-        "created": None,
-        "author": None
+    return w3.codec.decode_single("string", w3.toBytes(hexstr=result))
+
+
+def _get_erc20_metadata(data, batch):
+    """
+    Returns the metadata of the token of the given erc20 transfer,
+    using the responses in the given BatchRequest.
+    """
+    address = data["rawContract"]["address"]
+
+    return {
+        "name": _get_call_result(batch, address, erc20_abi, "name"),
+        "symbol": data["asset"],
+        "decimals": data["rawContract"]["decimals"],
+        "logo_url": f"https://logos.covalenthq.com/tokens/1/{address}.png",
     }
 
-    # get or create author based on given address
-    user, _ = UserModel.objects.get_or_create(
-        ethereum_address=w3.toChecksumAddress(address)
-    )
-    author, _ = Profile.objects.get_or_create(
-        user=user
-    )
-    object_kwargs["author"] = author
 
-    # set created time
-    object_kwargs["created"] = tx.block_signed_at
+def _get_erc721_metadata(data, batch):
+    """
+    Returns the metadata of the token of the given erc721 transfer,
+    using the responses in the given BatchRequest.
+    """
+    address = data["rawContract"]["address"]
 
-    # set reference transaction
-    object_kwargs["refTx"] = tx
+    return {
+        "name": _get_call_result(batch, address, erc721_abi, "name"),
+        "symbol": _get_call_result(batch, address, erc721_abi, "symbol"),
+        "decimals": None,
+        "logo_url": f"https://logos.covalenthq.com/tokens/{address}.png",
+    }
 
-    # get or create Post
-    post, _ = Post.objects.get_or_create(**object_kwargs)
 
-    return post
+def _get_token(data, tokens):
+    """
+    Returns the TokenContract of the given transfer
+    from the given dict of address to TokenContract.
+    """
+    return tokens[w3.toChecksumAddress(data["rawContract"]["address"])]
 
 
-def _create_erc20_transfer(data, tx):
+def _handle_reorged_tx(data):
     """
-    Creates an ERC20Transfer and Posts based on the given data.
+    Deletes Transaction, transfers, and Posts associated
+    with a re-orged transaction.
     """
-    # prepare ERC20Transfer data
-    object_kwargs = {
-        "tx": tx,
-        "contract_address": data["rawContract"]["address"],
-        "contract_ticker": data["asset"],
-        "from_address": data["fromAddress"],
-        "to_address": data["toAddress"],
-        "amount": str(w3.toInt(hexstr=data["log"]["data"])),
-        "decimals": data["rawContract"]["decimals"],
-        "contract_name": None,
-        "logo_url": None,
-    }
+    tx = Transaction.objects.get(tx_hash=data["hash"])
+    posts = list(Post.objects.filter(refTx=tx))
+    timelines.remove_posts(posts)
+    Post.objects.filter(refTx=tx).delete()
+    tx.delete()
 
-    # get contract name
-    contract = w3.eth.contract(
-        w3.toChecksumAddress(object_kwargs["contract_address"]),
-        abi=erc20_abi
-    )
-    object_kwargs["contract_name"] = contract.functions.name().call()
+    # the block may have a different timestamp after the re-org
+    block_timestamps.invalidate(_get_block_num(data))
 
-    # get logo of asset
-    logo_url = f"https://logos.covalenthq.com/tokens/1/" \
-                f"{object_kwargs['contract_address']}.png"
-    object_kwargs["logo_url"] = logo_url
 
-    # get or create ERC20Transfer
-    transfer, _ = ERC20Transfer.objects.get_or_create(**object_kwargs)
+def _is_supported(data):
+    """ Returns False for the events we do not yet support. """
 
-    # create posts for the sender and receiver
-    _create_post(transfer.from_address, tx)
-    _create_post(transfer.to_address, tx)
+    # - internal transfers
+    # - erc1155 transfers
+    if data["category"] == "internal":
+        return False
 
-    return transfer
+    if data["category"] == "token" and "erc1155Metadata" in data:
+        return False
+
+    return True
+
+
+def _is_reorged(data):
+    """ Returns True if the given activity was re-orged. """
+
+    return (data["category"] == "token" and data["log"]["removed"] == True) or \
+        (data["category"] == "external" and getattr(data, "removed", False))
 
 
-def _create_erc721_transfer(data, tx):
+def _is_erc20_transfer(data):
+    """ Returns True if the given activity is an erc20 transfer. """
+
+    return data["category"] == "token" and "asset" in data
+
+
+def _is_erc721_transfer(data):
+    """ Returns True if the given activity is an erc721 transfer. """
+
+    return data["category"] == "token" and "erc721TokenId" in data
+
+
+def _get_token_requests(data):
+    """
+    Returns the JSON-RPC requests needed to get the metadata
+    of the token of the given activity.
+    """
+    address = data["rawContract"]["address"]
+    if _is_erc20_transfer(data):
+        return [_get_call_request(address, erc20_abi, "name")]
+
+    if _is_erc721_transfer(data):
+        return [
+            _get_call_request(address, erc721_abi, "symbol"),
+            _get_call_request(address, erc721_abi, "name"),
+        ]
+
+    return []
+
+
+def _fetch_chain_data(activity):
+    """
+    Fetches the chain data needed to process the given activity items
+    in one BatchRequest, skipping the blocks with cached timestamps
+    and the tokens that are registered already.
+    Returns a ChainData of the executed BatchRequest, a dict of
+    block number to timestamp, and a dict of address to TokenContract.
+    """
+    activity = [
+        item for item in activity
+        if _is_supported(item) and not _is_reorged(item)
+    ]
+    transfers = [
+        item for item in activity
+        if _is_erc20_transfer(item) or _is_erc721_transfer(item)
+    ]
+
+    # get cached block timestamps
+    block_nums = set(_get_block_num(item) for item in activity)
+    timestamps = block_timestamps.get_many(block_nums)
+    missing_blocks = block_nums - timestamps.keys()
+
+    # get registered tokens
+    tokens = token_registry.get_many(
+        item["rawContract"]["address"] for item in transfers
+    )
+    new_transfers = {}
+    for item in transfers:
+        address = w3.toChecksumAddress(item["rawContract"]["address"])
+        if address not in tokens:
+            new_transfers[address] = item
+
+    # fetch the rest of the data
+    batch = BatchRequest()
+    for block_num in missing_blocks:
+        batch.add(*_get_block_request(block_num))
+    for item in new_transfers.values():
+        for request in _get_token_requests(item):
+            batch.add(*request)
+    for item in activity:
+        batch.add(*_get_tx_request(item))
+    batch.execute()
+
+    # cache the fetched block timestamps
+    fetched = {}
+    for block_num in missing_blocks:
+        block = batch.get(*_get_block_request(block_num))
+        fetched[block_num] = w3.toInt(hexstr=block["timestamp"])
+    block_timestamps.set_many(fetched)
+    timestamps.update(fetched)
+
+    # register the new tokens
+    metadata = {}
+    for address, item in new_transfers.items():
+        if _is_erc20_transfer(item):
+            metadata[address] = _get_erc20_metadata(item, batch)
+        else:
+            metadata[address] = _get_erc721_metadata(item, batch)
+    tokens.update(token_registry.create_many(metadata))
+
+    return ChainData(batch, timestamps, tokens)
+
+
+def _parse_tx(data, batch, timestamps):
+    """
+    Parses the transaction of the given activity into an unsaved
+    Transaction, using the responses in the given BatchRequest
+    and the given dict of block number to timestamp.
+    """
+    timestamp = timestamps[_get_block_num(data)]
+    tx_data = batch.get(*_get_tx_request(data))
+    tx = Transaction(
+        chain_id=1,
+        tx_hash=data["hash"],
+        from_address=tx_data["from"],
+        to_address=tx_data["to"],
+        block_signed_at=datetime.datetime.fromtimestamp(
+            timestamp, tz=datetime.timezone.utc
+        ),
+        value=w3.toInt(hexstr=tx_data["value"])
+    )
+
+    # bulk inserts skip Transaction.save, so checksum the addresses here
+    tx.checksum_addresses()
+
+    return tx
+
+
+def _parse_transfer(data, tx, tokens):
     """
-    Creates an ERC721Transfer and Posts based on the given data.
+    Parses the given erc20 or erc721 transfer activity into an unsaved
+    ERC20Transfer or ERC721Transfer of the given tx, referencing its
+    TokenContract in the given dict of tokens.
     """
-    # prepare ERC20Transfer data
     object_kwargs = {
         "tx": tx,
+        "contract": _get_token(data, tokens),
         "contract_address": data["rawContract"]["address"],
         "from_address": data["fromAddress"],
         "to_address": data["toAddress"],
-        "token_id": str(w3.toInt(hexstr=data["erc721TokenId"])),
-        "contract_ticker": None,
-        "contract_name": None,
-        "logo_url": None,
+        "log_index": w3.toInt(hexstr=data["log"]["logIndex"]),
     }
 
-    # get contract name
-    contract = w3.eth.contract(
-        w3.toChecksumAddress(object_kwargs["contract_address"]),
-        abi=erc721_abi
-    )
-    object_kwargs["contract_ticker"] = contract.functions.symbol().call()
-    object_kwargs["contract_name"] = contract.functions.name().call()
-
-    # get logo of asset
-    logo_url = f"https://logos.covalenthq.com/tokens/" \
-                f"{object_kwargs['contract_address']}.png"
-    object_kwargs["logo_url"] = logo_url
+    if _is_erc20_transfer(data):
+        transfer = ERC20Transfer(
+            amount=str(w3.toInt(hexstr=data["log"]["data"])),
+            **object_kwargs
+        )
+    else:
+        transfer = ERC721Transfer(
+            token_id=str(w3.toInt(hexstr=data["erc721TokenId"])),
+            **object_kwargs
+        )
 
-    # get or create ERC721Transfer
-    transfer, _ = ERC721Transfer.objects.get_or_create(**object_kwargs)
+    transfer.checksum_addresses()
+    return transfer
 
-    # create posts for the sender and receiver
-    _create_post(transfer.from_address, tx)
-    _create_post(transfer.to_address, tx)
 
-    return transfer
+def _get_transfer_key(transfer):
+    """
+    Returns the fields that identify the given transfer within its tx
+    when its log index is unknown.
+    """
+    if isinstance(transfer, ERC20Transfer):
+        value = transfer.amount
+    else:
+        value = transfer.token_id
+
+    return (
+        transfer.tx_id,
+        transfer.contract_address,
+        transfer.from_address,
+        transfer.to_address,
+        value
+    )
 
 
-def _handle_reorged_tx(data):
+def _get_post_addresses(data, tx):
     """
-    Deletes Transaction, transfers, and Posts associated
-    with a re-orged transaction.
+    Returns the checksum addresses that get a Post for the given activity
+    of the given tx, which are its sender and recipient minus the zero
+    address.
     """
-    tx = Transaction.objects.get(tx_hash=data["hash"])
-    Post.objects.filter(refTx=tx).delete()
-    tx.delete()
+    if data["category"] == "external":
+        addresses = [tx.from_address, tx.to_address]
+    else:
+        addresses = [data["fromAddress"], data["toAddress"]]
+
+    return [
+        w3.toChecksumAddress(address) for address in addresses
+        if address != ADDRESS_ZERO
+    ]
 
 
-def process_activity(data):
+def _get_or_create_profiles(addresses):
     """
-    Creates Transaction, transfers, and Posts based on the given data.
-    Deletes Transaction, transfers, and Posts if the transaction was reorged.
+    Returns a dict of checksum address to Profile of the given addresses,
+    creating the users and profiles that do not exist,
+    using a constant number of queries.
     """
-    # do nothing on events we do not yet support
-    # - internal transfers
-    # - erc1155 transfers
-    if data["category"] == "internal":
-        return
+    addresses = set(addresses)
 
-    if data["category"] == "token" and "erc1155Metadata" in data:
-        return
+    UserModel.objects.bulk_create(
+        [UserModel(ethereum_address=address) for address in addresses],
+        ignore_conflicts=True
+    )
+    Profile.objects.bulk_create(
+        [Profile(user_id=address) for address in addresses],
+        ignore_conflicts=True
+    )
+    profiles = Profile.objects.filter(user_id__in=addresses)
 
-    # handle re-orged transaction
-    if (data["category"] == "token" and data["log"]["removed"] == True) or \
-        (data["category"] == "external" and getattr(data, "removed", False)):
-        _handle_reorged_tx(data)
-        return
+    return {profile.user_id: profile for profile in profiles}
 
-    # create transaction for the events we support
-    tx = _create_tx(data)
 
-    # handle external eth transfer
-    if data["category"] == "external":
-        _create_post(tx.from_address, tx)
-        _create_post(tx.to_address, tx)
+def _create_activities(activity, chain_data):
+    """
+    Creates the Transactions, transfers, and Posts of the given
+    activity items, skipping the ones that exist already,
+    in one database transaction with a constant number of queries.
+    Relies on the unique constraints to skip the rows that exist,
+    including the ones a concurrent job inserts in the meantime.
+    Returns the created Posts.
+    """
+    # parse the transactions, one per hash
+    txs = {}
+    for item in activity:
+        if item["hash"] not in txs:
+            txs[item["hash"]] = _parse_tx(
+                item,
+                chain_data.batch,
+                chain_data.timestamps
+            )
+
+    # the sender and recipient of each activity get a Post of its tx
+    post_keys = set(
+        (address, item["hash"])
+        for item in activity
+        for address in _get_post_addresses(item, txs[item["hash"]])
+    )
+
+    with db_transaction.atomic():
+        # create the transactions that do not exist,
+        # skipped rows get no ids, so read them all back
+        Transaction.objects.bulk_create(
+            list(txs.values()),
+            ignore_conflicts=True
+        )
+        txs = {
+            tx.tx_hash: tx
+            for tx in Transaction.objects.filter(chain_id=1,
+                                                 tx_hash__in=txs.keys())
+        }
+
+        # create the transfers that do not exist, one per log
+        transfers = {}
+        for item in activity:
+            if _is_erc20_transfer(item) or _is_erc721_transfer(item):
+                tx = txs[item["hash"]]
+                transfer = _parse_transfer(item, tx, chain_data.tokens)
+                transfers[(tx.id, transfer.log_index)] = transfer
+
+        for model in (ERC20Transfer, ERC721Transfer):
+            # transfers stored before log indexes were kept are not
+            # covered by the unique constraint, so they are matched
+            # by their fields instead, each one at most once
+            legacy = Counter(
+                _get_transfer_key(t) for t in model.objects.filter(
+                    tx__in=txs.values(),
+                    log_index__isnull=True
+                )
+            )
+            new_transfers = []
+            for transfer in transfers.values():
+                if not isinstance(transfer, model):
+                    continue
+                key = _get_transfer_key(transfer)
+                if legacy[key]:
+                    legacy[key] -= 1
+                else:
+                    new_transfers.append(transfer)
+            model.objects.bulk_create(new_transfers, ignore_conflicts=True)
+
+        # create the posts that do not exist
+        profiles = _get_or_create_profiles(a for a, _ in post_keys)
+        post_kwargs = {
+            "text": "",
+            "imgUrl": "",
+            "isShare": False,
+            "isQuote": False,
+            "refPost": None
+        }
+        existing = set(
+            Post.objects.filter(refTx__in=txs.values())
+            .values_list("author__user_id", "refTx__tx_hash")
+        )
+        new_keys = set(
+            (profiles[address].id, txs[tx_hash].id)
+            for address, tx_hash in post_keys
+            if (address, tx_hash) not in existing
+        )
+        Post.objects.bulk_create([
+            Post(
+                author=profiles[address],
+                refTx=txs[tx_hash],
+                created=txs[tx_hash].block_signed_at,
+                **post_kwargs
+            )
+            for address, tx_hash in post_keys
+            if (address, tx_hash) not in existing
+        ], ignore_conflicts=True)
+
+        # skipped rows get no ids, so read the new posts back
+        posts = [
+            post for post in Post.objects.filter(
+                author__in=[profiles[address] for address, _ in post_keys],
+                refTx__in=txs.values()
+            )
+            if (post.author_id, post.refTx_id) in new_keys
+        ]
+
+    # fan out the new posts to the timelines
+    timelines.add_posts(posts)
+
+    return posts
+
+
+def process_activities(activity):
+    """
+    Processes the given activity items of webhooks,
+    creating Transactions, Transfers, and Posts in bulk,
+    and deleting them for the transactions that were re-orged.
+    The chain data of all the items is fetched up front
+    using batched JSON-RPC requests.
+    Items are processed in order, so that a re-org
+    applies to the items that came before it.
+    """
+    chain_data = _fetch_chain_data(activity)
+
+    # create the items between re-orgs in bulk
+    pending = []
+    for item in activity:
+        # do nothing on events we do not yet support
+        if not _is_supported(item):
+            continue
 
-    # handle erc20 transfer
-    if data["category"] == "token" and "asset" in data:
-        _create_erc20_transfer(data, tx)
+        if _is_reorged(item):
+            if pending:
+                _create_activities(pending, chain_data)
+                pending = []
+            _handle_reorged_tx(item)
+        else:
+            pending.append(item)
 
-    # handle erc721 transfer
-    if data["category"] == "token" and "erc721TokenId" in data:
-        _create_erc721_transfer(data, tx)
+    if pending:
+        _create_activities(pending, chain_data)
 
-    return
 
 def process_webhook_data(data):
     """
-    Processes the activity items in the given data,
+    Processes the activity items in the given webhook data,
     creating Transactions, Transfers, and Posts.
     """
-    for item in data["event"]["activity"]:
-        process_activity(item)
+    process_activities(data["event"]["activity"])
@@ -1,18 +1,24 @@
 # std lib imports
 import datetime
 import json
+import time
 
 # third party imports
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction as db_transaction
+from django.utils.dateparse import parse_datetime
 from web3 import Web3
 import redis
 import requests
 import rq
 
 # our imports
+from ..blocks import block_timestamps
 from ..models import ERC20Transfer, ERC721Transfer, Feed, Post, \
-                     Profile, Transaction 
+                     Profile, Transaction, TxHistoryCursor
+from ..tokens import token_registry
+from .. import redis_client, timelines
 UserModel = get_user_model()
 
 
@@ -27,6 +33,24 @@ erc20_transfer_sig = "Transfer(indexed address from, "\
                      "indexed address to, uint256 value)"
 erc721_transfer_sig = "Transfer(indexed address from, "\
                      "indexed address to, indexed uint256 tokenId)"
+transfer_sigs = (erc20_transfer_sig, erc721_transfer_sig)
+
+# backfill config
+chunk_pages = settings.TX_HISTORY_CHUNK_PAGES
+lock_timeout = 600
+
+# states of the tx history ingestion of an address,
+# each forgotten after the given number of seconds
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+state_ttls = {
+    QUEUED: lock_timeout,
+    RUNNING: lock_timeout,
+    DONE: settings.TX_HISTORY_SYNC_INTERVAL,
+    FAILED: settings.TX_HISTORY_RETRY_INTERVAL,
+}
 
 # other constants
 zero_address = "0x0000000000000000000000000000000000000000"
@@ -44,21 +68,61 @@ def get_tx_history_url(address, page_number):
     return url
 
 
-def get_user_tx_history(address, limit):
+def get_state_key(address):
+    """
+    Returns the key of the hash that holds the state
+    of the tx history ingestion of the given address.
+    """
+    return f"tx-history:{address}"
+
+
+def set_state(address, state, pipeline=None):
+    """
+    Records the given state of the tx history ingestion of the given
+    address along with when it was set, to be forgotten once the
+    state's ttl passes. Uses the given redis pipeline if any.
+    """
+    if pipeline is None:
+        pipeline = redis_client.RedisConnection().redis_client.pipeline()
+        execute = True
+    else:
+        execute = False
+
+    key = get_state_key(address)
+    pipeline.hset(key, mapping={"state": state, "updated": int(time.time())})
+    pipeline.expire(key, state_ttls[state])
+
+    if execute:
+        pipeline.execute()
+
+
+def get_state(address):
+    """
+    Returns the state of the tx history ingestion of the given address,
+    and the unix time it was set at, or None and None if it is unknown.
+    """
+    redis_conn = redis_client.RedisConnection().redis_client
+    data = redis_conn.hgetall(get_state_key(address))
+    if not data:
+        return None, None
+
+    return data[b"state"].decode(), int(data[b"updated"])
+
+
+def get_user_tx_history(address, limit=None, start_page=0):
     """
     Use the covalent API to get the previous X
-    transactions of the given address.
+    transactions of the given address, starting from 'start_page'.
     If 'limit' is None then all transactions are returned,
     otherwise only 'limit' number of txs are returned.
-    Returns a list of transactions data.
+    Yields a (page number, transactions data, has more) tuple per page,
+    so that the whole history is never held in memory.
     """
-    # TODO can this run out of memory if
-    # there are thousands of txs?
-    to_ret = []
+    num_txs = 0
 
     # paginate through results
     has_more = True
-    page_number = -1
+    page_number = start_page - 1
     while has_more is True:
         # prepare url
         page_number += 1
@@ -69,108 +133,142 @@ def get_user_tx_history(address, limit):
         resp.raise_for_status()
         data = resp.json()
 
-        # update results
-        to_ret += data["data"]["items"]
+        # hand over the page
+        items = data["data"]["items"]
         has_more = data["data"]["pagination"]["has_more"]
+        num_txs += len(items)
+        yield page_number, items, has_more
 
         # stop looping if limit has been reached
-        if limit is not None and len(to_ret) >= limit:
+        if limit is not None and num_txs >= limit:
             break
 
-        # TODO remove this when a more robust tx indexing system is created
-        # for now break after 10 pages, to avoid overwhelming covalent
-        # and our job system
-        if page_number == 10: break
 
-    return to_ret
+def get_transfer_events(tx_data):
+    """
+    Returns the decoded log events of the given transaction data
+    that are transfers we support.
+    """
+    return [
+        event for event in tx_data["log_events"]
+        # skip logs that havent been decoded by covalent
+        if event["decoded"] is not None and
+        event["decoded"]["signature"] in transfer_sigs
+    ]
 
 
-def parse_and_create_tx(tx_data, address):
+def get_token_metadata(page):
     """
-    Parses transaction data and stores it in the database.
-    Returns the created Transaction object.
-    Returns None if the transaction:
-     - does not originate from the given address, or
-     - the transaction already exists in the db.
+    Returns a dict of contract address to the metadata of the
+    tokens transferred in the given page of transactions data.
     """
-    tx = None
-    address = address.lower()
+    metadata = {}
+    for tx_data in page:
+        for event in get_transfer_events(tx_data):
+            metadata[event["sender_address"]] = {
+                "name": event["sender_name"] or "",
+                "symbol": event["sender_contract_ticker_symbol"] or "",
+                "decimals": event["sender_contract_decimals"],
+                "logo_url": event["sender_logo_url"] or "",
+            }
+
+    return metadata
 
+
+def parse_tx(tx_data, tokens):
+    """
+    Parses transaction data into an unsaved Transaction object.
+    Returns the Transaction along with a list of its unsaved
+    ERC20Transfer and ERC721Transfer objects, which reference
+    the TokenContracts in the given dict of address to TokenContract.
+    """
     # data for creating new tx
     object_kwargs = {
         "chain_id": chain_id,
         "tx_hash": tx_data["tx_hash"],
-        "block_signed_at": tx_data["block_signed_at"],
+        "block_signed_at": parse_datetime(tx_data["block_signed_at"]),
         "from_address": tx_data["from_address"],
         "to_address": tx_data["to_address"],
         "value": tx_data["value"]
     }
 
-    # return None if transaction already exists
-    if Transaction.objects.filter(
-        tx_hash=object_kwargs["tx_hash"]
-    ).count() > 0:
-        return None
-
-    # return if the given address is not the origin of the tx
-    # this helps avoid spam until there's a better system in place
-    if object_kwargs["from_address"] != address:
-        return None
-
     # recipient in contract creation txs comes back as None,
     # set it to zero address instead
     if object_kwargs["to_address"] is None:
         object_kwargs["to_address"] = zero_address
 
-    # create tx
-    tx = Transaction.objects.create(**object_kwargs)
+    # bulk inserts skip Transaction.save, so checksum the addresses here
+    tx = Transaction(**object_kwargs)
+    tx.checksum_addresses()
 
-    # create db records for the events we support
-    log_events = tx_data["log_events"]
-    for event in log_events:
-        # skip logs that havent been decoded by covalent
-        if event["decoded"] is None:
-            continue
+    # create objects for the events we support
+    transfers = []
+    for event in get_transfer_events(tx_data):
+        contract = tokens[Web3.toChecksumAddress(event["sender_address"])]
 
-        # create records for erc20 transfers
+        # erc20 transfers
         event_sig = event["decoded"]["signature"]
         if event_sig == erc20_transfer_sig:
-            ERC20Transfer.objects.create(
+            transfers.append(ERC20Transfer(
                 tx=tx,
+                contract=contract,
                 contract_address=event["sender_address"],
-                contract_name=event["sender_name"],
-                contract_ticker=event["sender_contract_ticker_symbol"],
-                logo_url=event["sender_logo_url"],
                 from_address=event["decoded"]["params"][0]["value"],
                 to_address=event["decoded"]["params"][1]["value"],
                 amount=event["decoded"]["params"][2]["value"],
-                decimals=event["sender_contract_decimals"]
-            )
+                log_index=event["log_offset"],
+            ))
 
-        # create records for erc721 transfers
+        # erc721 transfers
         if event_sig == erc721_transfer_sig:
-            ERC721Transfer.objects.create(
+            transfers.append(ERC721Transfer(
                 tx=tx,
+                contract=contract,
                 contract_address=event["sender_address"],
-                contract_name=event["sender_name"],
-                contract_ticker=event["sender_contract_ticker_symbol"],
-                logo_url=event["sender_logo_url"],
                 from_address=event["decoded"]["params"][0]["value"],
                 to_address=event["decoded"]["params"][1]["value"],
                 token_id=event["decoded"]["params"][2]["value"],
-            )
+                log_index=event["log_offset"],
+            ))
+
+    for transfer in transfers:
+        transfer.checksum_addresses()
 
-    return tx
+    return tx, transfers
 
 
-def create_post(tx_record, post_author):
+def create_txs(page, post_author):
     """
-    Creates a Post using a db record of Transaction where the
-    post_author is the from address of the transaction.
-    Returns the created object.
-    Returns None if the post_author is not the originator of the
-    transaction. 
+    Stores a page of transactions data in the database,
+    along with their transfers and a Post for each of them,
+    using a constant number of queries.
+    Skips the transactions that:
+     - do not originate from the post_author, or
+     - already exist in the db.
+    Rows that a concurrent job inserts in the meantime are skipped by
+    the unique constraints, so the page can be processed by several
+    jobs at once without creating duplicates.
+    Returns the Posts of the page's new transactions.
     """
+    address = post_author.user.ethereum_address.lower()
+
+    # only keep txs that originate from the author,
+    # this helps avoid spam until there's a better system in place
+    page = {
+        tx_data["tx_hash"]: tx_data for tx_data in page
+        if tx_data["from_address"] == address
+    }
+
+    # skip transactions that already exist, which saves
+    # parsing them and registering their tokens
+    existing = Transaction.objects.filter(tx_hash__in=page.keys())\
+        .values_list("tx_hash", flat=True)
+    for tx_hash in existing:
+        del page[tx_hash]
+
+    if not page:
+        return []
+
     # Post details that remain the same
     object_kwargs = {
         "text": "",
@@ -179,42 +277,164 @@ def create_post(tx_record, post_author):
         "isQuote": False,
         "refPost": None
     }
-    address = post_author.user.ethereum_address
-
-    # create Post if author is the sender of the tx
-    if tx_record.from_address == address:
-        return Post.objects.create(
-            author=post_author,
-            refTx=tx_record,
-            created=tx_record.block_signed_at,
-            **object_kwargs
+
+    # get the token contracts of the transfers, registering new ones
+    metadata = get_token_metadata(page.values())
+    tokens = token_registry.get_many(metadata)
+    tokens.update(token_registry.create_many({
+        address: token_metadata
+        for address, token_metadata in metadata.items()
+        if Web3.toChecksumAddress(address) not in tokens
+    }))
+
+    with db_transaction.atomic():
+        # create txs, skipping the ones a concurrent job created
+        parsed = [parse_tx(tx_data, tokens) for tx_data in page.values()]
+        Transaction.objects.bulk_create(
+            [tx for tx, _ in parsed],
+            ignore_conflicts=True
         )
 
-    return None
+        # skipped rows get no ids, so read them all back
+        txs = {
+            tx.tx_hash: tx for tx in
+            Transaction.objects.filter(chain_id=chain_id,
+                                       tx_hash__in=page.keys())
+        }
+
+        # create transfers, now that the txs have ids
+        transfers = []
+        for tx, tx_transfers in parsed:
+            for transfer in tx_transfers:
+                transfer.tx = txs[tx.tx_hash]
+                transfers.append(transfer)
+        for model in (ERC20Transfer, ERC721Transfer):
+            model.objects.bulk_create(
+                [t for t in transfers if isinstance(t, model)],
+                ignore_conflicts=True
+            )
+
+        # create posts, in the order of the page
+        Post.objects.bulk_create([
+            Post(
+                author=post_author,
+                refTx=txs[tx_hash],
+                created=txs[tx_hash].block_signed_at,
+                **object_kwargs
+            )
+            for tx_hash in page
+        ], ignore_conflicts=True)
+        posts = list(
+            Post.objects.filter(author=post_author, refTx__in=txs.values())
+        )
+
+    # share the block timestamps with the other ingestion paths
+    block_timestamps.set_many({
+        tx_data["block_height"]: int(txs[tx_hash].block_signed_at.timestamp())
+        for tx_hash, tx_data in page.items()
+    })
+
+    # adding posts to timelines is idempotent, so the posts of
+    # txs a concurrent job created are safe to add again
+    timelines.add_posts(posts)
+    return posts
+
+
+def backfill_txs(cursor, post_author, limit=None):
+    """
+    Processes up to `chunk_pages` pages of the tx history,
+    starting from the page the cursor is at.
+    The cursor is saved after each page so that a failed job
+    can be resumed without processing the same pages again,
+    and the history is kept marked as running meanwhile.
+    Returns True if there are pages left to process.
+    """
+    start_page = cursor.next_page
+    history = get_user_tx_history(cursor.address, limit, start_page)
+    for page_number, page, has_more in history:
+        create_txs(page, post_author)
+
+        # the newest tx marks where fetching new txs starts from
+        if page_number == 0 and page:
+            cursor.latest_block_signed_at = \
+                parse_datetime(page[0]["block_signed_at"])
+
+        # checkpoint
+        cursor.next_page = page_number + 1
+        cursor.backfill_complete = not has_more
+        cursor.save()
+        set_state(cursor.address, RUNNING)
+
+        if has_more and cursor.next_page - start_page >= chunk_pages:
+            return True
+
+    return False
+
+
+def fetch_new_txs(cursor, post_author, limit=None):
+    """
+    Processes the transactions that are newer than the cursor,
+    walking the tx history from its newest page until reaching
+    the transactions that were processed before.
+    The history is kept marked as running after each page.
+    """
+    latest = cursor.latest_block_signed_at
+    for page_number, page, _ in get_user_tx_history(cursor.address, limit):
+        create_txs(page, post_author)
+
+        if page_number == 0 and page:
+            cursor.latest_block_signed_at = \
+                parse_datetime(page[0]["block_signed_at"])
+        set_state(cursor.address, RUNNING)
+
+        # stop once the page reaches txs that were processed before
+        if latest is not None and any(
+            parse_datetime(tx_data["block_signed_at"]) <= latest
+            for tx_data in page
+        ):
+            break
+
+    cursor.save()
 
 
 def process_address_txs(address, limit=None):
     """
     Populates the database with the address' transaction history.
     Creates Posts based on the tx history.
+    Backfills the history from where the address' cursor is at,
+    re-enqueueing itself every `chunk_pages` pages until the whole
+    history is processed. Once it is, only new txs are processed.
     Processes all txs if 'limit' is None, otherwise processes
     'limit' number of transactions.
     """
-    # get tx history
-    history = get_user_tx_history(address, limit)
-
     # create a user/profile if they do not already exist
     user, _ = UserModel.objects.get_or_create(ethereum_address=address)
     user, _ = Profile.objects.get_or_create(user=user)
 
-    # create db records based on history
-    for transaction in history:
-        # create a Transaction using the tx data
-        tx_record = parse_and_create_tx(transaction, address)
-
-        # exit if the tx has been processed before
-        if tx_record is None:
-            continue
+    # get where processing stopped the last time
+    cursor, _ = TxHistoryCursor.objects.get_or_create(
+        address=address,
+        chain_id=chain_id
+    )
+
+    # process the history
+    connection = redis_client.RedisConnection()
+    set_state(address, RUNNING)
+    try:
+        if cursor.backfill_complete:
+            fetch_new_txs(cursor, user, limit)
+        elif backfill_txs(cursor, user, limit):
+            # continue the backfill in a new job, which may start
+            # running as soon as it is enqueued
+            set_state(address, QUEUED)
+            connection.get_high_queue().enqueue(
+                process_address_txs,
+                address,
+                job_id=f"{address}:{cursor.next_page}"
+            )
+            return
+    except Exception:
+        set_state(address, FAILED)
+        raise
 
-        # create a Post using the tx data
-        create_post(tx_record, user)
+    set_state(address, DONE)
@@ -0,0 +1,13 @@
+# std lib imports
+
+# third party imports
+
+# our imports
+from .. import explore
+
+
+def refresh_explore():
+    """
+    Renders and stores the Explore page.
+    """
+    explore.refresh()
@@ -0,0 +1,14 @@
+# std lib imports
+
+# third party imports
+
+# our imports
+from .. import notifications
+
+
+def run_mention_fanout(fanout_id):
+    """
+    Notifies the next chunk of active users of the mention of the given
+    MentionFanout, and enqueues the job of the chunk after it.
+    """
+    notifications.run_fanout(fanout_id)
@@ -0,0 +1,41 @@
+# std lib imports
+
+# third party imports
+
+# our imports
+from ..models import Feed, Profile
+from .. import timelines
+
+
+def build_home_timeline(profile_id):
+    """
+    Builds the timeline of the home feed of the given profile.
+    """
+    profile = Profile.objects.get(pk=profile_id)
+    timelines.build_home_timeline(profile)
+
+
+def build_feed_timeline(feed_id):
+    """
+    Builds the timeline of the items of the given Feed.
+    """
+    feed = Feed.objects.get(pk=feed_id)
+    timelines.build_feed_timeline(feed)
+
+
+def prune_home_timelines(profile_ids):
+    """
+    Prunes the home timelines of the given profiles.
+    """
+    timelines.prune_home_timelines(profile_ids)
+
+
+def add_authors_to_home_timelines(profile_ids, author_ids):
+    """
+    Adds the latest Posts of the given authors
+    to the home timelines of the given profiles.
+    """
+    timelines.add_authors(
+        [timelines.get_home_timeline(pk) for pk in profile_ids],
+        author_ids
+    )
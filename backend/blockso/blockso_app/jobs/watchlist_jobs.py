@@ -0,0 +1,14 @@
+# std lib imports
+
+# third party imports
+
+# our imports
+from .. import alchemy
+
+
+def sync_watched_addresses():
+    """
+    Syncs the addresses whose watch status changed
+    with the Alchemy Notify webhook.
+    """
+    alchemy.sync_watched_addresses()
@@ -0,0 +1,114 @@
+"""
+Django command that compares the latency of getting a deep page of
+an author's posts with OFFSET pagination against keyset pagination
+on (created, id), on the configured database. The posts are created
+in a transaction that is rolled back afterwards.
+
+usage: python manage.py bench-pagination [--posts 50000] [--page 100] [--runs 20]
+"""
+# std lib imports
+from datetime import datetime, timedelta, timezone
+import statistics
+import time
+
+# third party imports
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+# our imports
+from blockso_app import pagination
+from blockso_app.models import Post, Profile
+
+
+UserModel = get_user_model()
+
+address = "0x000000000000000000000000000000000000bE2c"
+
+
+class Rollback(Exception):
+    """ Raised to roll back the posts created for the benchmark. """
+
+
+def time_query(get_page, runs):
+    """
+    Returns the median latency in milliseconds
+    of evaluating the queryset returned by get_page.
+    """
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        list(get_page())
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(latencies)
+
+
+class Command(BaseCommand):
+    """
+    Django command that compares the latency of getting a deep page of
+    posts with OFFSET pagination against keyset pagination.
+
+    usage: python manage.py bench-pagination [--posts 50000] [--page 100] [--runs 20]
+    """
+
+    def add_arguments(self, parser):
+        """ Arguments to be passed to the command. """
+
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--page', type=int, default=100)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        """ Main entrypoint into the django command. """
+
+        try:
+            with transaction.atomic():
+                self.bench(**options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def bench(self, posts, page, runs, **options):
+        """ Creates the posts and reports the latencies of both queries. """
+
+        user = UserModel.objects.create(ethereum_address=address)
+        profile = Profile.objects.create(user=user)
+
+        # posts are a second apart, with every tenth one sharing its time
+        now = datetime.now(timezone.utc)
+        Post.objects.bulk_create([
+            Post(
+                author=profile,
+                isShare=False,
+                isQuote=False,
+                created=now - timedelta(seconds=i - (i % 10 == 1))
+            )
+            for i in range(posts)
+        ], batch_size=1000)
+
+        page_size = pagination.PostsPagination.page_size
+        offset = (page - 1) * page_size
+        queryset = Post.objects.filter(author=profile)
+
+        # the position of the last post of the previous page,
+        # as it would be encoded in the cursor of the page
+        last = queryset.order_by("-created", "-id")[offset - 1]
+        position = (last.created, last.id)
+
+        offset_ms = time_query(
+            lambda: queryset.order_by("-created", "-id")[
+                offset:offset + page_size
+            ],
+            runs
+        )
+        keyset_ms = time_query(
+            lambda: pagination.filter_after(queryset, position)[:page_size],
+            runs
+        )
+
+        print("Posts: ", posts)
+        print(f"Page {page}, {page_size} posts per page")
+        print(f"OFFSET: {offset_ms:.3f}ms")
+        print(f"Keyset: {keyset_ms:.3f}ms")
+        print(f"Count: {time_query(lambda: [queryset.count()], runs):.3f}ms")
@@ -0,0 +1,152 @@
+"""
+Django command that measures the storage size of the transaction and
+transfer tables and their indexes, and the latency of looking up
+transactions by hash as ingestion does, on the configured database
+filled with the given number of random transactions. The transactions
+are created in a transaction that is rolled back afterwards.
+
+usage: python manage.py bench-tx-storage [--txs 100000] [--lookups 200]
+"""
+# std lib imports
+import random
+import statistics
+import time
+
+# third party imports
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from web3 import Web3
+
+# our imports
+from blockso_app.models import ERC20Transfer, TokenContract, Transaction
+
+
+# hashes looked up per query, like a page of tx history
+lookup_batch_size = 50
+
+
+class Rollback(Exception):
+    """ Raised to roll back the transactions created for the benchmark. """
+
+
+def random_address():
+    """ Returns a random checksum encoded address. """
+
+    return Web3.toChecksumAddress(f"0x{random.getrandbits(160):040x}")
+
+
+def random_hash():
+    """ Returns a random tx hash. """
+
+    return f"0x{random.getrandbits(256):064x}"
+
+
+def get_sizes(table):
+    """ Returns the size in bytes of the given table and of its indexes. """
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT pg_relation_size(%s), pg_indexes_size(%s)",
+                [table, table]
+            )
+            return cursor.fetchone()
+
+        cursor.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat "
+            "WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = %s) "
+            "GROUP BY name",
+            [table]
+        )
+        sizes = dict(cursor.fetchall())
+
+    table_size = sizes.pop(table)
+    return table_size, sum(sizes.values())
+
+
+class Command(BaseCommand):
+    """
+    Django command that measures the storage size of the transaction
+    and transfer tables, and the latency of looking up transactions.
+
+    usage: python manage.py bench-tx-storage [--txs 100000] [--lookups 200]
+    """
+
+    def add_arguments(self, parser):
+        """ Arguments to be passed to the command. """
+
+        parser.add_argument('--txs', type=int, default=100000)
+        parser.add_argument('--lookups', type=int, default=200)
+
+    def handle(self, *args, **options):
+        """ Main entrypoint into the django command. """
+
+        try:
+            with transaction.atomic():
+                self.bench(**options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def bench(self, txs, lookups, **options):
+        """ Creates the transactions and reports sizes and latencies. """
+
+        contract = TokenContract.objects.create(
+            chain_id=1,
+            address=random_address(),
+            name="Bench",
+            symbol="BENCH",
+            decimals=18
+        )
+        now = timezone.now()
+        created = Transaction.objects.bulk_create([
+            Transaction(
+                chain_id=1,
+                tx_hash=random_hash(),
+                block_signed_at=now,
+                from_address=random_address(),
+                to_address=contract.address,
+                value="0"
+            )
+            for _ in range(txs)
+        ], batch_size=5000)
+        ERC20Transfer.objects.bulk_create([
+            ERC20Transfer(
+                tx=tx,
+                contract=contract,
+                contract_address=contract.address,
+                from_address=tx.from_address,
+                to_address=random_address(),
+                amount=str(random.getrandbits(80))
+            )
+            for tx in created
+        ], batch_size=5000)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE blockso_app_transaction")
+
+        print("Transactions: ", txs)
+        for model in (Transaction, ERC20Transfer):
+            table_size, index_size = get_sizes(model._meta.db_table)
+            print(
+                f"{model.__name__}: table {table_size / 2**20:.1f}MiB, "
+                f"indexes {index_size / 2**20:.1f}MiB"
+            )
+
+        # look up batches of known and unknown hashes, as ingestion does
+        hashes = [tx.tx_hash for tx in created]
+        latencies = []
+        for _ in range(lookups):
+            batch = random.sample(hashes, lookup_batch_size // 2)
+            batch += [random_hash() for _ in range(lookup_batch_size // 2)]
+            start = time.perf_counter()
+            list(Transaction.objects.filter(tx_hash__in=batch)
+                 .values_list("tx_hash", flat=True))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        percentiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"Lookup of {lookup_batch_size} hashes: "
+            f"p50 {percentiles[49]:.3f}ms, p95 {percentiles[94]:.3f}ms"
+        )
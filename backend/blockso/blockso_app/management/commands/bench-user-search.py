@@ -0,0 +1,92 @@
+"""
+Django command that measures the latency of the user search typeahead
+against the configured database, filled with the given number of
+wallets with random addresses. The wallets are created in a
+transaction that is rolled back afterwards.
+
+usage: python manage.py bench-user-search [--wallets 1000000] [--queries 200]
+"""
+# std lib imports
+import random
+import secrets
+import statistics
+import time
+
+# third party imports
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from web3 import Web3
+
+# our imports
+from blockso_app import utils
+from blockso_app.models import Profile
+
+
+UserModel = get_user_model()
+
+
+class Rollback(Exception):
+    """ Raised to roll back the wallets created for the benchmark. """
+
+
+class Command(BaseCommand):
+    """
+    Django command that measures the latency of the user search typeahead
+    against a database filled with the given number of wallets.
+
+    usage: python manage.py bench-user-search [--wallets 1000000] [--queries 200]
+    """
+
+    def add_arguments(self, parser):
+        """ Arguments to be passed to the command. """
+
+        parser.add_argument('--wallets', type=int, default=1000000)
+        parser.add_argument('--queries', type=int, default=200)
+
+    def handle(self, *args, **options):
+        """ Main entrypoint into the django command. """
+
+        try:
+            with transaction.atomic():
+                self.bench(**options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def bench(self, wallets, queries, **options):
+        """ Creates the wallets and reports the latencies of searches. """
+
+        addresses = [
+            Web3.toChecksumAddress("0x" + secrets.token_hex(20))
+            for _ in range(wallets)
+        ]
+        UserModel.objects.bulk_create(
+            [UserModel(ethereum_address=address) for address in addresses],
+            batch_size=5000
+        )
+        Profile.objects.bulk_create(
+            [Profile(user_id=address) for address in addresses],
+            batch_size=5000
+        )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE blockso_app_profile")
+
+        # search by prefixes of existing addresses of typical lengths,
+        # typed in lowercase, as "@0x" followed by 1 to 6 characters
+        print("Wallets: ", wallets)
+        for length in range(3, 9):
+            latencies = []
+            for address in random.sample(addresses, min(queries, wallets)):
+                start = time.perf_counter()
+                list(utils.search_profiles(address[:length].lower())[:20])
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            percentiles = statistics.quantiles(latencies, n=100)
+            print(
+                f"Prefix of {length} characters: "
+                f"p50 {percentiles[49]:.3f}ms, "
+                f"p95 {percentiles[94]:.3f}ms, "
+                f"p99 {percentiles[98]:.3f}ms"
+            )
@@ -0,0 +1,76 @@
+"""
+Django command that measures the latency of queueing Alchemy Notify
+webhook deliveries, as the webhook view does, against the redis
+instance at REDIS_URL. Jobs go to a throwaway queue that is emptied
+afterwards. With --reconnect, a new client and connection pool are
+created for every delivery, as was done before connections were
+shared, to compare against.
+
+usage: python manage.py bench-webhook-enqueue [--requests 1000] [--reconnect]
+"""
+# std lib imports
+import statistics
+import time
+import uuid
+
+# third party imports
+from django.core.management.base import BaseCommand
+
+# our imports
+from blockso_app.samples import alchemy_notify_samples
+from blockso_app import alchemy, redis_client
+
+
+queue_name = "bench-webhook-enqueue"
+
+
+class Command(BaseCommand):
+    """
+    Django command that measures the latency of queueing Alchemy Notify
+    webhook deliveries against the redis instance at REDIS_URL.
+
+    usage: python manage.py bench-webhook-enqueue [--requests 1000] [--reconnect]
+    """
+
+    def add_arguments(self, parser):
+        """ Arguments to be passed to the command. """
+
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--reconnect', action='store_true')
+
+    def handle(self, *args, **options):
+        """ Main entrypoint into the django command. """
+
+        connection = redis_client.RedisConnection()
+        run_id = uuid.uuid4().hex
+        keys = []
+        latencies = []
+
+        for i in range(options["requests"]):
+            data = alchemy_notify_samples.get_eth_transfer(
+                f"{queue_name}:{run_id}:{i}"
+            )
+            keys.append(f"alchemy-webhook:{data['id']}")
+            keys.append(alchemy.get_activity_key(data["event"]["activity"][0]))
+
+            start = time.perf_counter()
+            if options["reconnect"]:
+                connection.connect()
+            queue = connection.get_queue(queue_name)
+            alchemy.enqueue_webhook_data(data, queue=queue)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        # report the latencies in milliseconds
+        percentiles = statistics.quantiles(latencies, n=100)
+        print("Requests: ", len(latencies))
+        print(f"Mean: {statistics.mean(latencies):.3f}ms")
+        print(f"p50: {percentiles[49]:.3f}ms")
+        print(f"p95: {percentiles[94]:.3f}ms")
+        print(f"p99: {percentiles[98]:.3f}ms")
+        print(f"Requests/sec: {len(latencies) / (sum(latencies) / 1000):.1f}")
+        for name, value in connection.get_pool_stats().items():
+            print(f"Pool {name}: ", value)
+
+        # clean up
+        connection.get_queue(queue_name).empty()
+        connection.redis_client.delete(*keys)
@@ -0,0 +1,99 @@
+"""
+Django command that load tests a running Alchemy Notify webhook server
+by sending it signed sample deliveries from concurrent clients,
+and reports the requests/sec and latencies it served them at.
+Every delivery is unique, so each one is queued for processing,
+and refers to a made-up transaction: run it against a staging server.
+
+usage: python manage.py bench-webhook-load http://127.0.0.1:8000/api/alchemy-notify-webhook/ [--requests 5000] [--concurrency 50]
+"""
+# std lib imports
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+# third party imports
+from django.core.management.base import BaseCommand
+import aiohttp
+
+# our imports
+from blockso_app.samples import alchemy_notify_samples
+from blockso_app import alchemy
+
+
+async def send_deliveries(url, bodies, concurrency):
+    """
+    Posts the given bodies to the given url from the given number
+    of concurrent clients. Returns the latencies in milliseconds
+    and a count of the response statuses.
+    """
+    latencies = []
+    statuses = {}
+    pending = iter(bodies)
+
+    async def client(session):
+        for body in pending:
+            start = time.perf_counter()
+            async with session.post(
+                url,
+                data=body,
+                headers={
+                    "Content-Type": "application/json",
+                    "X-Alchemy-Signature": alchemy.get_signature(body)
+                }
+            ) as resp:
+                await resp.read()
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[resp.status] = statuses.get(resp.status, 0) + 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*[client(session) for _ in range(concurrency)])
+
+    return latencies, statuses
+
+
+class Command(BaseCommand):
+    """
+    Django command that load tests a running Alchemy Notify webhook server
+    by sending it signed sample deliveries from concurrent clients.
+
+    usage: python manage.py bench-webhook-load <url> [--requests 5000] [--concurrency 50]
+    """
+
+    def add_arguments(self, parser):
+        """ Arguments to be passed to the command. """
+
+        parser.add_argument('url', type=str)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--concurrency', type=int, default=50)
+
+    def handle(self, *args, **options):
+        """ Main entrypoint into the django command. """
+
+        run_id = uuid.uuid4().hex
+        bodies = [
+            json.dumps(
+                alchemy_notify_samples.get_eth_transfer(f"bench:{run_id}:{i}")
+            ).encode()
+            for i in range(options["requests"])
+        ]
+
+        start = time.perf_counter()
+        latencies, statuses = asyncio.run(send_deliveries(
+            options["url"],
+            bodies,
+            options["concurrency"]
+        ))
+        elapsed = time.perf_counter() - start
+
+        # report the throughput, and the latencies in milliseconds
+        percentiles = statistics.quantiles(latencies, n=100)
+        print("Requests: ", len(latencies))
+        print("Statuses: ", statuses)
+        print(f"Requests/sec: {len(latencies) / elapsed:.1f}")
+        print(f"p50: {percentiles[49]:.3f}ms")
+        print(f"p95: {percentiles[94]:.3f}ms")
+        print(f"p99: {percentiles[98]:.3f}ms")
@@ -0,0 +1,30 @@
+"""
+Django command that repairs the denormalized counters
+(likes, comments, reposts, followers, following, unread
+notifications) that have drifted from the rows they count.
+
+usage: python manage.py reconcile-counters
+"""
+# std lib imports
+
+# third party imports
+from django.core.management.base import BaseCommand
+
+# our imports
+from blockso_app import utils
+
+
+class Command(BaseCommand):
+    """
+    Django command that repairs the denormalized counters
+    (likes, comments, reposts, followers, following, unread
+    notifications) that have drifted from the rows they count.
+
+    usage: python manage.py reconcile-counters
+    """
+
+    def handle(self, *args, **options):
+        """ Main entrypoint into the django command. """
+
+        for model, field, count in utils.reconcile_counters():
+            print(f"{model.__name__}.{field}, repaired: ", count)
@@ -0,0 +1,30 @@
+"""
+Django command that recomputes which profiles are watched,
+repairing the flags that have drifted from the logins, follows,
+and Feeds that make a profile watched.
+
+usage: python manage.py reconcile-watchlist
+"""
+# std lib imports
+
+# third party imports
+from django.core.management.base import BaseCommand
+
+# our imports
+from blockso_app import watchlist
+
+
+class Command(BaseCommand):
+    """
+    Django command that recomputes which profiles are watched,
+    repairing the flags that have drifted from the logins, follows,
+    and Feeds that make a profile watched.
+
+    usage: python manage.py reconcile-watchlist
+    """
+
+    def handle(self, *args, **options):
+        """ Main entrypoint into the django command. """
+
+        repaired = watchlist.reconcile()
+        print("Profiles repaired: ", len(repaired))
@@ -0,0 +1,28 @@
+"""
+Django command that renders and stores the Explore page,
+e.g. to warm it up after a deploy. Requests keep it fresh afterwards.
+
+usage: python manage.py refresh-explore
+"""
+# std lib imports
+
+# third party imports
+from django.core.management.base import BaseCommand
+
+# our imports
+from blockso_app import explore
+
+
+class Command(BaseCommand):
+    """
+    Django command that renders and stores the Explore page.
+
+    usage: python manage.py refresh-explore
+    """
+
+    def handle(self, *args, **options):
+        """ Main entrypoint into the django command. """
+
+        page = explore.refresh()
+        print("Feeds: ", len(page["feeds"]))
+        print("Profiles: ", len(page["profiles"]))
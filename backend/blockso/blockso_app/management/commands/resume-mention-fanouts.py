@@ -0,0 +1,28 @@
+"""
+Django command that enqueues jobs to finish notifying
+everyone of the mentions whose jobs died part way.
+
+usage: python manage.py resume-mention-fanouts
+"""
+# std lib imports
+
+# third party imports
+from django.core.management.base import BaseCommand
+
+# our imports
+from blockso_app import notifications
+
+
+class Command(BaseCommand):
+    """
+    Django command that enqueues jobs to finish notifying
+    everyone of the mentions whose jobs died part way.
+
+    usage: python manage.py resume-mention-fanouts
+    """
+
+    def handle(self, *args, **options):
+        """ Main entrypoint into the django command. """
+
+        count = notifications.resume_fanouts()
+        print("Mention fan-outs resumed: ", count)
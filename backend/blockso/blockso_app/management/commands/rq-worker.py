@@ -1,22 +1,17 @@
 """
 Django command that runs a worker which connects to and
 listens on the redis instance hosted at environment variable REDIS_URL.
+With --batch-size, the worker processes webhook jobs in batches.
 """
 # std lib imports
-import urllib.parse
 
 # third party imports
-from django.conf import settings
-from django.core.management.base import BaseCommand
-from redis import Redis
-from rq import Connection, Queue
+from django.core.management.base import BaseCommand, CommandError
 from rq.worker import HerokuWorker as Worker
 
 # our imports
-
-
-redis_url = settings.REDIS_URL
-url = urllib.parse.urlparse(redis_url)
+from blockso_app.batch_worker import BatchWorker
+from blockso_app import redis_client
 
 
 class Command(BaseCommand):
@@ -24,22 +19,41 @@ class Command(BaseCommand):
     Runs RQ workers on specified queues. Note that all queues passed into a
     single rqworker command must share the same connection.
 
+    With --batch-size, runs a worker that drains up to that many jobs,
+    or as many as arrive within --batch-window seconds, and processes
+    the webhook activity of all of them at once. It listens on a
+    single queue, and reports its throughput in activities/sec.
+
     Example usage:
     python manage.py rq-worker queue1 queue2 ...
+    python manage.py rq-worker tx_processing --batch-size 100
     """
 
     def add_arguments(self, parser):
         """ Arguments to be passed to the command. """
 
         parser.add_argument('queues', nargs='+', type=str)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--batch-window', type=float, default=1.0)
 
     def handle(self, *args, **options):
         """ Main entrypoint into the django command. """
 
-        conn = Redis(
-            host=url.hostname, port=url.port, db=0, password=url.password
-        )
+        connection = redis_client.RedisConnection()
+        queues = [connection.get_queue(name) for name in options["queues"]]
 
-        with Connection(conn):
-            worker = Worker(map(Queue, options["queues"]))
+        # process webhook jobs in batches
+        if options["batch_size"] is not None:
+            if len(options["queues"]) != 1:
+                raise CommandError("A batch worker listens on one queue.")
+
+            worker = BatchWorker(
+                queues[0],
+                batch_size=options["batch_size"],
+                window=options["batch_window"]
+            )
             worker.work()
+            return
+
+        worker = Worker(queues, connection=connection.redis_client)
+        worker.work()
@@ -0,0 +1,30 @@
+"""
+Django command that replaces the addresses of the Alchemy Notify
+webhook with every address that should be watched.
+Run it to bootstrap or repair the webhook, as the app otherwise
+only sends the addresses whose watch status changed.
+
+usage: python manage.py sync-notify-webhook
+"""
+# std lib imports
+
+# third party imports
+from django.core.management.base import BaseCommand
+
+# our imports
+from blockso_app import alchemy, utils
+
+
+class Command(BaseCommand):
+    """
+    Django command that replaces the addresses of the Alchemy Notify
+    webhook with every address that should be watched.
+
+    usage: python manage.py sync-notify-webhook
+    """
+
+    def handle(self, *args, **options):
+        """ Main entrypoint into the django command. """
+
+        alchemy.update_notify_webhook()
+        print("Addresses watched: ", utils.get_profiles_to_watch().count())
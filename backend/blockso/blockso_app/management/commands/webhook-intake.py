@@ -0,0 +1,41 @@
+"""
+Django command that moves the Alchemy Notify webhook deliveries
+received by the ASGI webhook app onto the rq queues,
+dropping the ones that were seen already.
+
+usage: python manage.py webhook-intake
+"""
+# std lib imports
+import signal
+
+# third party imports
+from django.core.management.base import BaseCommand
+
+# our imports
+from blockso_app import alchemy
+
+
+class Command(BaseCommand):
+    """
+    Django command that moves the Alchemy Notify webhook deliveries
+    received by the ASGI webhook app onto the rq queues,
+    until stopped by SIGINT or SIGTERM.
+
+    usage: python manage.py webhook-intake
+    """
+
+    def stop(self, *args):
+        """ Stops the command once the delivery in progress is queued. """
+
+        self.stopped = True
+
+    def handle(self, *args, **options):
+        """ Main entrypoint into the django command. """
+
+        self.stopped = False
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        print("Deliveries requeued: ", alchemy.requeue_intake())
+        while not self.stopped:
+            alchemy.process_intake()
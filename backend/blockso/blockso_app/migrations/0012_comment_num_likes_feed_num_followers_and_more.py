@@ -0,0 +1,109 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    queryset = queryset.order_by().values(field)\
+        .annotate(count=Count("pk"))\
+        .values("count")
+
+    return Coalesce(Subquery(queryset), 0)
+
+
+def populate_counters(apps, schema_editor):
+    """ Populates the new counter fields from the rows they count. """
+
+    Comment = apps.get_model("blockso_app", "Comment")
+    CommentLike = apps.get_model("blockso_app", "CommentLike")
+    Feed = apps.get_model("blockso_app", "Feed")
+    Follow = apps.get_model("blockso_app", "Follow")
+    Post = apps.get_model("blockso_app", "Post")
+    PostLike = apps.get_model("blockso_app", "PostLike")
+    Profile = apps.get_model("blockso_app", "Profile")
+
+    Post.objects.update(
+        num_likes=count_subquery(
+            PostLike.objects.filter(post=OuterRef("pk")), "post"
+        ),
+        num_comments=count_subquery(
+            Comment.objects.filter(post=OuterRef("pk")), "post"
+        ),
+        num_reposts=count_subquery(
+            Post.objects.filter(refPost=OuterRef("pk")), "refPost"
+        ),
+    )
+    Comment.objects.update(num_likes=count_subquery(
+        CommentLike.objects.filter(comment=OuterRef("pk")), "comment"
+    ))
+    Profile.objects.update(
+        num_followers=count_subquery(
+            Follow.objects.filter(dest=OuterRef("pk")), "dest"
+        ),
+        num_following=count_subquery(
+            Follow.objects.filter(src=OuterRef("pk")), "src"
+        ),
+    )
+    Feed.objects.update(
+        num_followers=count_subquery(
+            Feed.followers.through.objects.filter(feed=OuterRef("pk")),
+            "feed"
+        ),
+        num_following=count_subquery(
+            Feed.following.through.objects.filter(feed=OuterRef("pk")),
+            "feed"
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockso_app', '0011_alter_feed_options_remove_feed_profiles_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='num_likes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='num_followers',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='num_following',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='num_comments',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='num_likes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='num_reposts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='num_followers',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='num_following',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.1 on 2026-10-18 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockso_app', '0012_comment_num_likes_feed_num_followers_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TxHistoryCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=255)),
+                ('chain_id', models.PositiveSmallIntegerField()),
+                ('next_page', models.PositiveIntegerField(default=0)),
+                ('backfill_complete', models.BooleanField(default=False)),
+                ('latest_block_signed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='txhistorycursor',
+            constraint=models.UniqueConstraint(fields=('address', 'chain_id'), name='one cursor per address and chain'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.1.1 on 2026-10-18 21:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_tokens(apps, schema_editor):
+    """
+    Creates a TokenContract per contract of the existing transfers
+    and points the transfers to it.
+    """
+    TokenContract = apps.get_model("blockso_app", "TokenContract")
+    ERC20Transfer = apps.get_model("blockso_app", "ERC20Transfer")
+    ERC721Transfer = apps.get_model("blockso_app", "ERC721Transfer")
+
+    for model in (ERC20Transfer, ERC721Transfer):
+        fields = ["tx__chain_id", "contract_address", "contract_name",
+                  "contract_ticker", "logo_url"]
+        if model is ERC20Transfer:
+            fields.append("decimals")
+
+        contracts = model.objects.order_by().values(*fields).distinct()
+        for contract in contracts:
+            token, _ = TokenContract.objects.get_or_create(
+                chain_id=contract["tx__chain_id"],
+                address=contract["contract_address"],
+                defaults={
+                    "name": contract["contract_name"],
+                    "symbol": contract["contract_ticker"],
+                    "logo_url": contract["logo_url"],
+                    "decimals": contract.get("decimals"),
+                }
+            )
+            model.objects.filter(
+                tx__chain_id=token.chain_id,
+                contract_address=token.address,
+                contract__isnull=True
+            ).update(contract=token)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockso_app', '0013_txhistorycursor_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenContract',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain_id', models.PositiveSmallIntegerField()),
+                ('address', models.CharField(max_length=255)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('symbol', models.CharField(blank=True, max_length=255)),
+                ('decimals', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('logo_url', models.URLField(blank=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='tokencontract',
+            constraint=models.UniqueConstraint(fields=('chain_id', 'address'), name='one token contract per address and chain'),
+        ),
+        migrations.AddField(
+            model_name='erc20transfer',
+            name='contract',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='erc20_transfers', to='blockso_app.tokencontract'),
+        ),
+        migrations.AddField(
+            model_name='erc721transfer',
+            name='contract',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='erc721_transfers', to='blockso_app.tokencontract'),
+        ),
+        migrations.RunPython(populate_tokens, migrations.RunPython.noop),
+    ]
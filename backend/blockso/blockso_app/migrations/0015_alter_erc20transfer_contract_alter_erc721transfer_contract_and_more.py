@@ -0,0 +1,52 @@
+# Generated by Django 4.1.1 on 2026-10-18 21:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockso_app', '0014_tokencontract_erc20transfer_contract_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='erc20transfer',
+            name='contract',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='erc20_transfers', to='blockso_app.tokencontract'),
+        ),
+        migrations.AlterField(
+            model_name='erc721transfer',
+            name='contract',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='erc721_transfers', to='blockso_app.tokencontract'),
+        ),
+        migrations.RemoveField(
+            model_name='erc20transfer',
+            name='contract_name',
+        ),
+        migrations.RemoveField(
+            model_name='erc20transfer',
+            name='contract_ticker',
+        ),
+        migrations.RemoveField(
+            model_name='erc20transfer',
+            name='decimals',
+        ),
+        migrations.RemoveField(
+            model_name='erc20transfer',
+            name='logo_url',
+        ),
+        migrations.RemoveField(
+            model_name='erc721transfer',
+            name='contract_name',
+        ),
+        migrations.RemoveField(
+            model_name='erc721transfer',
+            name='contract_ticker',
+        ),
+        migrations.RemoveField(
+            model_name='erc721transfer',
+            name='logo_url',
+        ),
+    ]
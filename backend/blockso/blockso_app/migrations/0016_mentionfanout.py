@@ -0,0 +1,26 @@
+# Generated by Django 4.1.1 on 2026-10-18 20:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockso_app', '0015_alter_erc20transfer_contract_alter_erc721transfer_contract_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentionFanout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_profile_id', models.PositiveBigIntegerField(default=0)),
+                ('done', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('comment', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='blockso_app.comment')),
+                ('mentioned_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='blockso_app.profile')),
+                ('post', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='blockso_app.post')),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.1.1 on 2026-10-18 20:18
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_unread_notifications(apps, schema_editor):
+    """ Populates the new counter field from the notifications it counts. """
+
+    Notification = apps.get_model("blockso_app", "Notification")
+    Profile = apps.get_model("blockso_app", "Profile")
+
+    unread = Notification.objects.filter(user=OuterRef("pk"), viewed=False)\
+        .order_by().values("user")\
+        .annotate(count=Count("pk"))\
+        .values("count")
+    Profile.objects.update(
+        num_unread_notifications=Coalesce(Subquery(unread), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockso_app', '0016_mentionfanout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='num_unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(
+            populate_unread_notifications,
+            migrations.RunPython.noop
+        ),
+    ]
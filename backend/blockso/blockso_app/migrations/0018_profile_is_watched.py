@@ -0,0 +1,38 @@
+# Generated by Django 4.1.1 on 2026-10-18 20:36
+
+from django.db import migrations, models
+
+
+def populate_is_watched(apps, schema_editor):
+    """ Flags the profiles that are watched. """
+
+    Feed = apps.get_model("blockso_app", "Feed")
+    Profile = apps.get_model("blockso_app", "Profile")
+
+    logged_in = Profile.objects.exclude(user__last_login=None)
+    have_followers = Profile.objects.exclude(follow_dest=None)
+    on_feed = Profile.objects.filter(
+        feeds_following_them__in=Feed.objects.exclude(followers=None)
+    )
+    watched = logged_in | have_followers | on_feed
+    Profile.objects.filter(pk__in=watched.values("pk"))\
+        .update(is_watched=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockso_app', '0017_profile_num_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='is_watched',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.RunPython(
+            populate_is_watched,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.1.1 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockso_app', '0018_profile_is_watched'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ['-created', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='commentlike',
+            options={'ordering': ['-created', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ['-created', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ['-created', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='postlike',
+            options={'ordering': ['-created', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created', '-id'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created', '-id'], name='notification_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created', '-id'], name='post_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postlike',
+            index=models.Index(fields=['post', '-created', '-id'], name='postlike_post_created_idx'),
+        ),
+    ]
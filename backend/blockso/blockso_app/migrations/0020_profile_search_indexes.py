@@ -0,0 +1,44 @@
+# Generated by Django 4.1.1 on 2026-10-18 21:04
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+def create_bio_index(apps, schema_editor):
+    """
+    Creates the trigram index that backs searching profiles by text
+    in their bio. Only PostgreSQL supports it, so other databases
+    search bios without an index.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS profile_bio_trgm_idx "
+        "ON blockso_app_profile USING gin (UPPER(bio) gin_trgm_ops)"
+    )
+
+
+def drop_bio_index(apps, schema_editor):
+    """ Drops the index created by create_bio_index. """
+
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("DROP INDEX IF EXISTS profile_bio_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockso_app', '0019_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(django.db.models.functions.text.Lower('user'), name='profile_address_lower_idx'),
+        ),
+        migrations.RunPython(create_bio_index, drop_bio_index),
+    ]
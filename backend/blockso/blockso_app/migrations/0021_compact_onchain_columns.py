@@ -0,0 +1,149 @@
+# Generated by Django 4.1.1 on 2026-10-18 23:40
+
+import blockso_app.fields
+from django.db import migrations, models
+
+
+# fields of each model that are converted to compact columns
+compact_fields = {
+    "transaction": {
+        "tx_hash": blockso_app.fields.HashField,
+        "from_address": blockso_app.fields.AddressField,
+        "to_address": blockso_app.fields.AddressField,
+        "value": blockso_app.fields.UintField,
+    },
+    "erc20transfer": {
+        "contract_address": blockso_app.fields.AddressField,
+        "from_address": blockso_app.fields.AddressField,
+        "to_address": blockso_app.fields.AddressField,
+        "amount": blockso_app.fields.UintField,
+    },
+    "erc721transfer": {
+        "contract_address": blockso_app.fields.AddressField,
+        "from_address": blockso_app.fields.AddressField,
+        "to_address": blockso_app.fields.AddressField,
+        "token_id": blockso_app.fields.UintField,
+    },
+}
+
+# rows converted per query
+batch_size = 1000
+
+
+def copy_fields(apps, schema_editor, src_suffix, dest_suffix):
+    """
+    Copies the values of the compact fields with the given source suffix
+    to the fields with the given destination suffix, batch by batch.
+    The fields convert the values on the way.
+    """
+    for model_name, fields in compact_fields.items():
+        model = apps.get_model("blockso_app", model_name)
+        src = [name + src_suffix for name in fields]
+        dest = [name + dest_suffix for name in fields]
+
+        last_id = 0
+        while True:
+            batch = list(
+                model.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .only("id", *src)[:batch_size]
+            )
+            if not batch:
+                break
+
+            for obj in batch:
+                for src_name, dest_name in zip(src, dest):
+                    setattr(obj, dest_name, getattr(obj, src_name))
+            model.objects.bulk_update(batch, dest)
+            last_id = batch[-1].id
+
+
+def compact(apps, schema_editor):
+    """ Copies the string columns to the compact columns. """
+
+    copy_fields(apps, schema_editor, "", "_compact")
+
+
+def expand(apps, schema_editor):
+    """ Copies the compact columns back to the string columns. """
+
+    copy_fields(apps, schema_editor, "_compact", "")
+
+
+def get_operations():
+    """
+    Returns the operations that add a nullable compact column next to
+    every string column, copy the data to it, drop the string column
+    and put the compact column in its place.
+    Both columns are nullable while the data is copied,
+    so that the operations can be reversed as well.
+    """
+    add_fields = []
+    swap_fields = []
+    for model_name, fields in compact_fields.items():
+        for name, field_class in fields.items():
+            add_fields += [
+                migrations.AddField(
+                    model_name=model_name,
+                    name=name + "_compact",
+                    field=field_class(null=True),
+                ),
+                migrations.AlterField(
+                    model_name=model_name,
+                    name=name,
+                    field=models.CharField(max_length=255, null=True),
+                ),
+            ]
+            swap_fields += [
+                migrations.RemoveField(model_name=model_name, name=name),
+                migrations.RenameField(
+                    model_name=model_name,
+                    old_name=name + "_compact",
+                    new_name=name,
+                ),
+                migrations.AlterField(
+                    model_name=model_name,
+                    name=name,
+                    field=field_class(),
+                ),
+            ]
+
+    return add_fields + [migrations.RunPython(compact, expand)] + swap_fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockso_app', '0020_profile_search_indexes'),
+    ]
+
+    operations = get_operations() + [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['tx_hash'], name='tx_hash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['from_address', '-block_signed_at'], name='tx_from_address_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['to_address', '-block_signed_at'], name='tx_to_address_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='erc20transfer',
+            index=models.Index(fields=['from_address'], name='erc20_from_address_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='erc20transfer',
+            index=models.Index(fields=['to_address'], name='erc20_to_address_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='erc721transfer',
+            index=models.Index(fields=['from_address'], name='erc721_from_address_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='erc721transfer',
+            index=models.Index(fields=['to_address'], name='erc721_to_address_idx'),
+        ),
+    ]
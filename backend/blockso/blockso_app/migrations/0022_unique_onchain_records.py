@@ -0,0 +1,86 @@
+# Generated by Django 4.1.1 on 2026-10-18 21:20
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Removes the duplicate txs and posts that concurrent ingestion
+    may have created, keeping the first of each, so that the
+    unique constraints can be added.
+    """
+    Transaction = apps.get_model("blockso_app", "Transaction")
+    Post = apps.get_model("blockso_app", "Post")
+
+    duplicate_txs = (
+        Transaction.objects.values("chain_id", "tx_hash")
+        .annotate(keep_id=Min("id"), num=Count("id"))
+        .filter(num__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicate_txs:
+        others = Transaction.objects.filter(
+            chain_id=duplicate["chain_id"],
+            tx_hash=duplicate["tx_hash"]
+        ).exclude(id=duplicate["keep_id"])
+        # posts of the others now reference the tx that is kept,
+        # their transfers are deleted along with them
+        Post.objects.filter(refTx__in=others).update(
+            refTx_id=duplicate["keep_id"]
+        )
+        others.delete()
+
+    duplicate_posts = (
+        Post.objects.filter(refTx__isnull=False)
+        .values("author_id", "refTx_id")
+        .annotate(keep_id=Min("id"), num=Count("id"))
+        .filter(num__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicate_posts:
+        Post.objects.filter(
+            author_id=duplicate["author_id"],
+            refTx_id=duplicate["refTx_id"]
+        ).exclude(id=duplicate["keep_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockso_app', '0021_compact_onchain_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='tx_hash_idx',
+        ),
+        migrations.AddField(
+            model_name='erc20transfer',
+            name='log_index',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='erc721transfer',
+            name='log_index',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='erc20transfer',
+            constraint=models.UniqueConstraint(fields=('tx', 'log_index'), name='one erc20 transfer per log'),
+        ),
+        migrations.AddConstraint(
+            model_name='erc721transfer',
+            constraint=models.UniqueConstraint(fields=('tx', 'log_index'), name='one erc721 transfer per log'),
+        ),
+        migrations.AddConstraint(
+            model_name='post',
+            constraint=models.UniqueConstraint(fields=('author', 'refTx'), name='one post per author and tx'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('tx_hash', 'chain_id'), name='one tx per hash and chain'),
+        ),
+    ]
@@ -2,15 +2,23 @@
 
 # third party imports
 from django.db import models
+from django.db.models.functions import Lower
 from django.conf import settings
 
 # our imports
+from .fields import AddressField, HashField, UintField
 from .web3_client import w3
 
 
 class Profile(models.Model):
     """ Represents the profile of a user. """
 
+    class Meta:
+        indexes = [
+            # search by address prefix, see utils.search_profiles
+            models.Index(Lower("user"), name="profile_address_lower_idx"),
+        ]
+
     user = models.OneToOneField(
         to=settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -18,6 +26,10 @@ class Profile(models.Model):
     )
     bio = models.TextField(blank=True, default="")
     image = models.URLField(blank=True, default="")
+    num_followers = models.PositiveIntegerField(default=0, db_index=True)
+    num_following = models.PositiveIntegerField(default=0)
+    num_unread_notifications = models.PositiveIntegerField(default=0)
+    is_watched = models.BooleanField(default=False, db_index=True)
 
 
 class Socials(models.Model):
@@ -64,6 +76,8 @@ class Feed(models.Model):
         related_name="feeds_they_follow",
         blank=True
     )
+    num_followers = models.PositiveIntegerField(default=0, db_index=True)
+    num_following = models.PositiveIntegerField(default=0)
 
 
 class Follow(models.Model):
@@ -98,85 +112,232 @@ class Follow(models.Model):
 class Transaction(models.Model):
     """ Represents a blockchain Transaction. """
 
+    class Meta:
+        constraints = [
+            # also backs lookups of txs being ingested or re-orged
+            models.UniqueConstraint(
+                fields=["tx_hash", "chain_id"],
+                name="one tx per hash and chain"
+            ),
+        ]
+        indexes = [
+            # txs of an address, newest first
+            models.Index(
+                fields=["from_address", "-block_signed_at"],
+                name="tx_from_address_idx"
+            ),
+            models.Index(
+                fields=["to_address", "-block_signed_at"],
+                name="tx_to_address_idx"
+            ),
+        ]
+
+
     chain_id = models.PositiveSmallIntegerField(blank=False)
-    tx_hash = models.CharField(max_length=255, blank=False) 
+    tx_hash = HashField(blank=False)
     block_signed_at = models.DateTimeField(blank=False)
-    from_address = models.CharField(max_length=255, blank=False)
-    to_address = models.CharField(max_length=255, blank=False)
-    value = models.CharField(max_length=255, blank=False)
+    from_address = AddressField(blank=False)
+    to_address = AddressField(blank=False)
+    value = UintField(blank=False)
+
+    def checksum_addresses(self):
+        """ Checksum encodes the ethereum addresses of the object. """
+
+        self.from_address = w3.toChecksumAddress(self.from_address)
+        self.to_address = w3.toChecksumAddress(self.to_address)
 
     def save(self, *args, **kwargs):
         """
         Override the save method to make sure the
         ethereum addresses are checksum encoded when written.
         """
-        self.from_address = w3.toChecksumAddress(self.from_address)
-        self.to_address = w3.toChecksumAddress(self.to_address)
+        self.checksum_addresses()
+        super().save(*args, **kwargs)
+
+
+class TokenContract(models.Model):
+    """ Represents the metadata of a token contract. """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["chain_id", "address"],
+                name="one token contract per address and chain"
+            ),
+        ]
+
+
+    chain_id = models.PositiveSmallIntegerField(blank=False)
+    address = models.CharField(max_length=255, blank=False)
+    name = models.CharField(max_length=255, blank=True)
+    symbol = models.CharField(max_length=255, blank=True)
+    decimals = models.PositiveSmallIntegerField(null=True, blank=True)
+    logo_url = models.URLField(blank=True)
+
+    def save(self, *args, **kwargs):
+        """
+        Override the save method to make sure the
+        ethereum address is checksum encoded when written.
+        """
+        self.address = w3.toChecksumAddress(self.address)
         super().save(*args, **kwargs)
 
 
 class ERC20Transfer(models.Model):
     """ Represents an ERC20 transfer. """
 
+    class Meta:
+        indexes = [
+            # transfers of an address
+            models.Index(
+                fields=["from_address"],
+                name="erc20_from_address_idx"
+            ),
+            models.Index(fields=["to_address"], name="erc20_to_address_idx"),
+        ]
+        constraints = [
+            # transfers stored before log indexes were kept have none
+            models.UniqueConstraint(
+                fields=["tx", "log_index"],
+                name="one erc20 transfer per log"
+            ),
+        ]
+
+
     tx = models.ForeignKey(
         to=Transaction,
         on_delete=models.CASCADE,
         related_name="erc20_transfers",
         blank=False
     )
-    contract_address = models.CharField(max_length=255, blank=False)
-    contract_name = models.CharField(max_length=255, blank=False)
-    contract_ticker = models.CharField(max_length=255, blank=False)
-    logo_url = models.URLField(blank=False)
-    from_address = models.CharField(max_length=255, blank=False)
-    to_address = models.CharField(max_length=255, blank=False)
-    amount = models.CharField(max_length=255, blank=False)
-    decimals = models.PositiveSmallIntegerField(blank=False)
+    contract = models.ForeignKey(
+        to=TokenContract,
+        on_delete=models.PROTECT,
+        related_name="erc20_transfers",
+        blank=False
+    )
+    contract_address = AddressField(blank=False)
+    from_address = AddressField(blank=False)
+    to_address = AddressField(blank=False)
+    amount = UintField(blank=False)
+    log_index = models.PositiveIntegerField(null=True)
+
+    def checksum_addresses(self):
+        """ Checksum encodes the ethereum addresses of the object. """
+
+        self.contract_address = w3.toChecksumAddress(self.contract_address)
+        self.from_address = w3.toChecksumAddress(self.from_address)
+        self.to_address = w3.toChecksumAddress(self.to_address)
 
     def save(self, *args, **kwargs):
         """
         Override the save method to make sure the
         ethereum addresses are checksum encoded when written.
         """
-        self.contract_address = w3.toChecksumAddress(self.contract_address)
-        self.from_address = w3.toChecksumAddress(self.from_address)
-        self.to_address = w3.toChecksumAddress(self.to_address)
+        self.checksum_addresses()
         super().save(*args, **kwargs)
 
 
 class ERC721Transfer(models.Model):
     """ Represents an ERC721 transfer. """
 
+    class Meta:
+        indexes = [
+            # transfers of an address
+            models.Index(
+                fields=["from_address"],
+                name="erc721_from_address_idx"
+            ),
+            models.Index(fields=["to_address"], name="erc721_to_address_idx"),
+        ]
+        constraints = [
+            # transfers stored before log indexes were kept have none
+            models.UniqueConstraint(
+                fields=["tx", "log_index"],
+                name="one erc721 transfer per log"
+            ),
+        ]
+
+
     tx = models.ForeignKey(
         to=Transaction,
         on_delete=models.CASCADE,
         related_name="erc721_transfers",
         blank=False
     )
-    contract_address = models.CharField(max_length=255, blank=False)
-    contract_name = models.CharField(max_length=255, blank=False)
-    contract_ticker = models.CharField(max_length=255, blank=False)
-    logo_url = models.URLField(blank=False)
-    from_address = models.CharField(max_length=255, blank=False)
-    to_address = models.CharField(max_length=255, blank=False)
-    token_id = models.CharField(max_length=255, blank=False)
+    contract = models.ForeignKey(
+        to=TokenContract,
+        on_delete=models.PROTECT,
+        related_name="erc721_transfers",
+        blank=False
+    )
+    contract_address = AddressField(blank=False)
+    from_address = AddressField(blank=False)
+    to_address = AddressField(blank=False)
+    token_id = UintField(blank=False)
+    log_index = models.PositiveIntegerField(null=True)
+
+    def checksum_addresses(self):
+        """ Checksum encodes the ethereum addresses of the object. """
+
+        self.contract_address = w3.toChecksumAddress(self.contract_address)
+        self.from_address = w3.toChecksumAddress(self.from_address)
+        self.to_address = w3.toChecksumAddress(self.to_address)
 
     def save(self, *args, **kwargs):
         """
         Override the save method to make sure the
         ethereum addresses are checksum encoded when written.
         """
-        self.contract_address = w3.toChecksumAddress(self.contract_address)
-        self.from_address = w3.toChecksumAddress(self.from_address)
-        self.to_address = w3.toChecksumAddress(self.to_address)
+        self.checksum_addresses()
         super().save(*args, **kwargs)
 
 
+class TxHistoryCursor(models.Model):
+    """
+    Tracks how far the tx history of an address has been ingested.
+    The history is walked from newest to oldest page by page,
+    `next_page` is the first page that has not been processed yet.
+    `latest_block_signed_at` is the time of the newest transaction seen,
+    transactions after it are fetched once the backfill is complete.
+    """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["address", "chain_id"],
+                name="one cursor per address and chain"
+            ),
+        ]
+
+
+    address = models.CharField(max_length=255, blank=False)
+    chain_id = models.PositiveSmallIntegerField(blank=False)
+    next_page = models.PositiveIntegerField(default=0)
+    backfill_complete = models.BooleanField(default=False)
+    latest_block_signed_at = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+
 class Post(models.Model):
     """ Represents a Post created by a user. """
 
     class Meta:
-        ordering = ["-created"]
+        ordering = ["-created", "-id"]
+        indexes = [
+            # pages of an author's posts
+            models.Index(
+                fields=["author", "-created", "-id"],
+                name="post_author_created_idx"
+            ),
+        ]
+        constraints = [
+            # one post of a tx per author, posts without a tx are unaffected
+            models.UniqueConstraint(
+                fields=["author", "refTx"],
+                name="one post per author and tx"
+            ),
+        ]
 
 
     author = models.ForeignKey(
@@ -205,13 +366,23 @@ class Post(models.Model):
         blank=False
     )
     created = models.DateTimeField(blank=False)
+    num_likes = models.PositiveIntegerField(default=0)
+    num_comments = models.PositiveIntegerField(default=0)
+    num_reposts = models.PositiveIntegerField(default=0)
 
 
 class PostLike(models.Model):
     """ Represents a Like for a Post. """
 
     class Meta:
-        ordering = ["-created"]
+        ordering = ["-created", "-id"]
+        indexes = [
+            # pages of a post's likes
+            models.Index(
+                fields=["post", "-created", "-id"],
+                name="postlike_post_created_idx"
+            ),
+        ]
         constraints = [
             # user cannot like a post twice
             models.UniqueConstraint(
@@ -238,7 +409,14 @@ class Comment(models.Model):
     """ Represents a Comment created by a user. """
 
     class Meta:
-        ordering = ["-created"]
+        ordering = ["-created", "-id"]
+        indexes = [
+            # pages of a post's comments
+            models.Index(
+                fields=["post", "-created", "-id"],
+                name="comment_post_created_idx"
+            ),
+        ]
 
 
     author = models.ForeignKey(
@@ -258,13 +436,14 @@ class Comment(models.Model):
         blank=True
     )
     created = models.DateTimeField(auto_now_add=True)
+    num_likes = models.PositiveIntegerField(default=0)
 
 
 class CommentLike(models.Model):
     """ Represents a Like for a Comment. """
 
     class Meta:
-        ordering = ["-created"]
+        ordering = ["-created", "-id"]
         constraints = [
             # user cannot like a comment twice
             models.UniqueConstraint(
@@ -291,7 +470,14 @@ class Notification(models.Model):
     """ Represents a Notification created for a user. """
 
     class Meta:
-        ordering = ["-created"]
+        ordering = ["-created", "-id"]
+        indexes = [
+            # pages of a user's notifications
+            models.Index(
+                fields=["user", "-created", "-id"],
+                name="notification_user_created_idx"
+            ),
+        ]
 
     
     user = models.ForeignKey(
@@ -440,6 +626,32 @@ class RepostEvent(models.Model):
     created = models.DateTimeField(auto_now_add=True)
 
 
+class MentionFanout(models.Model):
+    """
+    Tracks the progress of notifying every active user
+    that they were mentioned in a Post or Comment.
+    Active users are notified in order of id,
+    `last_profile_id` is the last one that was notified.
+    """
+    post = models.ForeignKey(
+        to=Post,
+        on_delete=models.CASCADE,
+        null=True
+    )
+    comment = models.ForeignKey(
+        to=Comment,
+        on_delete=models.CASCADE,
+        null=True
+    )
+    mentioned_by = models.ForeignKey(
+        to=Profile,
+        on_delete=models.CASCADE
+    )
+    last_profile_id = models.PositiveBigIntegerField(default=0)
+    done = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+
+
 class ActiveUserStats(models.Model):
     """
     Stores the number of active users for the day, week, and month,
@@ -0,0 +1,161 @@
+"""
+Module containing the logic of notifying users that they were mentioned.
+
+Mentioning everyone notifies every active user, which is done by jobs
+in chunks of profiles, each job enqueueing the one of the next chunk.
+Each chunk is written in one transaction along with the progress of
+its MentionFanout, so a job that dies part way can be resumed without
+notifying anyone twice.
+"""
+# std lib imports
+
+# third party imports
+from django.db import transaction
+from django.db.models import F
+
+# our imports
+from .jobs import notification_jobs
+from .models import Comment, MentionFanout, MentionedInCommentEvent, \
+                    MentionedInPostEvent, Notification, Post, Profile
+from . import redis_client
+
+
+chunk_size = 1000
+
+
+def _notify(instance, profile_ids, mentioned_by_id):
+    """
+    Tags the given profiles in the given Post or Comment
+    and notifies them, using a constant number of queries.
+    """
+    # tag the profiles
+    Through = type(instance).tagged_users.through
+    if isinstance(instance, Post):
+        Event = MentionedInPostEvent
+        through_kwargs = {"post_id": instance.pk}
+        event_kwargs = {"post_id": instance.pk}
+    else:
+        Event = MentionedInCommentEvent
+        through_kwargs = {"comment_id": instance.pk}
+        event_kwargs = {"comment_id": instance.pk}
+
+    Through.objects.bulk_create(
+        [Through(profile_id=pk, **through_kwargs) for pk in profile_ids],
+        ignore_conflicts=True
+    )
+
+    # notify them
+    notifs = Notification.objects.bulk_create(
+        [Notification(user_id=pk) for pk in profile_ids]
+    )
+    Event.objects.bulk_create([
+        Event(
+            notification=notif,
+            mentioned_by_id=mentioned_by_id,
+            **event_kwargs
+        )
+        for notif in notifs
+    ])
+    Profile.objects.filter(pk__in=profile_ids).update(
+        num_unread_notifications=F("num_unread_notifications") + 1
+    )
+
+
+def get_job_id(fanout):
+    """
+    Returns the id of the job that runs the next chunk
+    of the given MentionFanout.
+    """
+    return f"mention-fanout:{fanout.pk}:{fanout.last_profile_id}"
+
+
+def enqueue_fanout(fanout):
+    """ Enqueues a job that runs the next chunk of the given MentionFanout. """
+
+    queue = redis_client.RedisConnection().get_high_queue()
+    queue.enqueue(
+        notification_jobs.run_mention_fanout,
+        fanout.pk,
+        job_id=get_job_id(fanout)
+    )
+
+
+def tag_users(instance, profiles, mentioned_by, everyone=False):
+    """
+    Replaces the tagged users of the given Post or Comment
+    with the given profiles, and notifies them.
+    If everyone is tagged, all active users minus the author are
+    tagged and notified in the background instead.
+    """
+    instance.tagged_users.clear()
+
+    if not everyone:
+        profile_ids = set(profile.pk for profile in profiles)
+        _notify(instance, profile_ids, mentioned_by.pk)
+        return
+
+    # notify everyone in the background
+    fanout = MentionFanout.objects.create(
+        post=instance if isinstance(instance, Post) else None,
+        comment=instance if isinstance(instance, Comment) else None,
+        mentioned_by=mentioned_by
+    )
+    enqueue_fanout(fanout)
+
+
+def _run_chunk(fanout_id):
+    """
+    Tags and notifies the next chunk of active users of the given
+    MentionFanout, and saves its progress in the same transaction.
+    Returns False once there are no users left to notify.
+    """
+    with transaction.atomic():
+        # lock the fanout so that concurrent jobs do not notify users twice
+        fanout = MentionFanout.objects.select_for_update().get(pk=fanout_id)
+        if fanout.done:
+            return False
+
+        # get the next active users minus the author
+        profile_ids = list(
+            Profile.objects.exclude(user__last_login=None)
+            .exclude(pk=fanout.mentioned_by_id)
+            .filter(pk__gt=fanout.last_profile_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:chunk_size]
+        )
+
+        if profile_ids:
+            instance = fanout.post or fanout.comment
+            _notify(instance, profile_ids, fanout.mentioned_by_id)
+            fanout.last_profile_id = profile_ids[-1]
+        else:
+            fanout.done = True
+
+        fanout.save()
+
+    return not fanout.done
+
+
+def run_fanout(fanout_id):
+    """
+    Tags and notifies the next chunk of active users of the given
+    MentionFanout, resuming from the last user that was notified,
+    and enqueues a job for the chunk after it, so that each job
+    stays well within its timeout.
+    """
+    if _run_chunk(fanout_id):
+        enqueue_fanout(MentionFanout.objects.get(pk=fanout_id))
+
+
+def resume_fanouts():
+    """
+    Enqueues jobs for the MentionFanouts that are not done,
+    e.g. because their job died part way. Running a MentionFanout
+    that already has a job is safe, as chunks are locked.
+    Returns the number of jobs enqueued.
+    """
+    fanouts = MentionFanout.objects.filter(done=False)
+    for fanout in fanouts:
+        enqueue_fanout(fanout)
+
+    return len(fanouts)
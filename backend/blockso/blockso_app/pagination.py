@@ -4,14 +4,129 @@ Note: keeping pagination classes explicit even though there
 is redundant code.
 """
 # std lib imports
+from collections import OrderedDict
+import base64
+import binascii
 
 # third party imports
-from rest_framework.pagination import PageNumberPagination
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 # our imports
 
 
-class CommentPagination(PageNumberPagination):
+def encode_cursor(position):
+    """ Returns an opaque cursor of the given (created, id) position. """
+
+    created, pk = position
+    value = f"{created.isoformat()}|{pk}"
+
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Returns the (created, id) position of the given cursor.
+    Raises ValueError if the cursor is invalid.
+    """
+    try:
+        value = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created, pk = value.split("|")
+        created = parse_datetime(created)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("invalid cursor")
+
+    if created is None:
+        raise ValueError("invalid cursor")
+
+    return created, pk
+
+
+def filter_after(queryset, position):
+    """
+    Returns the given queryset sorted from newest to oldest by
+    (created, id), starting after the given position if there is one.
+    """
+    queryset = queryset.order_by("-created", "-id")
+    if position is None:
+        return queryset
+
+    created, pk = position
+    return queryset.filter(created__lte=created).filter(
+        Q(created__lt=created) | Q(id__lt=pk)
+    )
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination that lists objects from newest to oldest by (created, id),
+    and pages through them with an opaque cursor of the last object of
+    a page instead of an offset. Deep pages cost as much as the first,
+    and objects created meanwhile do not shift the pages.
+    The count of all the objects is only given if count=true is given,
+    as counting costs as much as listing all of them.
+    Querysets can provide their own paging with a get_page method.
+    """
+    page_size = 20
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+
+        # get the position to start after
+        position = None
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+            except ValueError:
+                raise NotFound("Invalid cursor.")
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) == "true":
+            self.count = queryset.count()
+
+        # get one more object to know whether there is a next page
+        size = self.page_size + 1
+        if hasattr(queryset, "get_page"):
+            objects = queryset.get_page(position, size)
+        else:
+            objects = list(filter_after(queryset, position)[:size])
+
+        self.next_position = None
+        if len(objects) > self.page_size:
+            objects = objects[:self.page_size]
+            self.next_position = (objects[-1].created, objects[-1].id)
+
+        return objects
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response["count"] = self.count
+        response["next"] = self.get_next_link()
+        response["results"] = data
+
+        return Response(response)
+
+
+class CommentPagination(KeysetPagination):
     """
     Pagination for listing Comments.
     """
@@ -19,7 +134,7 @@ class CommentPagination(PageNumberPagination):
     max_page_size = 5 
 
 
-class LikesPagination(PageNumberPagination):
+class LikesPagination(KeysetPagination):
     """
     Pagination for listing Likes.
     """
@@ -27,7 +142,7 @@ class LikesPagination(PageNumberPagination):
     max_page_size = 5 
 
 
-class NotificationPagination(PageNumberPagination):
+class NotificationPagination(KeysetPagination):
     """
     Pagination for listing Notifications.
     """
@@ -35,7 +150,7 @@ class NotificationPagination(PageNumberPagination):
     max_page_size = 20 
 
 
-class PostsPagination(PageNumberPagination):
+class PostsPagination(KeysetPagination):
     """
     Pagination for listing Posts.
     """
@@ -51,7 +166,7 @@ class FeedPagination(PageNumberPagination):
     max_page_size = 8
 
 
-class FeedItemsPagination(PageNumberPagination):
+class FeedItemsPagination(KeysetPagination):
     """
     Pagination for user's feed.
     """
@@ -1,30 +1,143 @@
 """
 Module containing singleton of connection to redis backend.
+
+The web processes and the workers share one client per process,
+backed by a bounded connection pool, along with the rq queues
+that use it. Callers wait for a free connection when every
+connection of the pool is in use, and the pool keeps count of
+how long they waited.
 """
 # std lib imports
+import time
 
 # third party imports
 from django.conf import settings
 import redis
+import redis.asyncio
 import rq
 
 # our imports
 
 
+class MeteredConnectionPool(redis.BlockingConnectionPool):
+    """
+    Connection pool that blocks while all its connections are in use,
+    and records how many connections were handed out and how long
+    callers waited for them.
+    """
+
+    def reset(self):
+        super().reset()
+        self.num_checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def get_connection(self, command_name, *keys, **options):
+        start = time.monotonic()
+        try:
+            return super().get_connection(command_name, *keys, **options)
+        finally:
+            waited = time.monotonic() - start
+            self.num_checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def get_stats(self):
+        """ Returns a dict of the usage metrics of the pool. """
+
+        num_idle = sum(1 for conn in self.pool.queue if conn is not None)
+
+        return {
+            "max_connections": self.max_connections,
+            "created_connections": len(self._connections),
+            "in_use_connections": len(self._connections) - num_idle,
+            "checkouts": self.num_checkouts,
+            "wait_seconds": self.wait_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+
+def get_pool_options():
+    """ Returns the options of the connection pools to settings.REDIS_URL. """
+
+    options = {
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+        "timeout": settings.REDIS_POOL_TIMEOUT,
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+        "socket_keepalive": True,
+    }
+
+    # rediss:// urls connect over TLS
+    if settings.REDIS_URL.startswith("rediss://"):
+        options["ssl_cert_reqs"] = settings.REDIS_SSL_CERT_REQS
+
+    return options
+
+
+def create_client():
+    """
+    Returns a redis client for settings.REDIS_URL,
+    backed by a new MeteredConnectionPool.
+    """
+    pool = MeteredConnectionPool.from_url(
+        settings.REDIS_URL,
+        **get_pool_options()
+    )
+
+    return redis.Redis(connection_pool=pool)
+
+
+def create_async_client():
+    """
+    Returns an asyncio redis client for settings.REDIS_URL,
+    for use by the ASGI apps, backed by a new blocking connection pool.
+    """
+    pool = redis.asyncio.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        **get_pool_options()
+    )
+
+    return redis.asyncio.Redis(connection_pool=pool)
+
+
 class RedisConnection():
     """ Singleton for redis connection. """
 
     def __new__(cls):
         if not hasattr(cls, 'instance'):
-          cls.instance = super(RedisConnection, cls).__new__(cls)
+            cls.instance = super(RedisConnection, cls).__new__(cls)
+            cls.instance.connect()
 
         return cls.instance
 
-    def __init__(self):
-        self.redis_client = redis.from_url(settings.REDIS_URL)
+    def connect(self):
+        """ Creates the shared redis client and rq queues. """
+
+        self.redis_client = create_client()
+        self.high_queue = rq.Queue(name='high', connection=self.redis_client)
+        self.tx_processing_queue = rq.Queue(
+            'tx_processing',
+            connection=self.redis_client
+        )
 
     def get_high_queue(self):
-        return rq.Queue(name='high', connection=self.redis_client)
+        return self.high_queue
 
     def get_tx_processing_queue(self):
-        return rq.Queue('tx_processing', connection=self.redis_client)
+        return self.tx_processing_queue
+
+    def get_queue(self, name):
+        """ Returns an rq queue with the given name on the shared client. """
+
+        return rq.Queue(name, connection=self.redis_client)
+
+    def get_pool_stats(self):
+        """
+        Returns a dict of the usage metrics of the connection pool,
+        or an empty dict if the client does not use a metered pool.
+        """
+        pool = self.redis_client.connection_pool
+        if not isinstance(pool, MeteredConnectionPool):
+            return {}
+
+        return pool.get_stats()
@@ -2,6 +2,7 @@
 This module contains python dictionaries representing
 the request data that our webhook receives from Alchemy Notify.
 """
+import copy
 
 # a simple external ETH transfer
 eth_transfer = {
@@ -207,3 +208,14 @@ reorged_erc721_transfer = {
     }
 }
 
+
+def get_eth_transfer(event_id):
+    """
+    Returns a copy of eth_transfer with the given event id,
+    used as its tx hash as well, e.g. to make unique deliveries.
+    """
+    data = copy.deepcopy(eth_transfer)
+    data["id"] = event_id
+    data["event"]["activity"][0]["hash"] = event_id
+
+    return data
@@ -1,9 +1,10 @@
 # std lib imports
 from datetime import datetime, timezone
+from functools import cached_property
 
 # third party imports
-from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 from rest_framework.fields import ModelField
 from rest_framework import serializers
 from web3 import Web3
@@ -14,13 +15,78 @@ from .models import Comment, CommentLike, CommentOnPostEvent, ERC20Transfer, \
         LikedPostEvent, MentionedInCommentEvent, MentionedInPostEvent, \
         Notification, Post, PostLike, Profile, RepostEvent, Socials, \
         Transaction
-from . import alchemy
+from . import notifications, timelines, utils, watchlist
 
 
 UserModel = get_user_model()
 TaggedEveryone = "everyone"
 
 
+def get_authed_profile(request):
+    """
+    Returns the profile of the authenticated user of the request,
+    None if there is no request or the user is not signed in.
+    """
+    if request is None:
+        return None
+
+    return getattr(request.user, "profile", None)
+
+
+class AuthedRelations():
+    """
+    Ids of the profiles and feeds the authenticated user follows,
+    and of the posts and comments they liked or reposted.
+    Each set is loaded with one query the first time it is needed.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    @cached_property
+    def followed_profile_ids(self):
+        return set(Follow.objects.filter(src=self.profile)
+                   .order_by().values_list("dest_id", flat=True))
+
+    @cached_property
+    def followed_feed_ids(self):
+        return set(self.profile.feeds_they_follow
+                   .order_by().values_list("id", flat=True))
+
+    @cached_property
+    def liked_post_ids(self):
+        return set(PostLike.objects.filter(liker=self.profile)
+                   .order_by().values_list("post_id", flat=True))
+
+    @cached_property
+    def reposted_post_ids(self):
+        return set(Post.objects.filter(author=self.profile, isShare=True)
+                   .order_by().values_list("refPost_id", flat=True))
+
+    @cached_property
+    def liked_comment_ids(self):
+        return set(CommentLike.objects.filter(liker=self.profile)
+                   .order_by().values_list("comment_id", flat=True))
+
+
+def get_authed_relations(request):
+    """
+    Returns the AuthedRelations of the authenticated user of the request,
+    shared by every serializer of the request, None if there is no
+    request or the user is not signed in.
+    """
+    profile = get_authed_profile(request)
+    if profile is None:
+        return None
+
+    relations = getattr(request, "authed_relations", None)
+    if relations is None or relations.profile != profile:
+        relations = AuthedRelations(profile)
+        request.authed_relations = relations
+
+    return relations
+
+
 class SocialsSerializer(serializers.ModelSerializer):
     """ Socials model serializer. """
 
@@ -51,17 +117,24 @@ class ProfileSerializer(serializers.ModelSerializer):
         user = getattr(obj, "user")
         return user.ethereum_address
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Returns the given Profile queryset loaded with everything
+        the serializer needs, so that serializing a list of profiles
+        does not run queries per profile.
+        """
+        return queryset.select_related("user", "socials")
+
     def get_num_followers(self, obj):
         """ Returns the profile's follower count. """
 
-        followers = obj.follow_dest.all()
-        return followers.count() 
+        return obj.num_followers
 
     def get_num_following(self, obj):
         """ Returns the profile's following count. """
 
-        following = obj.follow_src.all()
-        return following.count() 
+        return obj.num_following
 
     def get_followed_by_me(self, obj):
         """ Returns whether the profile is being followed by the requestor. """
@@ -71,14 +144,12 @@ class ProfileSerializer(serializers.ModelSerializer):
         if request is None:
             return None
 
-        # get authed user
-        authed_user = request.user
-        authed_user = getattr(authed_user, "profile", None)
-        if authed_user is None:
+        # handle anonymous users, i.e. not signed in
+        relations = get_authed_relations(request)
+        if relations is None:
             return False
 
-        # check if authed user follows the profile
-        return Follow.objects.filter(src=authed_user, dest=obj).exists()
+        return obj.id in relations.followed_profile_ids
 
     def get_last_login(self, obj):
         """ Returns the profile's last login datetime. """
@@ -135,6 +206,19 @@ class UserSerializer(serializers.ModelSerializer):
         return obj.ethereum_address
 
 
+class UserSearchSerializer(serializers.ModelSerializer):
+    """
+    Profile model serializer for search results,
+    with just what is needed to suggest a user.
+    """
+
+    class Meta:
+        model = Profile
+        fields = ["address", "image"]
+
+    address = serializers.CharField(source="user_id")
+
+
 class FollowSerializer(serializers.ModelSerializer):
     """ Follow model serializer. """
 
@@ -160,17 +244,26 @@ class FollowSerializer(serializers.ModelSerializer):
             src=user,
             dest=to_follow
         )
+        utils.increment(Profile, user.pk, "num_following")
+        utils.increment(Profile, to_follow.pk, "num_followers")
 
         # notify the user that was followed
         notif = Notification.objects.create(user=to_follow)
+        utils.increment(Profile, to_follow.pk, "num_unread_notifications")
         FollowedEvent.objects.create(
             notification=notif,
             follow=follow,
             followed_by=user
         )
 
-        # make a request to Alchemy to update the Notify webhook
-        alchemy.update_notify_webhook()
+        # add the followed user's posts to the home timeline
+        timelines.add_authors(
+            [timelines.get_home_timeline(user.pk)],
+            [to_follow.pk]
+        )
+
+        # watch the followed user's address with the Notify webhook
+        watchlist.update([to_follow.user_id])
 
         return follow
 
@@ -206,12 +299,12 @@ class FeedSerializer(serializers.ModelSerializer):
     def get_num_followers(self, obj):
         """ Returns the Feed's follower count. """
 
-        return obj.followers.all().count()
+        return obj.num_followers
 
     def get_num_following(self, obj):
         """ Returns the Feed's following count. """
 
-        return obj.following.all().count()
+        return obj.num_following
 
     def get_followed_by_me(self, obj):
         """ Returns whether the Feed is followed by the requestor. """
@@ -221,14 +314,12 @@ class FeedSerializer(serializers.ModelSerializer):
         if request is None:
             return None
 
-        # get authed user
-        authed_user = request.user
-        authed_user = getattr(authed_user, "profile", None)
-        if authed_user is None:
+        # handle anonymous users, i.e. not signed in
+        relations = get_authed_relations(request)
+        if relations is None:
             return False
 
-        # check if authed user follows the Feed
-        return obj.followers.filter(pk=authed_user.id).exists()
+        return obj.id in relations.followed_feed_ids
 
     def create(self, validated_data):
         """ Creates a Feed. """
@@ -236,9 +327,10 @@ class FeedSerializer(serializers.ModelSerializer):
         # get user from the session
         owner = self.context.get("request").user.profile
 
-        # create Feed
+        # create Feed, followed by its owner
         feed = Feed.objects.create(
             owner=owner,
+            num_followers=1,
             **validated_data
         )
         feed.followers.add(owner)
@@ -256,6 +348,23 @@ class ERC20TransferSerializer(serializers.ModelSerializer):
                   "decimals"]
         read_only_fields = fields
 
+    contract_name = serializers.CharField(
+        source="contract.name",
+        read_only=True
+    )
+    contract_ticker = serializers.CharField(
+        source="contract.symbol",
+        read_only=True
+    )
+    logo_url = serializers.CharField(
+        source="contract.logo_url",
+        read_only=True
+    )
+    decimals = serializers.IntegerField(
+        source="contract.decimals",
+        read_only=True
+    )
+
 
 class ERC721TransferSerializer(serializers.ModelSerializer):
     """ ERC721Transfer model serializer. """
@@ -266,6 +375,19 @@ class ERC721TransferSerializer(serializers.ModelSerializer):
                   "logo_url", "from_address", "to_address", "token_id"]
         read_only_fields = fields
 
+    contract_name = serializers.CharField(
+        source="contract.name",
+        read_only=True
+    )
+    contract_ticker = serializers.CharField(
+        source="contract.symbol",
+        read_only=True
+    )
+    logo_url = serializers.CharField(
+        source="contract.logo_url",
+        read_only=True
+    )
+
 
 class TransactionSerializer(serializers.ModelSerializer):
     """ Transaction model serializer. """
@@ -367,20 +489,48 @@ class PostSerializer(serializers.ModelSerializer):
         write_only=True
     )
 
+    @staticmethod
+    def setup_eager_loading(queryset, depth=2):
+        """
+        Returns the given Post queryset prefetched with everything
+        the serializer needs, so that serializing a page of posts
+        runs a constant number of queries.
+        Referenced posts are loaded the same way, `depth` levels deep.
+        """
+        queryset = queryset.select_related("refTx").prefetch_related(
+            Prefetch(
+                "author",
+                queryset=ProfileSerializer.setup_eager_loading(
+                    Profile.objects.all()
+                )
+            ),
+            "refTx__erc20_transfers__contract",
+            "refTx__erc721_transfers__contract",
+        )
+
+        # load the referenced posts the same way
+        if depth > 0:
+            queryset = queryset.prefetch_related(Prefetch(
+                "refPost",
+                queryset=PostSerializer.setup_eager_loading(
+                    Post.objects.all(), depth - 1
+                )
+            ))
+
+        return queryset
+
     def get_refTx(self, instance):
         """ Return serialized transaction that the post refers to. """
 
         if instance.refTx is not None:
-            return TransactionSerializer(
-                Transaction.objects.get(pk=instance.refTx.id)
-            ).data
+            return TransactionSerializer(instance.refTx).data
 
         return None
 
     def get_numLikes(self, instance):
         """ Returns number of likes on the post. """
 
-        return instance.likes.count()
+        return instance.num_likes
 
     def get_likedByMe(self, instance):
         """ Returns whether the authenticated user liked the post. """
@@ -391,21 +541,21 @@ class PostSerializer(serializers.ModelSerializer):
             return False
 
         # handle anonymous users, i.e. not signed in
-        if isinstance(request.user, AnonymousUser):
+        relations = get_authed_relations(request)
+        if relations is None:
             return False
 
-        user = request.user.profile
-        return instance.likes.filter(liker=user).exists()
+        return instance.id in relations.liked_post_ids
 
     def get_numComments(self, instance):
         """ Returns number of comments on the post. """
 
-        return instance.comments.count()
+        return instance.num_comments
 
     def get_numReposts(self, instance):
         """ Returns number of reposts for the post. """
 
-        return Post.objects.filter(refPost=instance).count()
+        return instance.num_reposts
 
     def get_repostedByMe(self, instance):
         """ Returns whether the post has been reposted by the authed user. """
@@ -416,14 +566,11 @@ class PostSerializer(serializers.ModelSerializer):
             return False
 
         # handle anonymous users, i.e. not signed in
-        if isinstance(request.user, AnonymousUser):
+        relations = get_authed_relations(request)
+        if relations is None:
             return False
 
-        return Post.objects.filter(
-            refPost_id=instance.id,
-            isShare=True,
-            author=request.user.profile
-        ).exists()
+        return instance.id in relations.reposted_post_ids
 
     def _handle_repost(self, author, created, ref_post):
         """
@@ -450,15 +597,24 @@ class PostSerializer(serializers.ModelSerializer):
             isQuote=False,
             refTx=None
         )
+        utils.increment(Post, ref_post.pk, "num_reposts")
 
         # notify the original post author about the repost
         notif = Notification.objects.create(user=ref_post.author)
+        utils.increment(
+            Profile,
+            ref_post.author_id,
+            "num_unread_notifications"
+        )
         RepostEvent.objects.create(
             notification=notif,
             repost=post,
             reposted_by=author
         )
 
+        # fan out the repost to the timelines
+        timelines.add_posts([post])
+
         return post
 
     def create(self, validated_data):
@@ -491,24 +647,18 @@ class PostSerializer(serializers.ModelSerializer):
             **validated_data
         )
 
-        # set tagged users
-        # if everyone is tagged then tag all active users minus post author
-        if TaggedEveryone in tagged_users:
-            tagged_users = Profile.objects.all()\
-                .exclude(user__last_login=None)\
-                .exclude(id=author.id)
-
-        post.tagged_users.set(tagged_users)
-        post.save()
-
-        # create a notifications for the tagged users
-        for profile in tagged_users:
-            notif = Notification.objects.create(user=profile)
-            MentionedInPostEvent.objects.create(
-                notification=notif,
-                post=post,
-                mentioned_by=author
-            )
+        # tag and notify the tagged users
+        # if everyone is tagged then all active users minus post author
+        # are tagged in the background
+        notifications.tag_users(
+            post,
+            tagged_users,
+            author,
+            everyone=TaggedEveryone in tagged_users
+        )
+
+        # fan out the post to the timelines
+        timelines.add_posts([post])
 
         return post
 
@@ -518,30 +668,23 @@ class PostSerializer(serializers.ModelSerializer):
         # extract any tagged users
         tagged_users = validated_data.pop("tagged_users")
 
-        # if everyone is tagged then tag all active users minus post author
-        if TaggedEveryone in tagged_users:
-            tagged_users = Profile.objects.all()\
-                .exclude(user__last_login=None)\
-                .exclude(id=author.id)
-
         # update other attributes
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
-        # set tagged users
-        instance.tagged_users.set(tagged_users)
+        # save the changes
+        instance.save()
 
-        # create a notifications for the tagged users
-        for profile in tagged_users:
-            notif = Notification.objects.create(user=profile)
-            MentionedInPostEvent.objects.create(
-                notification=notif,
-                post=instance,
-                mentioned_by=instance.author
-            )
+        # tag and notify the tagged users
+        # if everyone is tagged then all active users minus post author
+        # are tagged in the background
+        notifications.tag_users(
+            instance,
+            tagged_users,
+            instance.author,
+            everyone=TaggedEveryone in tagged_users
+        )
 
-        # save the changes and return them
-        instance.save()
         return instance
 
 
@@ -576,8 +719,11 @@ class PostLikeSerializer(serializers.ModelSerializer):
         if created is False:
             raise serializers.ValidationError("Cannot like a post twice.")
 
+        utils.increment(Post, post.pk, "num_likes")
+
         # notify the post author that the user liked their post
         notif = Notification.objects.create(user=post.author)
+        utils.increment(Profile, post.author_id, "num_unread_notifications")
         LikedPostEvent.objects.create(
             notification=notif,
             post=post,
@@ -618,7 +764,7 @@ class CommentSerializer(serializers.ModelSerializer):
     def get_numLikes(self, instance):
         """ Returns number of likes on the comment. """
 
-        return instance.likes.count()
+        return instance.num_likes
 
     def get_likedByMe(self, instance):
         """ Returns whether the authenticated user liked the comment. """
@@ -629,11 +775,11 @@ class CommentSerializer(serializers.ModelSerializer):
             return False
 
         # handle anonymous users, i.e. not signed in
-        if isinstance(request.user, AnonymousUser):
+        relations = get_authed_relations(request)
+        if relations is None:
             return False
 
-        user = request.user.profile
-        return instance.likes.filter(liker=user).exists()
+        return instance.id in relations.liked_comment_ids
 
     def create(self, validated_data):
         """ Creates a Comment. """
@@ -649,24 +795,17 @@ class CommentSerializer(serializers.ModelSerializer):
         # extract any tagged users
         tagged_users = validated_data.pop("tagged_users")
 
-        # if everyone is tagged then tag all active users minus comment author
-        if TaggedEveryone in tagged_users:
-            tagged_users = Profile.objects.all()\
-                .exclude(user__last_login=None)\
-                .exclude(id=author.id)
-
         # create Comment
         comment = Comment.objects.create(
             author=author,
             post=post,
             **validated_data
         )
-
-        comment.tagged_users.set(tagged_users)
-        comment.save()
+        utils.increment(Post, post.pk, "num_comments")
 
         # create a notification for the post author
         notif = Notification.objects.create(user=post.author)
+        utils.increment(Profile, post.author_id, "num_unread_notifications")
         CommentOnPostEvent.objects.create(
             notification=notif,
             comment=comment,
@@ -674,14 +813,15 @@ class CommentSerializer(serializers.ModelSerializer):
             commentor=author
         )
 
-        # create a notifications for the tagged users
-        for profile in tagged_users:
-            notif = Notification.objects.create(user=profile)
-            MentionedInCommentEvent.objects.create(
-                notification=notif,
-                comment=comment,
-                mentioned_by=author
-            )
+        # tag and notify the tagged users
+        # if everyone is tagged then all active users minus comment author
+        # are tagged in the background
+        notifications.tag_users(
+            comment,
+            tagged_users,
+            author,
+            everyone=TaggedEveryone in tagged_users
+        )
 
         return comment
 
@@ -717,8 +857,15 @@ class CommentLikeSerializer(serializers.ModelSerializer):
         if created is False:
             raise serializers.ValidationError("Cannot like a comment twice.")
 
+        utils.increment(Comment, comment.pk, "num_likes")
+
         # notify the comment author that the user liked their comment
         notif = Notification.objects.create(user=comment.author)
+        utils.increment(
+            Profile,
+            comment.author_id,
+            "num_unread_notifications"
+        )
         LikedCommentEvent.objects.create(
             notification=notif,
             comment=comment,
@@ -815,7 +962,7 @@ class LikedCommentEventSerializer(serializers.ModelSerializer):
     def get_post(self, obj):
         """ Returns the post of the comment that was liked. """
 
-        return obj.comment.post.id
+        return obj.comment.post_id
 
 
 class LikedPostEventSerializer(serializers.ModelSerializer):
@@ -860,6 +1007,41 @@ class NotificationSerializer(serializers.ModelSerializer):
 
     events = serializers.SerializerMethodField("get_events")
 
+    # reverse one-to-one of each event type, and the profile that caused it
+    event_profiles = {
+        "mentioned_in_post_event": "mentioned_by",
+        "mentioned_in_comment_event": "mentioned_by",
+        "comment_on_post_event": "commentor",
+        "followed_event": "followed_by",
+        "repost_event": "reposted_by",
+        "liked_post_event": "liked_by",
+        "liked_comment_event": "liked_by",
+    }
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Returns the given Notification queryset with all of its events
+        and the profiles that caused them loaded, so that serializing a
+        page of notifications runs a constant number of queries.
+        """
+        events = NotificationSerializer.event_profiles
+        profiles = ProfileSerializer.setup_eager_loading(
+            Profile.objects.all()
+        )
+
+        # join every event type, notifications without one get None
+        queryset = queryset.select_related(
+            *events,
+            "mentioned_in_comment_event__comment",
+            "liked_comment_event__comment",
+        )
+
+        # load the profiles of each event type in one query
+        return queryset.prefetch_related(*[
+            Prefetch(f"{event}__{field}", queryset=profiles)
+            for event, field in events.items()
+        ])
 
     def get_events(self, obj):
         """ Returns the events associated with the notification. """
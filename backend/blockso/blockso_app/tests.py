@@ -1,7 +1,10 @@
 # std lib imports
 from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from unittest import mock
 import json
+import threading
+import time
 import pytz
 
 # third party imports
@@ -9,25 +12,41 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.sessions.models import Session
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.test.client import MULTIPART_CONTENT, encode_multipart, BOUNDARY
+from eth_abi import encode_single
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
 from rest_framework.test import APITestCase
 from siwe_auth.models import Nonce
 from siwe.siwe import SiweMessage
-from web3.datastructures import AttributeDict
 import eth_account
 import fakeredis
+import fakeredis.aioredis
+import requests
+import redis
 import responses
 import rq
 
 # our imports
-from .jobs import alchemy_jobs, covalent_jobs
+from .jobs import alchemy_jobs, covalent_jobs, notification_jobs, \
+                  timeline_jobs
+from .blocks import block_timestamps
 from .models import Feed, Follow, Post, Profile, Transaction, \
-                    ERC20Transfer, ERC721Transfer, Notification, \
-                    MentionedInCommentEvent, MentionedInPostEvent
+                    TokenContract, TxHistoryCursor, ERC20Transfer, ERC721Transfer, Notification, \
+                    MentionedInCommentEvent, MentionedInPostEvent, \
+                    MentionFanout, FollowedEvent
+from .redis_client import MeteredConnectionPool, create_client
+from .webhooks import AlchemyWebhookApp
 from .samples import alchemy_notify_samples
-from .views import get_expected_alchemy_sig
-from .web3_client import w3
-from . import alchemy, redis_client
+from .tokens import token_registry
+from .web3_client import BatchRequest, RPCError, w3
+from . import alchemy, batch_worker, blocks, explore, notifications, \
+              pagination, redis_client, serializers, timelines, watchlist, \
+              webhooks, web3_client
 
 
 UserModel = get_user_model()
@@ -99,11 +118,17 @@ class BaseTest(APITestCase):
 
         # mock redis backend for use in tests 
         self.redis_backend = fakeredis.FakeRedis()
-        redis_patcher = mock.patch(
-            "redis.from_url",
+        redis_patcher = mock.patch.object(
+            redis_client,
+            "create_client",
             return_value=self.redis_backend
         )
         redis_patcher.start()
+        redis_client.RedisConnection().connect()
+
+        # start from empty in-process caches
+        block_timestamps.clear()
+        token_registry.clear()
 
         # fake requests/responses
         self.mock_responses = responses.RequestsMock()
@@ -217,6 +242,32 @@ class BaseTest(APITestCase):
 
         return signers
 
+    def _run_fanout_job(self, fanout):
+        """
+        Utility function to run the queued jobs of the given
+        MentionFanout, one chunk each, until it is done.
+        Returns the number of jobs that were run.
+        """
+        queue = rq.Queue(connection=self.redis_backend, name="high")
+        num_jobs = 0
+        fanout.refresh_from_db()
+        while not fanout.done:
+            job = queue.fetch_job(notifications.get_job_id(fanout))
+            job.perform()
+            num_jobs += 1
+            fanout.refresh_from_db()
+
+        return num_jobs
+
+    def _run_watch_sync_job(self):
+        """
+        Utility function to run the queued job that syncs
+        the watched addresses with the Alchemy Notify webhook.
+        """
+        queue = rq.Queue(connection=self.redis_backend, name="high")
+        job = queue.fetch_job(alchemy.sync_job_id)
+        job.perform()
+
     def _update_profile(self, signer):
         """
         Utility function to create a Profile using
@@ -562,6 +613,47 @@ class ProfileTests(BaseTest):
             self.test_signer.address
         )
 
+    def test_get_suggested_users_ignores_case(self):
+        """
+        Assert that users are matched by address prefix regardless
+        of case, and are returned with just their address and image.
+        """
+        # prepare test
+        self._do_login(self.test_signer)
+
+        # make request
+        query = self.test_signer.address[:10].lower()
+        resp = self.client.get(f"/api/users/?q={query}")
+
+        # make assertions
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["count"], 1)
+        self.assertEqual(
+            resp.data["results"][0],
+            {"address": self.test_signer.address, "image": ""}
+        )
+
+    def test_get_suggested_users_by_bio(self):
+        """
+        Assert that users are matched by their bio if bio=true is given.
+        """
+        # prepare test
+        self._do_login(self.test_signer_2)
+        self._do_login(self.test_signer)
+        Profile.objects.filter(user_id=self.test_signer_2.address)\
+            .update(bio="Builder of Blockso")
+
+        # make requests
+        resp = self.client.get("/api/users/?q=blockso&bio=true")
+        no_bio_resp = self.client.get("/api/users/?q=blockso")
+
+        # make assertions
+        self.assertEqual(
+            [user["address"] for user in resp.data["results"]],
+            [self.test_signer_2.address]
+        )
+        self.assertEqual(no_bio_resp.data["results"], [])
+
     def test_get_suggested_users_pagination(self):
         """
         Assert that suggested users are paginated.
@@ -586,14 +678,6 @@ class FollowTests(BaseTest):
     Tests follow related behavior.
     """
 
-    def setUp(self):
-        """ Runs before each test. """
-
-        super().setUp()
-
-        # mock out the request to alchemy
-        self.mock_responses.add(responses.PUT, alchemy.url)
-
     def test_follow(self):
         """
         Assert that a user can follow another.
@@ -737,22 +821,13 @@ class FollowTests(BaseTest):
                 signers[4-i].address
             )
 
-    def test_follow_update_alchemy_wh(self):
+    def _mock_watch_sync(self, to_add, to_remove):
         """
-        Assert that a request is made to update the addresses
-        in Alchemy Notify when a user is followed.
+        Utility function to set up a mock response that asserts
+        that the Notify webhook is updated with the given changes.
         """
-        # create 5 users and log them in
-        expected = []
-        signers = self._create_users(5)
-        for i in range(len(signers)):
-            self._do_login(signers[i])
-            expected.append(signers[i].address)
-        
-        # set up a mock response that asserts that the request
-        # to alchemy was made with the expected parameters
-        self.mock_responses.replace(
-            responses.PUT,
+        self.mock_responses.add(
+            responses.PATCH,
             alchemy.url,
             match=[
                 responses.matchers.header_matcher(
@@ -761,16 +836,195 @@ class FollowTests(BaseTest):
                 responses.matchers.json_params_matcher(
                     {
                         "webhook_id": settings.ALCHEMY_WH_ID,
-                        "addresses": expected
+                        "addresses_to_add": sorted(to_add),
+                        "addresses_to_remove": sorted(to_remove)
                     }
                 )
             ]
         )
 
+    def test_follow_update_alchemy_wh(self):
+        """
+        Assert that the addresses that start being watched are
+        added to Alchemy Notify, in one request per queued sync.
+        """
+        # create 5 users and log them in
+        expected = []
+        signers = self._create_users(5)
+        for i in range(len(signers)):
+            self._do_login(signers[i])
+            expected.append(signers[i].address)
+
         # make user 1 follow user 2
         self._do_login(signers[0])
         self._follow_user(signers[1].address)
 
+        # the logins and the follow are synced in one request
+        self._mock_watch_sync(expected, [])
+        self._run_watch_sync_job()
+        self.assertEqual(
+            self.redis_backend.smembers(alchemy.watched_key),
+            set(address.encode() for address in expected)
+        )
+
+        # a second sync sends nothing, as nothing changed
+        self.assertEqual(alchemy.sync_watched_addresses(), ([], []))
+
+    def test_unfollow_update_alchemy_wh(self):
+        """
+        Assert that the address of a user that is not watched anymore
+        is removed from Alchemy Notify when the user is unfollowed.
+        """
+        # make user 1 follow a user that never logged in
+        address = "0xFE3B557E8Fb62b89F4916B721be55cEb828dBd73"
+        user = get_user_model().objects.create(ethereum_address=address)
+        Profile.objects.create(user=user)
+        self._do_login(self.test_signer)
+        self._follow_user(address)
+        self._mock_watch_sync([self.test_signer.address, address], [])
+        self._run_watch_sync_job()
+
+        # unfollow them
+        resp = self.client.delete(f"/api/{address}/follow/")
+        self.assertEqual(resp.status_code, 204)
+
+        # assert that only their address is removed
+        self._mock_watch_sync([], [address])
+        self._run_watch_sync_job()
+        self.assertEqual(
+            self.redis_backend.smembers(alchemy.watched_key),
+            {self.test_signer.address.encode()}
+        )
+
+    def test_watch_sync_retries_failed_request(self):
+        """
+        Assert that the addresses of a failed sync are synced again
+        by the next one.
+        """
+        # queue a sync, which is flagged as queued for its timeout
+        self._do_login(self.test_signer)
+        self.assertLessEqual(
+            self.redis_backend.ttl(alchemy.sync_queued_key),
+            alchemy.sync_timeout
+        )
+
+        # make the request to alchemy fail, while a change is made
+        def fail(request):
+            alchemy.queue_watch_sync([self.test_signer.address])
+            return (500, {}, "")
+
+        self.mock_responses.add_callback(responses.PATCH, alchemy.url, fail)
+        with self.assertRaises(requests.HTTPError):
+            self._run_watch_sync_job()
+
+        # assert that the next change can queue a sync
+        self.assertFalse(self.redis_backend.exists(alchemy.sync_queued_key))
+
+        # assert that the next sync sends the address again
+        self._mock_watch_sync([self.test_signer.address], [])
+        self.assertEqual(
+            alchemy.sync_watched_addresses(),
+            ([self.test_signer.address], [])
+        )
+
+
+class WatchlistTests(BaseTest):
+    """
+    Tests the materialized list of profiles to watch.
+    """
+
+    def setUp(self):
+        """ Runs before each test. """
+
+        super().setUp()
+        self.address = "0xFE3B557E8Fb62b89F4916B721be55cEb828dBd73"
+
+    def _assert_watched(self, address, expected):
+        """
+        Asserts whether the profile of the given address is watched,
+        and that a sync with the Notify webhook is queued.
+        """
+        self.assertEqual(watchlist.is_watched(address), expected)
+        self.assertIn(
+            address.encode(),
+            self.redis_backend.smembers(alchemy.dirty_key)
+        )
+        self.redis_backend.delete(alchemy.dirty_key)
+
+    def test_login_watches_user(self):
+        """ Assert that users are watched once they log in. """
+
+        self._do_login(self.test_signer)
+        self._assert_watched(self.test_signer.address, True)
+
+    def test_follow_watches_user(self):
+        """
+        Assert that users are watched while they have followers.
+        """
+        # add a user that never logged in to a feed without followers
+        self._do_login(self.test_signer)
+        feed_id = self._create_feed().data["id"]
+        self.client.delete(f"/api/feeds/{feed_id}/follow/")
+        self._add_feed_following(feed_id, self.address)
+        self.assertFalse(watchlist.is_watched(self.address))
+
+        # follow and unfollow them
+        self._follow_user(self.address)
+        self._assert_watched(self.address, True)
+        self.client.delete(f"/api/{self.address}/follow/")
+        self._assert_watched(self.address, False)
+
+    def test_feed_watches_users(self):
+        """
+        Assert that users are watched while they are on a feed
+        that has followers.
+        """
+        # add a user that never logged in to a feed,
+        # which is followed by its owner
+        self._do_login(self.test_signer)
+        feed_id = self._create_feed().data["id"]
+        self._add_feed_following(feed_id, self.address)
+        self._assert_watched(self.address, True)
+
+        # unfollow and follow the feed
+        self.client.delete(f"/api/feeds/{feed_id}/follow/")
+        self._assert_watched(self.address, False)
+        self.client.post(f"/api/feeds/{feed_id}/follow/")
+        self._assert_watched(self.address, True)
+
+        # remove the user from the feed
+        self.client.delete(f"/api/feeds/{feed_id}/following/{self.address}/")
+        self._assert_watched(self.address, False)
+
+        # add the user back, then delete the feed
+        self._add_feed_following(feed_id, self.address)
+        self._assert_watched(self.address, True)
+        self.client.delete(f"/api/feeds/{feed_id}/")
+        self._assert_watched(self.address, False)
+
+    def test_reconcile_watchlist(self):
+        """
+        Assert that the reconcile-watchlist command repairs
+        the profiles whose watched flag has drifted.
+        """
+        # set up test
+        self._do_login(self.test_signer)
+        self._do_login(self.test_signer_2)
+        Profile.objects.filter(user_id=self.test_signer.address)\
+            .update(is_watched=False)
+        self.redis_backend.delete(alchemy.dirty_key)
+
+        # run the command
+        call_command("reconcile-watchlist")
+
+        # assert that the drifted profile is repaired and synced
+        self.assertTrue(watchlist.is_watched(self.test_signer.address))
+        self.assertTrue(watchlist.is_watched(self.test_signer_2.address))
+        self.assertEqual(
+            self.redis_backend.smembers(alchemy.dirty_key),
+            {self.test_signer.address.encode()}
+        )
+
 
 class CovalentTransactionParsingTests(BaseTest):
     """
@@ -909,7 +1163,281 @@ class CovalentTransactionParsingTests(BaseTest):
         self.assertEqual(ERC721Transfer.objects.all().count(), 1)
         self.assertEqual(ERC20Transfer.objects.all().count(), 4)
 
+    def test_token_contracts(self):
+        """
+        Assert that a TokenContract is registered per contract
+        of the transferred tokens, with the metadata from Covalent,
+        and that transfers are serialized with it.
+        """
+        # set up test
+        self._mock_tx_history_response(
+            self.test_signer.address,
+            self.erc20_tx_resp_data
+        )
+
+        # call function
+        covalent_jobs.process_address_txs(self.test_signer.address)
+
+        # make assertions
+        transfers = ERC20Transfer.objects.all()
+        addresses = set(t.contract_address for t in transfers)
+        self.assertEqual(TokenContract.objects.count(), len(addresses))
+
+        transfer = transfers[0]
+        data = serializers.ERC20TransferSerializer(transfer).data
+        self.assertEqual(data["contract_name"], transfer.contract.name)
+        self.assertEqual(data["contract_ticker"], transfer.contract.symbol)
+        self.assertEqual(data["decimals"], transfer.contract.decimals)
+        self.assertNotEqual(data["contract_name"], "")
+
+    def test_create_txs_query_count(self):
+        """
+        Assert that a page of tx history is stored using
+        the same number of queries no matter how many txs it has.
+        Assert that processing a page twice does not duplicate records.
+        """
+        # set up test
+        user = UserModel.objects.create(
+            ethereum_address=self.test_signer.address
+        )
+        profile = Profile.objects.create(user=user)
+        erc20_page = json.loads(self.erc20_tx_resp_data)["data"]["items"]
+        erc721_page = json.loads(self.erc721_tx_resp_data)["data"]["items"]
+
+        # store a page with one tx and a page with six txs
+        with CaptureQueriesContext(connection) as erc721_queries:
+            covalent_jobs.create_txs(erc721_page, profile)
+        with CaptureQueriesContext(connection) as erc20_queries:
+            covalent_jobs.create_txs(erc20_page, profile)
+
+        # make assertions
+        self.assertEqual(len(erc721_queries), len(erc20_queries))
+        self.assertEqual(Post.objects.count(), 7)
+
+        # process the page again and assert nothing was created
+        with CaptureQueriesContext(connection) as queries:
+            posts = covalent_jobs.create_txs(erc20_page, profile)
+        self.assertEqual(posts, [])
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(Transaction.objects.count(), 7)
+        self.assertEqual(ERC20Transfer.objects.count(), 4)
+
+    def test_create_txs_concurrently(self):
+        """
+        Assert that two jobs storing the same page at the same time
+        do not duplicate records, when the second job stores the page
+        after the first one checked for existing txs.
+        """
+        # set up test
+        user = UserModel.objects.create(
+            ethereum_address=self.test_signer.address
+        )
+        profile = Profile.objects.create(user=user)
+        page = json.loads(self.erc20_tx_resp_data)["data"]["items"]
+
+        # run the second job in between the first job's
+        # check for existing txs and its inserts
+        get_token_metadata = covalent_jobs.get_token_metadata
+        other_posts = []
+        other_job = mock.Mock()
+        def run_other_job(page):
+            if not other_job.called:
+                other_job()
+                other_posts.extend(covalent_jobs.create_txs(page, profile))
+            return get_token_metadata(page)
+
+        # call function
+        with mock.patch.object(covalent_jobs, "get_token_metadata",
+                               side_effect=run_other_job):
+            posts = covalent_jobs.create_txs(page, profile)
+
+        # make assertions
+        self.assertEqual(len(other_posts), 6)
+        self.assertEqual(
+            sorted(post.id for post in posts),
+            sorted(post.id for post in other_posts)
+        )
+        self.assertEqual(Transaction.objects.count(), 6)
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertEqual(ERC20Transfer.objects.count(), 4)
+
+    def test_compact_tx_columns(self):
+        """
+        Assert that transactions store addresses and hashes as raw bytes
+        and amounts as numbers, and are read back as checksum encoded
+        addresses, hashes and decimal strings.
+        """
+        # set up test
+        tx_hash = "0x" + "ab" * 32
+        value = str(2**256 - 1)
+        Transaction.objects.create(
+            chain_id=1,
+            tx_hash=tx_hash.upper().replace("0X", "0x"),
+            block_signed_at=datetime.now(timezone.utc),
+            from_address=self.test_signer.address.lower(),
+            to_address=self.test_signer_2.address,
+            value=value
+        )
+
+        # make assertions
+        tx = Transaction.objects.get(tx_hash=tx_hash)
+        self.assertEqual(tx.tx_hash, tx_hash)
+        self.assertEqual(tx.from_address, self.test_signer.address)
+        self.assertEqual(tx.value, value)
+        self.assertEqual(
+            Transaction.objects.filter(
+                from_address=self.test_signer.address.lower()
+            ).count(),
+            1
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tx_hash, from_address FROM blockso_app_transaction"
+            )
+            raw_hash, raw_address = cursor.fetchone()
+        self.assertEqual(bytes(raw_hash), bytes.fromhex("ab" * 32))
+        self.assertEqual(len(raw_address), 20)
+
+    def test_backfill_resumes_from_cursor(self):
+        """
+        Assert that the tx history is backfilled in chunks of pages,
+        each chunk enqueueing a job that continues from the cursor.
+        """
+        # set up test
+        address = self.test_signer.address
+        has_more_results = self.erc20_tx_resp_data.replace(
+            '"has_more": false',
+            '"has_more": true'
+        )
+        self.mock_responses.add(
+            responses.GET,
+            covalent_jobs.get_tx_history_url(address, 0),
+            body=has_more_results
+        )
+
+        # process a chunk of one page, recording the state
+        # at the time the next chunk is enqueued
+        states = []
+        enqueue = rq.Queue.enqueue
+
+        def record_state(queue, *args, **kwargs):
+            states.append(covalent_jobs.get_state(address)[0])
+            return enqueue(queue, *args, **kwargs)
+
+        with mock.patch.object(covalent_jobs, "chunk_pages", 1), \
+                mock.patch.object(rq.Queue, "enqueue", record_state), \
+                mock.patch.object(covalent_jobs, "set_state",
+                                  wraps=covalent_jobs.set_state) \
+                as mock_set_state:
+            covalent_jobs.process_address_txs(address)
+
+        # assert that the state was kept running while the page was
+        # processed, and was queued before the next chunk was enqueued
+        self.assertEqual(
+            [c.args for c in mock_set_state.call_args_list],
+            [
+                (address, covalent_jobs.RUNNING),
+                (address, covalent_jobs.RUNNING),
+                (address, covalent_jobs.QUEUED),
+            ]
+        )
+        self.assertEqual(states, [covalent_jobs.QUEUED])
+
+        # assert that the cursor was checkpointed
+        cursor = TxHistoryCursor.objects.get(address=address)
+        self.assertEqual(cursor.next_page, 1)
+        self.assertFalse(cursor.backfill_complete)
+        self.assertEqual(Transaction.objects.count(), 6)
+
+        # assert that a job continuing the backfill was enqueued
+        queue = rq.Queue(connection=self.redis_backend, name="high")
+        self.assertEqual(queue.get_job_ids(), [f"{address}:1"])
+
+        # run the next chunk, which only fetches the second page
+        self.mock_responses.add(
+            responses.GET,
+            covalent_jobs.get_tx_history_url(address, 1),
+            body=self.erc721_tx_resp_data
+        )
+        with mock.patch.object(covalent_jobs, "chunk_pages", 1):
+            covalent_jobs.process_address_txs(address)
+
+        # assert that the backfill is complete
+        cursor.refresh_from_db()
+        self.assertEqual(cursor.next_page, 2)
+        self.assertTrue(cursor.backfill_complete)
+        self.assertEqual(Transaction.objects.count(), 7)
+        self.assertEqual(queue.get_job_ids(), [f"{address}:1"])
+
+    def test_process_address_txs_records_state(self):
+        """
+        Assert that processing the tx history of an address records
+        when it is done, and when it fails so that it is retried.
+        """
+        # set up test
+        address = self.test_signer.address
+        self._mock_tx_history_response(address, self.erc20_tx_resp_data)
+
+        # assert that the state is done once processed
+        covalent_jobs.process_address_txs(address)
+        state, updated = covalent_jobs.get_state(address)
+        self.assertEqual(state, covalent_jobs.DONE)
+        self.assertAlmostEqual(
+            updated,
+            datetime.now(timezone.utc).timestamp(),
+            delta=5
+        )
+
+        # assert that the state is failed if processing fails
+        self.mock_responses.replace(
+            responses.GET,
+            covalent_jobs.get_tx_history_url(address, 0),
+            status=500
+        )
+        with self.assertRaises(requests.HTTPError):
+            covalent_jobs.process_address_txs(address)
+        self.assertEqual(covalent_jobs.get_state(address)[0], covalent_jobs.FAILED)
+        self.assertEqual(
+            self.redis_backend.ttl(covalent_jobs.get_state_key(address)),
+            settings.TX_HISTORY_RETRY_INTERVAL
+        )
 
+    def test_fetch_new_txs(self):
+        """
+        Assert that once the tx history is backfilled,
+        only the txs newer than the cursor are fetched.
+        """
+        # set up test
+        address = self.test_signer.address
+        self._mock_tx_history_response(address, self.erc20_tx_resp_data)
+        covalent_jobs.process_address_txs(address)
+
+        # mock a newest page that still has more pages after it,
+        # with a new tx and the txs that were processed before
+        new_tx = json.loads(self.erc721_tx_resp_data)["data"]["items"][0]
+        new_tx["block_signed_at"] = "2023-01-01T00:00:00Z"
+        data = json.loads(self.erc20_tx_resp_data)
+        data["data"]["items"].insert(0, new_tx)
+        data["data"]["pagination"]["has_more"] = True
+        self.mock_responses.add(
+            responses.GET,
+            covalent_jobs.get_tx_history_url(address, 0),
+            body=json.dumps(data)
+        )
+
+        # fetch new txs
+        covalent_jobs.process_address_txs(address)
+
+        # assert that the new tx was processed without fetching older pages
+        self.assertEqual(Transaction.objects.count(), 7)
+        cursor = TxHistoryCursor.objects.get(address=address)
+        self.assertEqual(
+            cursor.latest_block_signed_at,
+            datetime(2023, 1, 1, tzinfo=timezone.utc)
+        )
+
+
+@override_settings(ALCHEMY_HTTPS_URL="https://eth-mainnet.example.com/v2/key")
 class AlchemyNotifyTxParsingTests(BaseTest):
     """
     Tests behavior related to getting transaction history
@@ -921,53 +1449,60 @@ class AlchemyNotifyTxParsingTests(BaseTest):
 
         super().setUp()
 
-        # mock get_block return data -- only mocking values we need
-        mock_block_data = AttributeDict({
-            'timestamp': 1673395967
-        })
-        self.web3_get_block_patcher = mock.patch(
-            "web3.eth.Eth.get_block",
-            return_value=mock_block_data
-        )
-        self.web3_get_block_patcher.start()
+        # mock block data -- only mocking values we need
+        self.mock_block_data = {"timestamp": hex(1673395967)}
 
-        # mock get_transaction return data -- only mocking values we need
-        mock_tx_data = AttributeDict({
-            'from': '0xA1E4380A3B1f749673E270229993eE55F35663b4',
-            'to': '0x5DF9B87991262F6BA471F09758CDE1c0FC1De734',
-            'value': 31337,
-        })
-        self.web3_get_transaction_by_block_patcher = mock.patch(
-            "web3.eth.Eth.get_transaction_by_block",
-            return_value=mock_tx_data
-        )
-        self.web3_get_transaction_by_block_patcher.start()
-        self.web3_get_transaction_patcher = mock.patch(
-            "web3.eth.Eth.get_transaction",
-            return_value=mock_tx_data
-        )
-        self.web3_get_transaction_patcher.start()
+        # mock transaction data -- only mocking values we need
+        # transactions fetched by hash can be mocked per hash in mock_txs
+        self.mock_tx_data = {
+            "from": "0xA1E4380A3B1f749673E270229993eE55F35663b4",
+            "to": "0x5DF9B87991262F6BA471F09758CDE1c0FC1De734",
+            "value": hex(31337),
+        }
+        self.mock_txs = {}
+
+        # mock contract call return data
+        self.mock_call_data = "0x" + encode_single("string", "Fake Val").hex()
 
-        # mock contract call function
-        self.web3_call_patcher = mock.patch(
-            "web3.contract.ContractFunction.call",
-            return_value="Fake Val"
+        # answer JSON-RPC batches sent to the node
+        self.rpc_batches = []
+        self.mock_responses.add_callback(
+            responses.POST,
+            settings.ALCHEMY_HTTPS_URL,
+            callback=self._rpc_callback
         )
-        self.web3_call_patcher.start()
 
-    def tearDown(self):
-        """ Runs after each test. """
+    def _rpc_callback(self, request):
+        """ Answers a JSON-RPC batch request using the mocked data. """
 
-        super().tearDown()
+        batch = json.loads(request.body)
+        self.rpc_batches.append(batch)
 
-        # clean up web3 patcher
-        self.web3_get_block_patcher.stop()
-        self.web3_get_transaction_patcher.stop()
-        self.web3_get_transaction_by_block_patcher.stop()
-        self.web3_call_patcher.stop()
+        results = []
+        for item in batch:
+            method = item["method"]
+            if method == "eth_getBlockByNumber":
+                result = self.mock_block_data
+            elif method == "eth_getTransactionByHash":
+                result = self.mock_txs.get(item["params"][0], self.mock_tx_data)
+            elif method == "eth_getTransactionByBlockNumberAndIndex":
+                result = self.mock_tx_data
+            elif method == "eth_call":
+                result = self.mock_call_data
+            results.append({"jsonrpc": "2.0", "id": item["id"], "result": result})
 
-    @mock.patch("web3.eth.Eth.get_transaction")
-    def test_process_external_eth_transfer(self, mock_get_tx):
+        return 200, {}, json.dumps(results)
+
+    def _mock_tx(self, activity):
+        """ Mocks the transaction of the given external transfer. """
+
+        self.mock_txs[activity["hash"]] = {
+            "from": activity["fromAddress"],
+            "to": activity["toAddress"],
+            "value": hex(31337)
+        }
+
+    def test_process_external_eth_transfer(self):
         """
         Assert that an external eth transfer
         from or to an address is handled correctly.
@@ -978,11 +1513,7 @@ class AlchemyNotifyTxParsingTests(BaseTest):
         # set up test
         eth_transfer = alchemy_notify_samples.eth_transfer
         activity = eth_transfer["event"]["activity"][0]
-        mock_get_tx.return_value = AttributeDict({
-            "from": activity["fromAddress"],
-            "to": activity["toAddress"],
-            'value': 31337
-        })
+        self._mock_tx(activity)
 
         # call function
         alchemy_jobs.process_webhook_data(eth_transfer)
@@ -1000,8 +1531,7 @@ class AlchemyNotifyTxParsingTests(BaseTest):
         to_post = Post.objects.get(author__user_id=to_address)
         self.assertEqual(to_post.refTx, tx)
 
-    @mock.patch("web3.eth.Eth.get_transaction")
-    def test_process_multiple_external_eth_transfer(self, mock_get_tx):
+    def test_process_multiple_external_eth_transfer(self):
         """
         Assert that multiple external eth transfers
         are handled correctly.
@@ -1011,16 +1541,8 @@ class AlchemyNotifyTxParsingTests(BaseTest):
         """
         # set up test
         eth_transfers = alchemy_notify_samples.multiple_eth_transfers
-        side_effects = []
         for item in eth_transfers["event"]["activity"]:
-            side_effects.append(
-                AttributeDict({
-                    "from": item["fromAddress"],
-                    "to": item["toAddress"],
-                    'value': 31337
-                })
-            )
-        mock_get_tx.side_effect = side_effects
+            self._mock_tx(item)
 
         # call function
         alchemy_jobs.process_webhook_data(eth_transfers)
@@ -1045,25 +1567,96 @@ class AlchemyNotifyTxParsingTests(BaseTest):
                 ).count()
             )
 
-    def test_process_erc20_transfer(self):
+    def test_webhook_rpc_requests_are_batched(self):
         """
-        Assert that an erc20 transfer is parsed correctly.
-        Assert that a Transaction is created for the tx that
-        the erc20 transfer relates to.
-        Assert that the from and to addresses now have Posts that
-        reflect their transaction history.
+        Assert that the chain data of all the activities of a webhook
+        is fetched in a single JSON-RPC batch without duplicate requests.
         """
         # set up test
-        erc20_transfer = alchemy_notify_samples.erc20_transfer
+        eth_transfers = alchemy_notify_samples.multiple_eth_transfers
+        activity = eth_transfers["event"]["activity"]
+        for item in activity:
+            self._mock_tx(item)
 
         # call function
-        alchemy_jobs.process_webhook_data(erc20_transfer)
+        alchemy_jobs.process_webhook_data(eth_transfers)
 
         # make assertions
-        # assert that a Transaction was created
-        activity = erc20_transfer["event"]["activity"][0]
-        tx = Transaction.objects.get(tx_hash=activity["hash"])
-
+        # one block request per distinct block, one tx request per activity
+        self.assertEqual(len(self.rpc_batches), 1)
+        blocks = set(item["blockNum"] for item in activity)
+        self.assertEqual(
+            len(self.rpc_batches[0]),
+            len(blocks) + len(activity)
+        )
+
+    def test_block_timestamps_are_cached(self):
+        """
+        Assert that the timestamp of a block is only fetched once.
+        """
+        # set up test
+        erc20_transfer = alchemy_notify_samples.erc20_transfer
+
+        # process the same block twice
+        alchemy_jobs.process_webhook_data(erc20_transfer)
+        alchemy_jobs.process_webhook_data(erc20_transfer)
+
+        # make assertions
+        methods = [[item["method"] for item in b] for b in self.rpc_batches]
+        self.assertIn("eth_getBlockByNumber", methods[0])
+        self.assertNotIn("eth_getBlockByNumber", methods[1])
+        self.assertEqual(block_timestamps.stats["misses"], 1)
+        self.assertEqual(block_timestamps.stats["redis_hits"], 1)
+
+    def test_token_contracts_are_registered_once(self):
+        """
+        Assert that the metadata of a token contract is only fetched
+        the first time one of its transfers is processed.
+        """
+        # set up test
+        erc20_transfer = alchemy_notify_samples.erc20_transfer
+        activity = erc20_transfer["event"]["activity"][0]
+
+        # process transfers of the same token twice
+        alchemy_jobs.process_webhook_data(erc20_transfer)
+        token_registry.clear()
+        alchemy_jobs.process_webhook_data(erc20_transfer)
+
+        # make assertions
+        methods = [[item["method"] for item in b] for b in self.rpc_batches]
+        self.assertIn("eth_call", methods[0])
+        self.assertNotIn("eth_call", methods[1])
+
+        token = TokenContract.objects.get()
+        self.assertEqual(
+            token.address,
+            w3.toChecksumAddress(activity["rawContract"]["address"])
+        )
+        self.assertEqual(token.name, "Fake Val")
+        self.assertEqual(token.symbol, activity["asset"])
+        self.assertEqual(token.decimals, activity["rawContract"]["decimals"])
+        for transfer in ERC20Transfer.objects.all():
+            self.assertEqual(transfer.contract, token)
+
+    def test_process_erc20_transfer(self):
+        """
+        Assert that an erc20 transfer is parsed correctly.
+        Assert that a Transaction is created for the tx that
+        the erc20 transfer relates to.
+        Assert that the from and to addresses now have Posts that
+        reflect their transaction history.
+        """
+        # set up test
+        erc20_transfer = alchemy_notify_samples.erc20_transfer
+
+        # call function
+        alchemy_jobs.process_webhook_data(erc20_transfer)
+
+        # make assertions
+        # assert that a Transaction was created
+        activity = erc20_transfer["event"]["activity"][0]
+        tx = Transaction.objects.get(tx_hash=activity["hash"])
+
         # assert that an ERC20Transfer was created
         transfer = ERC20Transfer.objects.get(tx=tx)
         self.assertEqual(
@@ -1092,6 +1685,44 @@ class AlchemyNotifyTxParsingTests(BaseTest):
         to_post = Post.objects.get(author__user_id=to_address)
         self.assertEqual(to_post.refTx, tx)
 
+    def test_reprocess_transfer_without_log_index(self):
+        """
+        Assert that processing a transfer again does not duplicate it,
+        including a transfer stored before log indexes were kept,
+        while a new transfer of the same tx is still created.
+        """
+        # set up test
+        erc20_transfer = alchemy_notify_samples.erc20_transfer
+        alchemy_jobs.process_webhook_data(erc20_transfer)
+        alchemy_jobs.process_webhook_data(erc20_transfer)
+        self.assertEqual(ERC20Transfer.objects.count(), 1)
+
+        # the transfer was stored before log indexes were kept
+        ERC20Transfer.objects.update(log_index=None)
+
+        # another transfer of the same tx, in a later log
+        data = json.loads(json.dumps(erc20_transfer))
+        activity = data["event"]["activity"]
+        other = json.loads(json.dumps(activity[0]))
+        other["log"]["logIndex"] = hex(int(other["log"]["logIndex"], 16) + 1)
+        other["log"]["data"] = hex(int(other["log"]["data"], 16) + 1)
+        activity.append(other)
+
+        # call function
+        alchemy_jobs.process_webhook_data(data)
+
+        # make assertions
+        transfers = ERC20Transfer.objects.order_by("id")
+        self.assertEqual(
+            [t.log_index for t in transfers],
+            [None, int(other["log"]["logIndex"], 16)]
+        )
+        self.assertEqual(
+            transfers[1].amount,
+            str(int(other["log"]["data"], 16))
+        )
+        self.assertEqual(Post.objects.count(), 2)
+
     def test_process_erc721_transfer(self):
         """
         Assert that an erc721 transfer is parsed correctly.
@@ -1164,6 +1795,14 @@ class AlchemyNotifyTxParsingTests(BaseTest):
             ).exists()
         )
 
+        # build the home timeline of the recipient, holding their post
+        recipient = Profile.objects.get(
+            user_id=w3.toChecksumAddress(activity["toAddress"])
+        )
+        timeline_jobs.build_home_timeline(recipient.pk)
+        timeline = timelines.get_home_timeline(recipient.pk)
+        self.assertEqual(timeline.count(), 1)
+
         # process a follow up webhook request where removed = True 
         # therefore it should remove all objects related to the
         # transaction that was reorged
@@ -1180,6 +1819,461 @@ class AlchemyNotifyTxParsingTests(BaseTest):
                 author__user_id=w3.toChecksumAddress(activity["toAddress"])
             ).exists()
         )
+        self.assertEqual(timeline.count(), 0)
+
+
+    def _get_batch_worker(self):
+        """
+        Utility function that returns a batch worker
+        of the tx_processing queue.
+        """
+        queue = rq.Queue(connection=self.redis_backend, name="tx_processing")
+        worker = batch_worker.BatchWorker(queue, batch_size=10, window=0)
+        return queue, worker
+
+    def test_batch_worker(self):
+        """
+        Assert that the batch worker processes the activity of all
+        the pending webhook jobs at once, in order.
+        """
+        # set up test
+        samples = alchemy_notify_samples
+        for item in samples.multiple_eth_transfers["event"]["activity"]:
+            self._mock_tx(item)
+        reorged_transfer = dict(
+            samples.reorged_erc721_transfer,
+            id="whevt_reorged"
+        )
+        for data in [samples.multiple_eth_transfers, samples.erc20_transfer,
+                     samples.erc721_transfer, reorged_transfer]:
+            alchemy.enqueue_webhook_data(data)
+        queue, worker = self._get_batch_worker()
+        job_ids = queue.get_job_ids()
+
+        # make request
+        with self.assertLogs(batch_worker.logger, "INFO") as logs:
+            worker.work(burst=True)
+
+        # make assertions
+        # the chain data of all the jobs was fetched in one batch
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(len(self.rpc_batches), 1)
+        self.assertEqual(worker.stats["jobs"], 4)
+        self.assertEqual(worker.stats["activities"], 8)
+        self.assertIn("activities/sec", logs.output[-1])
+        for job_id in job_ids:
+            job = queue.fetch_job(job_id)
+            self.assertEqual(job.get_status(), rq.job.JobStatus.FINISHED)
+        self.assertEqual(queue.started_job_registry.get_job_ids(), [])
+
+        # the transfers were processed, and the re-org was applied
+        activity = samples.multiple_eth_transfers["event"]["activity"] + \
+            samples.erc20_transfer["event"]["activity"]
+        for item in activity:
+            tx = Transaction.objects.get(tx_hash=item["hash"])
+            self.assertEqual(
+                Post.objects.filter(
+                    author__user_id=w3.toChecksumAddress(item["toAddress"]),
+                    refTx=tx
+                ).count(),
+                1
+            )
+        self.assertEqual(ERC20Transfer.objects.count(), 1)
+        self.assertFalse(
+            Transaction.objects.filter(
+                tx_hash=samples.erc721_transfer["event"]["activity"][0]["hash"]
+            ).exists()
+        )
+
+    def test_batch_worker_isolates_failed_jobs(self):
+        """
+        Assert that a job that fails in a batch fails on its own,
+        and the other jobs of the batch are processed.
+        """
+        # set up test
+        erc20_transfer = alchemy_notify_samples.erc20_transfer
+        bad_transfer = json.loads(json.dumps(erc20_transfer))
+        bad_transfer["id"] = "whevt_bad"
+        activity = bad_transfer["event"]["activity"][0]
+        activity["blockNum"] = "0x1"
+        del activity["log"]["data"]
+        alchemy.enqueue_webhook_data(bad_transfer)
+        alchemy.enqueue_webhook_data(erc20_transfer)
+        queue, worker = self._get_batch_worker()
+        bad_job_id, job_id = queue.get_job_ids()
+
+        # make request
+        with self.assertLogs(batch_worker.logger, "INFO"):
+            worker.work(burst=True)
+
+        # make assertions
+        self.assertEqual(
+            queue.fetch_job(job_id).get_status(),
+            rq.job.JobStatus.FINISHED
+        )
+        self.assertEqual(
+            queue.fetch_job(bad_job_id).get_status(),
+            rq.job.JobStatus.FAILED
+        )
+        self.assertEqual(queue.failed_job_registry.get_job_ids(), [bad_job_id])
+        self.assertEqual(worker.stats["failed_jobs"], 1)
+        self.assertTrue(
+            Transaction.objects.filter(
+                tx_hash=erc20_transfer["event"]["activity"][0]["hash"]
+            ).exists()
+        )
+
+
+    def test_batch_worker_times_out_jobs(self):
+        """
+        Assert that a batch that runs longer than the timeout of its
+        jobs is interrupted, and its jobs fail, as with rq's worker.
+        Also assert that the database connections are closed if stale
+        around each batch.
+        """
+        # set up test
+        queue, worker = self._get_batch_worker()
+        job = queue.enqueue(
+            alchemy_jobs.process_activities,
+            alchemy_notify_samples.erc20_transfer["event"]["activity"],
+            job_timeout=1
+        )
+
+        # make request
+        with mock.patch.object(alchemy_jobs, "_create_activities",
+                               side_effect=lambda *args: time.sleep(5)), \
+                mock.patch.object(batch_worker, "close_old_connections") \
+                as mock_close, \
+                self.assertLogs(batch_worker.logger, "INFO"):
+            worker.work(burst=True)
+
+        # make assertions
+        self.assertEqual(job.get_status(), rq.job.JobStatus.FAILED)
+        self.assertEqual(queue.failed_job_registry.get_job_ids(), [job.id])
+        self.assertIn(
+            "JobTimeoutException",
+            queue.fetch_job(job.id).exc_info
+        )
+        self.assertEqual(mock_close.call_count, 2)
+
+    def test_batch_worker_recovers_abandoned_jobs(self):
+        """
+        Assert that the jobs of a batch are kept in the started job
+        registry and heartbeated while processed, and that the jobs of
+        a worker that died mid-batch are moved to the failed job registry
+        by the cleanup, from where they can be requeued.
+        """
+        # set up test
+        alchemy.enqueue_webhook_data(alchemy_notify_samples.erc20_transfer)
+        queue, worker = self._get_batch_worker()
+        job_ids = queue.get_job_ids()
+
+        # take the jobs, as a worker that dies before processing them
+        jobs = worker.drain(block=False)
+        registry = queue.started_job_registry
+        self.assertEqual(registry.get_job_ids(), job_ids)
+        expiry = registry.get_expiration_time(jobs[0])
+
+        # assert the jobs are heartbeated while processed
+        with mock.patch.multiple(batch_worker, heartbeat_interval=0.01,
+                                 job_ttl=batch_worker.job_ttl * 2):
+            with worker._heartbeat(jobs, timeout=60):
+                time.sleep(0.1)
+        self.assertGreater(registry.get_expiration_time(jobs[0]), expiry)
+
+        # assert the jobs stop being heartbeated once their timeout ran out
+        expiry = registry.get_expiration_time(jobs[0])
+        with mock.patch.multiple(batch_worker, heartbeat_interval=0.01,
+                                 job_ttl=batch_worker.job_ttl * 3):
+            with worker._heartbeat(jobs, timeout=0):
+                time.sleep(0.1)
+        self.assertEqual(registry.get_expiration_time(jobs[0]), expiry)
+
+        # clean up the registries once the jobs' ttl ran out
+        registry.cleanup(time.time() + batch_worker.job_ttl * 3)
+
+        # make assertions
+        self.assertEqual(registry.get_job_ids(), [])
+        self.assertEqual(queue.failed_job_registry.get_job_ids(), job_ids)
+
+        # requeue and process the jobs
+        for job_id in job_ids:
+            queue.failed_job_registry.requeue(job_id)
+        with self.assertLogs(batch_worker.logger, "INFO"):
+            worker.work(burst=True)
+        self.assertTrue(
+            Transaction.objects.filter(
+                tx_hash=alchemy_notify_samples.erc20_transfer[
+                    "event"]["activity"][0]["hash"]
+            ).exists()
+        )
+
+
+class StubNodeHandler(BaseHTTPRequestHandler):
+    """
+    Answers JSON-RPC batches like an ethereum node would, echoing the
+    params of each request as its result, or an error for `eth_fail`.
+    Batches with an `eth_limited` request fail as a whole,
+    and `eth_unattributed` requests get an error without an id.
+    """
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        batch = json.loads(self.rfile.read(length))
+        self.server.batches.append(batch)
+
+        results = []
+        for item in reversed(batch):
+            if item["method"] == "eth_fail":
+                error = {"code": -32000, "message": "execution reverted"}
+                results.append({"jsonrpc": "2.0", "id": item["id"], "error": error})
+            elif item["method"] == "eth_unattributed":
+                error = {"code": -32600, "message": "invalid request"}
+                results.append({"jsonrpc": "2.0", "id": None, "error": error})
+            else:
+                results.append(
+                    {"jsonrpc": "2.0", "id": item["id"], "result": item["params"]}
+                )
+
+        if any(item["method"] == "eth_limited" for item in batch):
+            error = {"code": 429, "message": "too many requests"}
+            results = {"jsonrpc": "2.0", "id": None, "error": error}
+
+        body = json.dumps(results).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class BatchRequestTests(BaseTest):
+    """
+    Tests behavior of the JSON-RPC batching client
+    against a local stub node.
+    """
+
+    def setUp(self):
+        """ Runs before each test. """
+
+        super().setUp()
+
+        # start the stub node
+        self.server = HTTPServer(("127.0.0.1", 0), StubNodeHandler)
+        self.server.batches = []
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        # let requests through to the stub node
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        self.mock_responses.add_passthru(self.url)
+
+    def test_batch_request(self):
+        """
+        Assert that queued requests are sent in one batch,
+        that duplicate requests are only sent once,
+        and that results are matched to their requests.
+        """
+        # set up test
+        batch = BatchRequest(endpoint_uri=self.url)
+        batch.add("eth_getBlockByNumber", ["0x1", False])
+        batch.add("eth_getBlockByNumber", ["0x2", False])
+        batch.add("eth_getBlockByNumber", ["0x1", False])
+
+        # send batch
+        batch.execute()
+
+        # make assertions
+        self.assertEqual(len(self.server.batches), 1)
+        self.assertEqual(len(self.server.batches[0]), 2)
+        self.assertEqual(
+            batch.get("eth_getBlockByNumber", ["0x2", False]),
+            ["0x2", False]
+        )
+
+        # assert that executing again does not resend requests
+        batch.execute()
+        self.assertEqual(len(self.server.batches), 1)
+
+    def test_batch_size(self):
+        """
+        Assert that requests are split into batches of a maximum size.
+        """
+        # set up test
+        batch = BatchRequest(endpoint_uri=self.url)
+        for i in range(5):
+            batch.add("eth_getBlockByNumber", [hex(i), False])
+
+        # send batches
+        with mock.patch.object(web3_client, "max_batch_size", 2):
+            batch.execute()
+
+        # make assertions
+        sizes = [len(sent) for sent in self.server.batches]
+        self.assertEqual(sizes, [2, 2, 1])
+        self.assertEqual(
+            batch.get("eth_getBlockByNumber", ["0x4", False]),
+            ["0x4", False]
+        )
+
+    def test_batch_request_error(self):
+        """
+        Assert that a failed or unsent request raises RPCError.
+        """
+        # set up test
+        batch = BatchRequest(endpoint_uri=self.url)
+        batch.add("eth_fail", [])
+        batch.execute()
+
+        # make assertions
+        with self.assertRaises(RPCError):
+            batch.get("eth_fail", [])
+
+        with self.assertRaises(RPCError):
+            batch.get("eth_chainId", [])
+
+    def test_batch_error(self):
+        """
+        Assert that a batch that fails as a whole raises RPCError.
+        """
+        # set up test
+        batch = BatchRequest(endpoint_uri=self.url)
+        batch.add("eth_limited", [])
+        batch.add("eth_chainId", [])
+
+        # make assertions
+        with self.assertRaises(RPCError):
+            batch.execute()
+
+        with self.assertRaises(RPCError):
+            batch.get("eth_chainId", [])
+
+    def test_batch_unattributed_error(self):
+        """
+        Assert that an error without the id of its request raises
+        RPCError, and that the batch is sent with a timeout.
+        """
+        # set up test
+        batch = BatchRequest(endpoint_uri=self.url)
+        batch.add("eth_unattributed", [])
+        batch.add("eth_chainId", [])
+
+        # make assertions
+        with mock.patch.object(batch.session, "post",
+                               wraps=batch.session.post) as post:
+            with self.assertRaises(RPCError):
+                batch.execute()
+        self.assertEqual(post.call_args.kwargs["timeout"], web3_client.timeout)
+        self.assertEqual(batch.get("eth_chainId", []), [])
+
+
+class RedisConnectionTests(BaseTest):
+    """
+    Tests the redis connection shared by the process.
+    """
+
+    def test_pool_stats(self):
+        """
+        Assert that the pool hands out at most max_connections
+        connections, and records the use of its connections.
+        """
+        # set up a pool of 2 connections to a fake server
+        pool = MeteredConnectionPool(
+            connection_class=fakeredis.FakeConnection,
+            server=fakeredis.FakeServer(),
+            max_connections=2,
+            timeout=0.05
+        )
+        redis.Redis(connection_pool=pool).set("key", 1)
+
+        # take both connections and assert that a third one is waited for
+        conns = [pool.get_connection("GET"), pool.get_connection("GET")]
+        with self.assertRaises(redis.ConnectionError):
+            pool.get_connection("GET")
+
+        # make assertions
+        stats = pool.get_stats()
+        self.assertEqual(stats["max_connections"], 2)
+        self.assertEqual(stats["created_connections"], 2)
+        self.assertEqual(stats["in_use_connections"], 2)
+        self.assertEqual(stats["checkouts"], 4)
+        self.assertGreaterEqual(stats["max_wait_seconds"], 0.05)
+
+        # assert that released connections are not in use
+        for conn in conns:
+            pool.release(conn)
+        self.assertEqual(pool.get_stats()["in_use_connections"], 0)
+
+    @override_settings(
+        REDIS_URL="rediss://:password@example.com:6380/2",
+        REDIS_MAX_CONNECTIONS=7
+    )
+    def test_create_client(self):
+        """
+        Assert that the client keeps the db and TLS of the url,
+        and that the queues are shared.
+        """
+        # create_client is patched in setUp, so use the one imported above
+        client = create_client()
+        pool = client.connection_pool
+
+        # make assertions
+        self.assertIsInstance(pool, MeteredConnectionPool)
+        self.assertEqual(pool.max_connections, 7)
+        self.assertEqual(pool.connection_class, redis.SSLConnection)
+        self.assertEqual(pool.connection_kwargs["db"], 2)
+        self.assertEqual(pool.connection_kwargs["password"], "password")
+        self.assertEqual(pool.connection_kwargs["ssl_cert_reqs"], "required")
+        self.assertIs(
+            redis_client.RedisConnection().get_high_queue(),
+            redis_client.RedisConnection().get_high_queue()
+        )
+
+
+class BlockTimestampCacheTests(BaseTest):
+    """
+    Tests behavior of the block timestamp cache.
+    """
+
+    def test_get_many(self):
+        """
+        Assert that final blocks are served from memory,
+        recent blocks from redis for a short time,
+        and that hits and misses are counted.
+        """
+        # set up test
+        block_timestamps.set_many({100: 1000, 200: 2000})
+
+        # make assertions
+        found = block_timestamps.get_many([100, 200, 300])
+        self.assertEqual(found, {100: 1000, 200: 2000})
+        self.assertEqual(block_timestamps.stats["memory_hits"], 1)
+        self.assertEqual(block_timestamps.stats["redis_hits"], 1)
+        self.assertEqual(block_timestamps.stats["misses"], 1)
+
+        # assert that the recent block expires soon
+        ttl = self.redis_backend.ttl("block-timestamp:1:200")
+        self.assertLessEqual(ttl, blocks.recent_ttl)
+
+    def test_invalidate(self):
+        """
+        Assert that an invalidated block is dropped from the cache.
+        """
+        # set up test
+        block_timestamps.set_many({100: 1000, 200: 2000})
+
+        # invalidate blocks
+        block_timestamps.invalidate(100)
+        block_timestamps.invalidate(200)
+
+        # make assertions
+        self.assertEqual(block_timestamps.get_many([100, 200]), {})
 
 
 class PostTests(BaseTest):
@@ -1274,6 +2368,95 @@ class PostTests(BaseTest):
         self.assertEqual(len(jobs), 1)
         self.assertEqual(jobs[0], self.test_signer.address)
 
+        # assert that visiting again does not enqueue another job
+        resp = self.client.get(url)
+        self.assertEqual(len(queue.get_job_ids()), 1)
+
+    def _create_posts_at(self, profile, created, amount):
+        """
+        Utility function to create amount number of Posts
+        of the given profile that are all created at the given time.
+        Returns the created Posts.
+        """
+        return [
+            Post.objects.create(
+                author=profile,
+                text=f"post {i}",
+                isShare=False,
+                isQuote=False,
+                created=created
+            )
+            for i in range(amount)
+        ]
+
+    def test_list_posts_with_cursor(self):
+        """
+        Assert that posts are paged through from newest to oldest,
+        including posts created at the same time, without being
+        shifted by posts created in between requests.
+        """
+        # set up test
+        self._do_login(self.test_signer)
+        profile = Profile.objects.get(user_id=self.test_signer.address)
+        now = datetime.now(timezone.utc)
+        posts = self._create_posts_at(profile, now - timedelta(hours=1), 3)
+        posts += self._create_posts_at(profile, now - timedelta(hours=2), 2)
+        expected = sorted(
+            posts,
+            key=lambda post: (post.created, post.id),
+            reverse=True
+        )
+
+        # get the posts two per page, creating a new post after page 1
+        results = []
+        url = f"/api/{self.test_signer.address}/posts/"
+        with mock.patch.object(pagination.PostsPagination, "page_size", 2):
+            while url is not None:
+                resp = self.client.get(url)
+                self.assertEqual(resp.status_code, 200)
+                self.assertNotIn("count", resp.data)
+                results += [post["id"] for post in resp.data["results"]]
+                url = resp.data["next"]
+                if len(results) == 2:
+                    self._create_posts_at(profile, now, 1)
+
+        # make assertions
+        self.assertEqual(results, [post.id for post in expected])
+
+        # assert that an invalid cursor is not found
+        resp = self.client.get(
+            f"/api/{self.test_signer.address}/posts/?cursor=invalid"
+        )
+        self.assertEqual(resp.status_code, 404)
+
+    def test_list_posts_of_synced_address(self):
+        """
+        Assert that no job is enqueued to fetch the tx history
+        of an address whose history was synced recently.
+        """
+        # set up test
+        address = self.test_signer.address
+        covalent_jobs.set_state(address, covalent_jobs.DONE)
+
+        # make request
+        url = f"/api/{address}/posts/"
+        resp = self.client.get(url)
+
+        # make assertions
+        self.assertEqual(resp.status_code, 200)
+        queue = rq.Queue(connection=self.redis_backend, name="high")
+        self.assertEqual(queue.get_job_ids(), [])
+
+        # assert that the history is synced again once the state is stale
+        self.assertEqual(
+            self.redis_backend.ttl(covalent_jobs.get_state_key(address)),
+            settings.TX_HISTORY_SYNC_INTERVAL
+        )
+        self.redis_backend.delete(covalent_jobs.get_state_key(address))
+        resp = self.client.get(url)
+        self.assertEqual(queue.get_job_ids(), [address])
+        self.assertEqual(covalent_jobs.get_state(address)[0], covalent_jobs.QUEUED)
+
     def test_update_post(self):
         """
         Assert that a post is updated successfully.
@@ -1446,9 +2629,18 @@ class PostTests(BaseTest):
         # make assertions
         self.assertEqual(resp.status_code, 201)
 
+        # assert that the fan-out was queued, and run it
+        fanout = MentionFanout.objects.get()
+        self.assertEqual(fanout.post_id, resp.data["id"])
+        self._run_fanout_job(fanout)
+
         # assert that all users received notifications
         notifs = Notification.objects.filter(user__user_id__in=addresses[1:])
         self.assertEqual(notifs.count(), 4)
+        self.assertEqual(
+            Post.objects.get(pk=resp.data["id"]).tagged_users.count(),
+            len(Profile.objects.exclude(user__last_login=None)) - 1
+        )
         self.assertEqual(
             MentionedInPostEvent.objects.filter(
                 notification__in=notifs
@@ -1484,7 +2676,7 @@ class PostTests(BaseTest):
         self.client.post(url)
 
         # assert post was liked successfully
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
         self.assertEqual(resp.data["count"], 1)
         self.assertEqual(
             resp.data["results"][0]["liker"]["address"], 
@@ -1495,7 +2687,7 @@ class PostTests(BaseTest):
         resp = self.client.delete(url)
 
         # assert post was unliked successfully
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
         self.assertEqual(resp.data["count"], 0)
         self.assertEqual(resp.data["results"], [])
 
@@ -1519,7 +2711,7 @@ class PostTests(BaseTest):
         self.assertEqual(resp.status_code, 400)
 
         # assert that total likes is 1
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
         self.assertEqual(resp.data["count"], 1)
         self.assertEqual(
             resp.data["results"][0]["liker"]["address"], 
@@ -1738,7 +2930,138 @@ class PostTests(BaseTest):
         self.assertEqual(resp.status_code, 404)
 
 
-class CommentsTests(BaseTest):
+class PostQueryCountTests(BaseTest):
+    """
+    Test that serializing pages of posts runs a constant number of
+    queries, regardless of the amount of posts and their engagement.
+    """
+
+    def setUp(self):
+        """ Runs before each test. """
+
+        super().setUp()
+
+        # user 1 follows user 2, and a feed follows both of them
+        self._do_login(self.test_signer_2)
+        self._do_login(self.test_signer)
+        self._follow_user(self.test_signer_2.address)
+        self.feed_id = self._create_feed().data["id"]
+        self._add_feed_following(self.feed_id, self.test_signer.address)
+        self._add_feed_following(self.feed_id, self.test_signer_2.address)
+
+        # tx history of user 1
+        self.mock_responses.add(
+            responses.GET,
+            covalent_jobs.get_tx_history_url(self.test_signer.address, 0),
+            body=self.erc20_tx_resp_data
+        )
+        covalent_jobs.process_address_txs(self.test_signer.address)
+
+    def _add_posts(self):
+        """
+        Utility function that makes user 2 create posts,
+        and makes user 1 like, comment on, repost, and quote them.
+        """
+        self.create_post_data.update(isShare=False, refPost=None)
+        self._do_login(self.test_signer_2)
+        post_ids = [self._create_post().data["id"] for i in range(2)]
+
+        self._do_login(self.test_signer)
+        for post_id in post_ids:
+            self.client.post(f"/api/post/{post_id}/likes/")
+            self._create_comment(post_id, "gm")
+        self._repost(post_ids[0])
+        data = dict(self.create_post_data, isShare=False, isQuote=True,
+                    refPost=post_ids[1])
+        quote_id = self.client.post("/api/post/", data).data["id"]
+
+        return quote_id
+
+    def _count_queries(self, url):
+        """
+        Utility function that returns the number of
+        queries run by a GET request to the given url.
+        """
+        with CaptureQueriesContext(connection) as context:
+            resp = self.client.get(url)
+
+        self.assertEqual(resp.status_code, 200)
+        return len(context.captured_queries)
+
+    def _assert_constant_queries(self, url):
+        """
+        Asserts that the number of queries run by a GET request
+        to the given url does not grow with the number of posts.
+        """
+        self._add_posts()
+        expected = self._count_queries(url)
+        self._add_posts()
+        self._add_posts()
+        self.assertEqual(self._count_queries(url), expected)
+
+    def test_list_posts_queries(self):
+        """ Assert the posts of a user are listed in constant queries. """
+
+        self._assert_constant_queries(f"/api/{self.test_signer.address}/posts/")
+
+    def test_my_feed_queries(self):
+        """ Assert a user's feed is listed in constant queries. """
+
+        self._assert_constant_queries("/api/feed/")
+
+    def test_my_feed_timeline_queries(self):
+        """ Assert a user's feed is read from its timeline in constant queries. """
+
+        profile = Profile.objects.get(user_id=self.test_signer.address)
+        timeline_jobs.build_home_timeline(profile.pk)
+        self._assert_constant_queries("/api/feed/")
+
+    def test_feed_items_queries(self):
+        """ Assert the items of a Feed are listed in constant queries. """
+
+        self._assert_constant_queries(f"/api/feeds/{self.feed_id}/items/")
+
+    def test_retrieve_post_queries(self):
+        """ Assert a quote post is retrieved in constant queries. """
+
+        quote_id = self._add_posts()
+        expected = self._count_queries(f"/api/post/{quote_id}/")
+        self._add_posts()
+        self.assertEqual(self._count_queries(f"/api/post/{quote_id}/"), expected)
+
+    def test_by_me_fields_queries(self):
+        """
+        Assert that the authed user's follows, likes and reposts are
+        each loaded once per request, however many posts and authors
+        of them are serialized.
+        """
+        # set up test
+        self._add_posts()
+        self._add_posts()
+
+        # make request
+        with CaptureQueriesContext(connection) as context:
+            resp = self.client.get("/api/feed/")
+
+        # make assertions
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(any(post["likedByMe"] for post in resp.data["results"]))
+        self.assertTrue(
+            any(post["repostedByMe"] for post in resp.data["results"])
+        )
+        self.assertTrue(any(
+            post["author"]["followedByMe"] for post in resp.data["results"]
+        ))
+        queries = [query["sql"] for query in context.captured_queries]
+        for table in ["blockso_app_follow", "blockso_app_postlike"]:
+            self.assertEqual(
+                len([sql for sql in queries
+                     if sql.startswith(f'SELECT "{table}"')]),
+                1
+            )
+
+
+class CommentsTests(BaseTest):
     """
     Test behavior around comments.
     """
@@ -1833,6 +3156,11 @@ class CommentsTests(BaseTest):
         # make assertions
         self.assertEqual(resp.status_code, 201)
 
+        # assert that the fan-out was queued, and run it
+        fanout = MentionFanout.objects.get()
+        self.assertEqual(fanout.comment_id, resp.data["id"])
+        self._run_fanout_job(fanout)
+
         # assert that all users received notifications
         notifs = Notification.objects.filter(user__user_id__in=addresses[1:])
         self.assertEqual(notifs.count(), 4)
@@ -1851,6 +3179,60 @@ class CommentsTests(BaseTest):
             0
         )
 
+    def test_mention_fanout_resumes(self):
+        """
+        Assert that a fan-out of an everyone mention that stopped
+        part way resumes from its last chunk without notifying
+        any user twice.
+        """
+        # set up test
+        # create 5 users and a post that mentions everyone
+        signers = self._create_users(5)
+        addresses = [signer.address for signer in signers]
+        self._do_login(signers[0])
+        resp = self._create_post(tagged_users=["everyone"])
+        fanout = MentionFanout.objects.get()
+        recipients = Profile.objects.exclude(user__last_login=None)\
+            .exclude(user_id=addresses[0])
+
+        # run only the first chunk, as if the job died after it
+        with mock.patch.object(notifications, "chunk_size", 2):
+            self.assertTrue(notifications._run_chunk(fanout.pk))
+        fanout.refresh_from_db()
+        self.assertFalse(fanout.done)
+        self.assertEqual(
+            fanout.last_profile_id,
+            recipients.order_by("pk")[1].pk
+        )
+        self.assertEqual(Notification.objects.count(), 2)
+
+        # make request to resume the fan-outs that are not done
+        call_command("resume-mention-fanouts")
+        with mock.patch.object(notifications, "chunk_size", 2):
+            num_jobs = self._run_fanout_job(fanout)
+
+        # make assertions
+        # one job for the remaining chunk, one that finds no users left
+        self.assertEqual(num_jobs, 2)
+        self.assertTrue(fanout.done)
+        self.assertEqual(Notification.objects.count(), recipients.count())
+        for profile in recipients:
+            self.assertEqual(
+                MentionedInPostEvent.objects.filter(
+                    notification__user=profile,
+                    post_id=resp.data["id"]
+                ).count(),
+                1
+            )
+
+        # assert that running a fan-out that is done is a no-op
+        notification_jobs.run_mention_fanout(fanout.pk)
+        self.assertEqual(Notification.objects.count(), recipients.count())
+        self.assertEqual(
+            set(recipients.values_list("num_unread_notifications", flat=True)),
+            {1}
+        )
+
     def test_list_comments(self):
         """
         Assert that a user can view comments on a post.
@@ -1958,7 +3340,7 @@ class CommentsTests(BaseTest):
         self.client.post(url)
 
         # assert comment was liked successfully
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
         self.assertEqual(resp.data["count"], 1)
         self.assertEqual(
             resp.data["results"][0]["liker"]["address"], 
@@ -1969,7 +3351,7 @@ class CommentsTests(BaseTest):
         resp = self.client.delete(url)
 
         # assert comment was unliked successfully
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
         self.assertEqual(resp.data["count"], 0)
         self.assertEqual(resp.data["results"], [])
 
@@ -1995,7 +3377,7 @@ class CommentsTests(BaseTest):
         self.assertEqual(resp.status_code, 400)
 
         # assert that total likes is 1
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
         self.assertEqual(resp.data["count"], 1)
         self.assertEqual(
             resp.data["results"][0]["liker"]["address"], 
@@ -2077,7 +3459,7 @@ class FeedTests(BaseTest):
         # get the posts of the created Feed
         self._do_logout()
         url = f"/api/feeds/{feed.id}/items/"
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
 
         # make assertions
         self.assertEqual(resp.status_code, 200)
@@ -2254,9 +3636,6 @@ class FeedTests(BaseTest):
         including number of followers, number of following, and
         whether it is followed by the requesting user.
         """
-        # mock out the request to alchemy
-        self.mock_responses.add(responses.PUT, alchemy.url)
-
         # create feed
         self._do_login(self.test_signer)
         resp = self._create_feed()
@@ -2288,9 +3667,6 @@ class FeedTests(BaseTest):
         Assert that a Feed owner can make the Feed follow a profile.
         Assert that a Feed owner can make the Feed unfollow a profile.
         """
-        # mock out the request to alchemy
-        self.mock_responses.add(responses.PUT, alchemy.url)
-
         # create feed
         self._do_login(self.test_signer)
         resp = self._create_feed()
@@ -2305,11 +3681,17 @@ class FeedTests(BaseTest):
             feed.following.filter(user_id=self.test_signer_2.address).exists()
         )
 
-        # assert that a job was enqueued to fetch user 2's tx history
+        # assert that a job was enqueued to fetch user 2's tx history,
+        # next to the one that syncs the watched addresses, and the one
+        # that adds user 2's posts to the timeline of the feed's owner
         queue = rq.Queue(connection=self.redis_backend, name="high")
         jobs = queue.get_job_ids()
-        self.assertEqual(len(jobs), 1)
-        self.assertEqual(jobs[0], self.test_signer_2.address)
+        self.assertEqual(len(jobs), 3)
+        self.assertEqual(jobs[1], self.test_signer_2.address)
+        self.assertEqual(
+            queue.fetch_job(jobs[2]).func,
+            timeline_jobs.add_authors_to_home_timelines
+        )
 
         # make request to remove user 2 from the feed's following
         resp = self.client.delete(url)
@@ -2324,9 +3706,6 @@ class FeedTests(BaseTest):
         Assert that non-owners of Feeds cannot make the
         Feed follow/unfollow a profile.
         """
-        # mock out the request to alchemy
-        self.mock_responses.add(responses.PUT, alchemy.url)
-
         # create feed
         self._do_login(self.test_signer)
         resp = self._create_feed()
@@ -2365,9 +3744,6 @@ class FeedTests(BaseTest):
         Assert that any authed user can make the Feed unfollow a profile,
         if the feed is open to editing by the public.
         """
-        # mock out the request to alchemy
-        self.mock_responses.add(responses.PUT, alchemy.url)
-
         # create feed
         self._do_login(self.test_signer)
         resp = self._create_feed(editable=True)
@@ -2413,9 +3789,6 @@ class FeedTests(BaseTest):
         """
         Assert that a user can list the profiles that a feed is following.
         """
-        # mock out the request to alchemy
-        self.mock_responses.add(responses.PUT, alchemy.url)
-
         # create feed and make it follow user 2
         self._do_login(self.test_signer)
         resp = self._create_feed()
@@ -2526,9 +3899,6 @@ class FeedTests(BaseTest):
         """
         Assert that any user can list a Feed's items.
         """
-        # mock out the request to alchemy
-        self.mock_responses.add(responses.PUT, alchemy.url)
-
         # create 2 users and make them create 1 post each
         self._do_login(self.test_signer)
         self._create_post()
@@ -2544,7 +3914,7 @@ class FeedTests(BaseTest):
         # make a request as an anonymous user to list the items of the feed
         url = f"/api/feeds/{feed_id}/items/"
         self._do_logout()
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
 
         # make assertions
         self.assertEqual(resp.status_code, 200)
@@ -2575,9 +3945,6 @@ class FeedTests(BaseTest):
         Assert that a 404 if returned if the feed does not follow the user.
         """
         # setup
-        # mock out the request to alchemy
-        self.mock_responses.add(responses.PUT, alchemy.url)
-
         # create a feed and add a user to the profiles it follows
         self._do_login(self.test_signer)
         resp = self._create_feed()
@@ -2710,7 +4077,7 @@ class MyFeedTests(BaseTest):
 
         # make request to get a feed
         url = "/api/feed/"
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
 
         # make assertions
         self.assertEqual(resp.status_code, 200)
@@ -2739,9 +4106,6 @@ class MyFeedTests(BaseTest):
         Assert that if a user is following others,
         both their posts and those they follow will show up in their feed.
         """
-        # set up test
-        self.mock_responses.add(responses.PUT, alchemy.url)
-
         # login user 2, create a post
         self._do_login(self.test_signer_2)
         resp = self._create_post()
@@ -2757,7 +4121,7 @@ class MyFeedTests(BaseTest):
 
         # get feed of user 1
         url = "/api/feed/"
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
 
         # assert user 1 feed has the posts of user 1 and user 2
         self.assertEqual(resp.status_code, 200)
@@ -2777,9 +4141,6 @@ class MyFeedTests(BaseTest):
         the user's feed will include posts from the feeds they follow.
         """
         # set up test
-        # mock out the request to alchemy
-        self.mock_responses.add(responses.PUT, alchemy.url)
-
         # create a feed by user 1 and make the feed follow user 1
         self._do_login(self.test_signer)
         resp = self._create_feed()
@@ -2795,7 +4156,7 @@ class MyFeedTests(BaseTest):
 
         # assert that user 1's post shows up in user 2' My Feed
         url = f"/api/feed/"
-        resp = self.client.get(url) 
+        resp = self.client.get(url, {"count": "true"}) 
         self.assertEqual(resp.data["count"], 1)
         self.assertEqual(
             resp.data["results"][0]["author"]["address"],
@@ -2803,192 +4164,807 @@ class MyFeedTests(BaseTest):
         )
 
 
-class ExploreTests(BaseTest):
+class CounterTests(BaseTest):
     """
-    Test behavior around explore page.
+    Test behavior around the denormalized engagement counters.
     """
 
-    def test_explore_feed(self):
+    def test_post_counters(self):
         """
-        Assert that the explore endpoint returns a featured feed.
+        Assert that likes, comments, and reposts of a post
+        update the post's counters.
         """
         # set up test
-        # create a feed
+        self._do_login(self.test_signer_2)
+        post_id = self._create_post().data["id"]
         self._do_login(self.test_signer)
-        resp = self._create_feed()
-        feed = Feed.objects.get(pk=resp.data["id"])
 
-        # make a request to the explore endpoint
-        self._do_logout()
-        url = "/api/explore/"
-        resp = self.client.get(url)
+        # like, comment, and repost the post
+        self.client.post(f"/api/post/{post_id}/likes/")
+        self._create_comment(post_id, "gm")
+        self._repost(post_id)
+        post = Post.objects.get(pk=post_id)
+        self.assertEqual(
+            (post.num_likes, post.num_comments, post.num_reposts),
+            (1, 1, 1)
+        )
 
-        # assert that the created feed is in the featured feeds
-        self.assertEqual(resp.status_code, 200)
-        self.assertEqual(resp.data["feeds"][0]["name"], feed.name)
-        self.assertEqual(resp.data["feeds"][0]["image"], None)
+        # unlike the post and delete the repost
+        self.client.delete(f"/api/post/{post_id}/likes/")
+        self.client.delete(f"/api/post/{post_id}/repost/")
+        post.refresh_from_db()
+        self.assertEqual((post.num_likes, post.num_reposts), (0, 0))
 
-    def test_explore_profiles_by_follower_count(self):
+    def test_follow_counters(self):
         """
-        Assert that the top 8 profiles by follower count are returned.
+        Assert that following and unfollowing a user
+        updates the followers and following counters.
         """
         # set up test
-        self.mock_responses.add(responses.PUT, alchemy.url)
-        signers = self._create_users(10)
+        self._do_login(self.test_signer_2)
+        self._do_login(self.test_signer)
+        user_1 = Profile.objects.get(user_id=self.test_signer.address)
+        user_2 = Profile.objects.get(user_id=self.test_signer_2.address)
 
-        # make each user follow the remaining users
-        # so user 1 follows users 2-10
-        # user 2 follows users 3-10, etc
-        for i in range(10):
-            self._do_login(signers[i])
-            for j in range(i+1, 10):
-                url = f"/api/{signers[j].address}/follow/"
-                self.client.post(url)
+        # follow user 2
+        self._follow_user(self.test_signer_2.address)
+        user_1.refresh_from_db()
+        user_2.refresh_from_db()
+        self.assertEqual((user_1.num_following, user_2.num_followers), (1, 1))
 
-        # make request to fetch explore page profiles
-        self._do_logout()
-        url = "/api/explore/"
-        resp = self.client.get(url)
+        # unfollow user 2
+        self.client.delete(f"/api/{self.test_signer_2.address}/follow/")
+        user_1.refresh_from_db()
+        user_2.refresh_from_db()
+        self.assertEqual((user_1.num_following, user_2.num_followers), (0, 0))
 
-        # make assertions
-        # assert that the top 8 profiles are returned
-        self.assertEqual(len(resp.data["profiles"]), 8)
+    def test_feed_follow_counters(self):
+        """
+        Assert that following a feed twice only counts one follower.
+        """
+        # set up test
+        self._do_login(self.test_signer)
+        feed_id = self._create_feed().data["id"]
 
-        # assert that the explore profiles are sorted
-        # in order from most followers to least
-        # user 10 should have the most followers
-        # user 3 should have the least followers
-        for i in range(8):
-            self.assertEqual(
-                resp.data["profiles"][i]["address"],
-                signers[9-i].address
-            )
+        # follow the feed twice with user 2, then unfollow it
+        self._do_login(self.test_signer_2)
+        self._follow_feed(feed_id)
+        self._follow_feed(feed_id)
+        self.assertEqual(Feed.objects.get(pk=feed_id).num_followers, 2)
+        self.client.delete(f"/api/feeds/{feed_id}/follow/")
+        self.client.delete(f"/api/feeds/{feed_id}/follow/")
+        self.assertEqual(Feed.objects.get(pk=feed_id).num_followers, 1)
 
-    def test_explore_feeds_by_follower_count(self):
+    def test_reconcile_counters(self):
         """
-        Assert that the 4 most followed feeds are returned.
+        Assert that the reconcile-counters command repairs drifted counters.
         """
-        # create 4 feeds
+        # set up test
+        self._do_login(self.test_signer_2)
+        post_id = self._create_post().data["id"]
         self._do_login(self.test_signer)
-        feeds = []
-        for i in range(4):
-            resp = self._create_feed(name=i)
-            feeds.append(resp.data["id"])
+        self.client.post(f"/api/post/{post_id}/likes/")
+        feed_id = self._create_feed().data["id"]
 
-        # create 4 users and follow the feeds in decreasing amounts
-        # feeds[0] gets the most follows, feeds[3] gets the least
-        signers = self._create_users(4)
-        for i in range(4):
-            self._do_login(signers[i])
-            for j in range(0, 4-i):
-                self._follow_feed(feeds[j])
+        # make the counters drift
+        Post.objects.update(num_likes=5, num_comments=2)
+        Feed.objects.update(num_followers=0)
+        Profile.objects.update(num_followers=3)
 
-        # make request to explore endpoint
-        self._do_logout()
-        url = "/api/explore/"
-        resp = self.client.get(url)
+        # run the command
+        with mock.patch("builtins.print"):
+            call_command("reconcile-counters")
 
-        # assert that the feeds are sorted
-        # from most followers to least followers
-        for i in range(4):
-            self.assertEqual(resp.data["feeds"][i]["name"], str(i))
+        # make assertions
+        post = Post.objects.get(pk=post_id)
+        self.assertEqual((post.num_likes, post.num_comments), (1, 0))
+        self.assertEqual(Feed.objects.get(pk=feed_id).num_followers, 1)
+        self.assertFalse(Profile.objects.exclude(num_followers=0).exists())
 
 
-class NotificationTests(BaseTest):
+class HomeTimelineTests(BaseTest):
     """
-    Test behavior around notifications.
+    Test behavior around the materialized timeline of a user's feed.
     """
 
-    def test_get_notifs(self):
+    def _build_home_timeline(self, signer):
         """
-        Assert that a logged in user can get a list of notifications.
+        Utility function to build the home timeline of the given signer.
+        Returns the built timeline.
+        """
+        profile = Profile.objects.get(user_id=signer.address)
+        timeline_jobs.build_home_timeline(profile.pk)
+
+        return timelines.get_home_timeline(profile.pk)
+
+    def test_get_feed_queues_timeline_build(self):
+        """
+        Assert that a job to build the user's timeline is queued
+        when getting a feed whose timeline is not built,
+        and that the feed is read from the database meanwhile.
         """
         # set up test
-        # user 1 logs in
         self._do_login(self.test_signer)
+        post_id = self._create_post().data["id"]
 
-        # make request for notifications
-        url = "/api/notifications/"
-        resp = self.client.get(url)
+        # make request to get a feed
+        resp = self.client.get("/api/feed/")
 
-        # make assertions
-        self.assertEqual(resp.status_code, 200)
-        self.assertEqual(resp.data["results"], [])
+        # assert the feed was read and a job was queued
+        self.assertEqual(resp.data["results"][0]["id"], post_id)
+        profile = Profile.objects.get(user_id=self.test_signer.address)
+        timeline = timelines.get_home_timeline(profile.pk)
+        queue = rq.Queue(connection=self.redis_backend, name="high")
+        self.assertEqual(
+            queue.get_job_ids(),
+            [alchemy.sync_job_id, timeline.key]
+        )
 
-    def test_get_notifs_unauthed(self):
+        # assert the timeline contains the post once it is built
+        self._build_home_timeline(self.test_signer)
+        self.assertTrue(timeline.is_ready())
+        self.assertEqual(timeline.get_all_post_ids(), [post_id])
+
+    def test_get_feed_from_timeline(self):
         """
-        Assert that a logged out user cannot get a list of notifications.
+        Assert that the feed read from the timeline
+        is the same as the feed read from the database.
         """
         # set up test
+        self._do_login(self.test_signer_2)
+        self._create_post()
+        self._do_login(self.test_signer)
+        self._create_post()
+        self._follow_user(self.test_signer_2.address)
+        expected = self.client.get("/api/feed/?count=true").data
 
-        # make request for notifications
-        url = "/api/notifications/"
-        resp = self.client.get(url)
+        # build the timeline and get the feed again
+        self._build_home_timeline(self.test_signer)
+        resp = self.client.get("/api/feed/?count=true")
 
         # make assertions
-        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(resp.data, expected)
+        self.assertEqual(resp.data["count"], 2)
 
-    def test_comment_on_post_notifs(self):
+    def test_new_posts_fan_out(self):
         """
-        Assert that a user gets a notification when
-        another user comments on their post.
+        Assert that new posts and reposts are added to
+        the timelines of the author and their followers.
         """
         # set up test
-        # user 1 creates a post
+        self._do_login(self.test_signer_2)
+        author_timeline = self._build_home_timeline(self.test_signer_2)
         self._do_login(self.test_signer)
-        resp = self._create_post()
-        post_id = resp.data["id"]
-        self._do_logout()
-
-        # user 2 comments on user 1's post
+        self._follow_user(self.test_signer_2.address)
+        timeline = self._build_home_timeline(self.test_signer)
         self._do_login(self.test_signer_2)
-        self._create_comment(post_id, text="hello")
-        self._do_logout()
 
-        # make request to get user 1's notifications
+        # user 2 creates a post, and user 1 reposts it
+        post_id = self._create_post().data["id"]
         self._do_login(self.test_signer)
-        url = "/api/notifications/"
-        resp = self.client.get(url)
+        repost_id = self._repost(post_id).data["id"]
 
         # make assertions
-        self.assertEqual(resp.status_code, 200)
-        self.assertEqual(resp.data["count"], 1)
-        notification = resp.data["results"][0]
-        self.assertEqual(notification["viewed"], False)
-        event = notification["events"]["commentOnPostEvent"]
-        self.assertEqual(event["post"], post_id)
-        self.assertEqual(
-            event["commentor"]["address"],
-            self.test_signer_2.address
-        )
+        self.assertEqual(timeline.get_all_post_ids(), [repost_id, post_id])
+        self.assertEqual(author_timeline.get_all_post_ids(), [post_id])
 
-    def test_mentioned_in_post_notif(self):
+    def test_follow_unfollow_updates_timeline(self):
         """
-        Assert that a user gets a notification when
-        another user mentions them in a post.
+        Assert that following a user adds their posts to the timeline,
+        and that unfollowing them removes their posts.
         """
         # set up test
-        # create users 1 and 2
-        self._do_login(self.test_signer)
         self._do_login(self.test_signer_2)
-        # user 2 tags user 1 in a post
-        tagged = [self.test_signer.address]
-        resp = self._create_post(
-            tagged_users=tagged
-        )
-        post_id = resp.data["id"]
-
-        # make request to get user 1's notifications
+        post_id = self._create_post().data["id"]
         self._do_login(self.test_signer)
-        url = "/api/notifications/"
-        resp = self.client.get(url)
+        timeline = self._build_home_timeline(self.test_signer)
 
-        # assert that user 1 has a notification for post mention
-        self.assertEqual(resp.status_code, 200)
-        self.assertEqual(resp.data["count"], 1)
-        notification = resp.data["results"][0]
-        self.assertEqual(notification["viewed"], False)
-        event = notification["events"]["mentionedInPostEvent"]
+        # follow user 2
+        self._follow_user(self.test_signer_2.address)
+        self.assertEqual(timeline.get_all_post_ids(), [post_id])
+
+        # unfollow user 2
+        self.client.delete(f"/api/{self.test_signer_2.address}/follow/")
+        self.assertEqual(timeline.get_all_post_ids(), [])
+
+    def test_follow_unfollow_feed_updates_timeline(self):
+        """
+        Assert that following a feed adds the posts of its profiles to the
+        timeline, and that unfollowing the feed removes them.
+        """
+        # set up test
+        self._do_login(self.test_signer_2)
+        post_id = self._create_post().data["id"]
+        feed_id = self._create_feed().data["id"]
+        self._add_feed_following(feed_id, self.test_signer_2.address)
+        self._do_login(self.test_signer)
+        timeline = self._build_home_timeline(self.test_signer)
+
+        # follow the feed
+        self._follow_feed(feed_id)
+        self.assertEqual(timeline.get_all_post_ids(), [post_id])
+
+        # assert new posts of the feed's profiles are added
+        self._do_login(self.test_signer_2)
+        new_post_id = self._create_post().data["id"]
+        self.assertEqual(
+            timeline.get_all_post_ids(),
+            [new_post_id, post_id]
+        )
+
+        # unfollow the feed
+        self._do_login(self.test_signer)
+        self.client.delete(f"/api/feeds/{feed_id}/follow/")
+        self.assertEqual(timeline.get_all_post_ids(), [])
+
+    def test_delete_post_removes_it_from_timeline(self):
+        """
+        Assert that a deleted post is removed from the timelines.
+        """
+        # set up test
+        self._do_login(self.test_signer)
+        timeline = self._build_home_timeline(self.test_signer)
+        post_id = self._create_post().data["id"]
+
+        # delete the post
+        self.client.delete(f"/api/post/{post_id}/")
+
+        # make assertions
+        self.assertEqual(timeline.get_all_post_ids(), [])
+
+    def test_timeline_write_failures(self):
+        """
+        Assert that posts are created and deleted when their timelines
+        cannot be written to, and that those timelines are invalidated.
+        """
+        # set up test
+        self._do_login(self.test_signer)
+        timeline = self._build_home_timeline(self.test_signer)
+
+        # create a post while the timelines cannot be checked
+        with mock.patch.object(timelines, "_get_existing",
+                               side_effect=redis.exceptions.ConnectionError):
+            with self.assertLogs(timelines.logger, "ERROR"):
+                resp = self._create_post()
+        self.assertEqual(resp.status_code, 201)
+        self.assertIsNone(timeline.get_state())
+
+        # delete the post while redis is unavailable
+        timeline = self._build_home_timeline(self.test_signer)
+        with mock.patch.object(redis.client.Pipeline, "execute",
+                               side_effect=redis.exceptions.ConnectionError):
+            with self.assertLogs(timelines.logger, "ERROR"):
+                resp = self.client.delete(f"/api/post/{resp.data['id']}/")
+        self.assertEqual(resp.status_code, 204)
+        self.assertFalse(Post.objects.exists())
+
+    @mock.patch("blockso_app.timelines.max_length", 2)
+    def test_get_feed_beyond_trimmed_timeline(self):
+        """
+        Assert that pages beyond a trimmed timeline
+        are read from the database.
+        """
+        # set up test
+        self._do_login(self.test_signer)
+        timeline = self._build_home_timeline(self.test_signer)
+        post_ids = [self._create_post().data["id"] for i in range(3)]
+
+        # get the feed one post per page
+        results = []
+        url = "/api/feed/?count=true"
+        while url is not None:
+            with mock.patch.object(pagination.FeedItemsPagination,
+                                   "page_size", 1):
+                resp = self.client.get(url)
+            results += [post["id"] for post in resp.data["results"]]
+            self.assertEqual(resp.data["count"], 3)
+            url = resp.data["next"]
+
+        # make assertions
+        self.assertEqual(timeline.count(), 2)
+        self.assertEqual(results, post_ids[::-1])
+
+    def test_get_feed_from_timeline_with_cursor(self):
+        """
+        Assert that the feed is paged through from the timeline
+        in the same order as from the database,
+        including posts that were created at the same time.
+        """
+        # set up test
+        self._do_login(self.test_signer)
+        profile = Profile.objects.get(user_id=self.test_signer.address)
+        created = datetime.now(timezone.utc)
+        posts = [
+            Post.objects.create(
+                author=profile,
+                isShare=False,
+                isQuote=False,
+                created=created - timedelta(minutes=i // 4)
+            )
+            for i in range(12)
+        ]
+        timeline = self._build_home_timeline(self.test_signer)
+
+        # get the feed five posts per page
+        results = []
+        url = "/api/feed/"
+        with mock.patch.object(pagination.FeedItemsPagination,
+                               "page_size", 5):
+            while url is not None:
+                resp = self.client.get(url)
+                results += [post["id"] for post in resp.data["results"]]
+                url = resp.data["next"]
+
+        # make assertions
+        self.assertEqual(timeline.count(), 12)
+        self.assertEqual(
+            results,
+            list(timelines.get_home_posts(profile).values_list("id", flat=True))
+        )
+        self.assertEqual(sorted(results), [post.id for post in posts])
+
+    def test_get_feed_from_timeline_skips_deleted_posts(self):
+        """
+        Assert that pages of the feed are filled past the ids of posts
+        that were deleted without leaving the timeline,
+        and that those ids are removed from the timeline.
+        """
+        # set up test
+        self._do_login(self.test_signer)
+        profile = Profile.objects.get(user_id=self.test_signer.address)
+        created = datetime.now(timezone.utc)
+        posts = [
+            Post.objects.create(
+                author=profile,
+                isShare=False,
+                isQuote=False,
+                created=created - timedelta(minutes=i)
+            )
+            for i in range(5)
+        ]
+        timeline = self._build_home_timeline(self.test_signer)
+        Post.objects.filter(pk=posts[1].pk).delete()
+
+        # get the feed two posts per page
+        results = []
+        counts = []
+        url = "/api/feed/?count=true"
+        with mock.patch.object(pagination.FeedItemsPagination,
+                               "page_size", 2):
+            while url is not None:
+                resp = self.client.get(url)
+                results += [post["id"] for post in resp.data["results"]]
+                counts.append(resp.data["count"])
+                url = resp.data["next"]
+
+        # make assertions
+        self.assertEqual(
+            results,
+            [post.id for post in posts if post.pk != posts[1].pk]
+        )
+        self.assertEqual(counts, [4, 4])
+        self.assertEqual(timeline.count(), 4)
+
+
+class FeedTimelineTests(BaseTest):
+    """
+    Test behavior around the materialized item timeline of a Feed.
+    """
+
+    def setUp(self):
+        """ Runs before each test. """
+
+        super().setUp()
+
+        # create a feed that follows user 2
+        self._do_login(self.test_signer_2)
+        self._do_login(self.test_signer)
+        self.feed_id = self._create_feed().data["id"]
+        self._add_feed_following(self.feed_id, self.test_signer_2.address)
+        self._run_timeline_jobs(timeline_jobs.add_authors_to_home_timelines)
+        self.timeline = timelines.get_feed_timeline(self.feed_id)
+
+    def test_list_feed_items_queues_timeline_build(self):
+        """
+        Assert that a job to build the Feed's timeline is queued
+        when listing the items of a Feed whose timeline is not built.
+        """
+        # make request
+        resp = self.client.get(f"/api/feeds/{self.feed_id}/items/")
+
+        # make assertions
+        self.assertEqual(resp.status_code, 200)
+        queue = rq.Queue(connection=self.redis_backend, name="high")
+        self.assertEqual(
+            queue.get_job_ids(),
+            [alchemy.sync_job_id, self.timeline.key]
+        )
+
+    def test_list_feed_items_from_timeline(self):
+        """
+        Assert that new posts of the Feed's profiles are added to the
+        Feed's timeline, and that the items are read from the timeline.
+        """
+        # set up test
+        self._do_login(self.test_signer_2)
+        first_id = self._create_post().data["id"]
+        timeline_jobs.build_feed_timeline(self.feed_id)
+        second_id = self._create_post().data["id"]
+
+        # make request
+        resp = self.client.get(f"/api/feeds/{self.feed_id}/items/?count=true")
+
+        # make assertions
+        self.assertEqual(self.timeline.get_all_post_ids(),
+                         [second_id, first_id])
+        self.assertEqual(resp.data["count"], 2)
+        self.assertEqual(
+            [post["id"] for post in resp.data["results"]],
+            [second_id, first_id]
+        )
+
+    def test_add_remove_feed_following_updates_timeline(self):
+        """
+        Assert that adding a profile to the Feed adds their posts to the
+        Feed's timeline, and that removing the profile removes their posts.
+        """
+        # set up test
+        timeline_jobs.build_feed_timeline(self.feed_id)
+        post_id = self._create_post().data["id"]
+        url = f"/api/feeds/{self.feed_id}/following/{self.test_signer.address}/"
+
+        # add user 1 to the feed
+        self.client.post(url)
+        self.assertEqual(self.timeline.get_all_post_ids(), [post_id])
+
+        # remove user 1 from the feed
+        self.client.delete(url)
+        self.assertEqual(self.timeline.get_all_post_ids(), [])
+
+    def _run_timeline_jobs(self, func):
+        """
+        Utility function that performs the queued jobs of the given
+        timeline job function. Returns the number of jobs performed.
+        """
+        queue = rq.Queue(connection=self.redis_backend, name="high")
+        jobs = [job for job in queue.get_jobs() if job.func == func]
+        for job in jobs:
+            job.perform()
+            job.delete()
+
+        return len(jobs)
+
+    def test_feed_following_updates_followers_in_background(self):
+        """
+        Assert that adding a profile to the Feed, removing it, and
+        deleting the Feed queue jobs that update the timelines
+        of the Feed's followers.
+        """
+        # set up test
+        self._do_login(self.test_signer_2)
+        post_id = self._create_post().data["id"]
+        self._do_login(self.test_signer)
+        self._follow_feed(self.feed_id)
+        profile = Profile.objects.get(user_id=self.test_signer.address)
+        timeline_jobs.build_home_timeline(profile.pk)
+        home_timeline = timelines.get_home_timeline(profile.pk)
+        self.assertEqual(home_timeline.get_all_post_ids(), [post_id])
+        url = f"/api/feeds/{self.feed_id}/following/"\
+              f"{self.test_signer_2.address}/"
+
+        # remove user 2 from the feed
+        resp = self.client.delete(url)
+        self.assertEqual(resp.status_code, 204)
+        self.assertEqual(home_timeline.get_all_post_ids(), [post_id])
+        self.assertEqual(
+            self._run_timeline_jobs(timeline_jobs.prune_home_timelines),
+            1
+        )
+        self.assertEqual(home_timeline.get_all_post_ids(), [])
+
+        # add user 2 to the feed again
+        resp = self.client.post(url)
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(home_timeline.get_all_post_ids(), [])
+        self.assertEqual(
+            self._run_timeline_jobs(
+                timeline_jobs.add_authors_to_home_timelines
+            ),
+            1
+        )
+        self.assertEqual(home_timeline.get_all_post_ids(), [post_id])
+
+        # delete the feed
+        resp = self.client.delete(f"/api/feeds/{self.feed_id}/")
+        self.assertEqual(resp.status_code, 204)
+        self.assertEqual(
+            self._run_timeline_jobs(timeline_jobs.prune_home_timelines),
+            1
+        )
+        self.assertEqual(home_timeline.get_all_post_ids(), [])
+
+
+class ExploreTests(BaseTest):
+    """
+    Test behavior around explore page.
+    """
+
+    def test_explore_feed(self):
+        """
+        Assert that the explore endpoint returns a featured feed.
+        """
+        # set up test
+        # create a feed
+        self._do_login(self.test_signer)
+        resp = self._create_feed()
+        feed = Feed.objects.get(pk=resp.data["id"])
+
+        # make a request to the explore endpoint
+        self._do_logout()
+        url = "/api/explore/"
+        resp = self.client.get(url)
+
+        # assert that the created feed is in the featured feeds
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["feeds"][0]["name"], feed.name)
+        self.assertEqual(resp.data["feeds"][0]["image"], None)
+
+    def test_explore_profiles_by_follower_count(self):
+        """
+        Assert that the top 8 profiles by follower count are returned.
+        """
+        # set up test
+        signers = self._create_users(10)
+
+        # make each user follow the remaining users
+        # so user 1 follows users 2-10
+        # user 2 follows users 3-10, etc
+        for i in range(10):
+            self._do_login(signers[i])
+            for j in range(i+1, 10):
+                url = f"/api/{signers[j].address}/follow/"
+                self.client.post(url)
+
+        # make request to fetch explore page profiles
+        self._do_logout()
+        url = "/api/explore/"
+        resp = self.client.get(url)
+
+        # make assertions
+        # assert that the top 8 profiles are returned
+        self.assertEqual(len(resp.data["profiles"]), 8)
+
+        # assert that the explore profiles are sorted
+        # in order from most followers to least
+        # user 10 should have the most followers
+        # user 3 should have the least followers
+        for i in range(8):
+            self.assertEqual(
+                resp.data["profiles"][i]["address"],
+                signers[9-i].address
+            )
+
+    def test_explore_feeds_by_follower_count(self):
+        """
+        Assert that the 4 most followed feeds are returned.
+        """
+        # create 4 feeds
+        self._do_login(self.test_signer)
+        feeds = []
+        for i in range(4):
+            resp = self._create_feed(name=i)
+            feeds.append(resp.data["id"])
+
+        # create 4 users and follow the feeds in decreasing amounts
+        # feeds[0] gets the most follows, feeds[3] gets the least
+        signers = self._create_users(4)
+        for i in range(4):
+            self._do_login(signers[i])
+            for j in range(0, 4-i):
+                self._follow_feed(feeds[j])
+
+        # make request to explore endpoint
+        self._do_logout()
+        url = "/api/explore/"
+        resp = self.client.get(url)
+
+        # assert that the feeds are sorted
+        # from most followers to least followers
+        for i in range(4):
+            self.assertEqual(resp.data["feeds"][i]["name"], str(i))
+
+    def test_explore_stale_while_revalidate(self):
+        """
+        Assert that a stale explore page is served while a single job
+        refreshes it, and that the refreshed page is served afterwards.
+        """
+        # set up test
+        signers = self._create_users(2)
+        url = "/api/explore/"
+        resp = self.client.get(url)
+        self.assertEqual(resp.data["profiles"][0]["numFollowers"], 0)
+
+        # user 1 follows user 2, and the page goes stale
+        self._do_login(signers[0])
+        self._follow_user(signers[1].address)
+        self._do_logout()
+        page = explore.load()
+        page["stale_at"] = 0
+        explore.store(page)
+
+        # make requests
+        responses = [self.client.get(url) for i in range(3)]
+
+        # assert the stale page was served and one refresh was queued
+        queue = rq.Queue(connection=self.redis_backend, name="high")
+        for resp in responses:
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.data["profiles"][0]["numFollowers"], 0)
+        self.assertEqual(queue.job_ids.count(explore.refresh_job_id), 1)
+
+        # run the refresh and assert the refreshed page is served
+        queue.fetch_job(explore.refresh_job_id).perform()
+        resp = self.client.get(url)
+        self.assertEqual(
+            resp.data["profiles"][0]["address"],
+            signers[1].address
+        )
+        self.assertEqual(resp.data["profiles"][0]["numFollowers"], 1)
+        self.assertEqual(self.redis_backend.get(explore.refresh_key), None)
+
+    def test_explore_renders_without_stored_page(self):
+        """
+        Assert that the explore page is rendered in the request when
+        another process takes long to render it, or redis is unavailable.
+        """
+        # set up test
+        self._create_users(2)
+        url = "/api/explore/"
+
+        # another process is rendering the page
+        self.redis_backend.set(explore.refresh_key, 1)
+        with mock.patch.object(explore, "wait_timeout", 0.1):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data["profiles"]), 2)
+        self.assertIsNone(explore.load())
+
+        # redis is unavailable
+        with mock.patch.object(
+            explore,
+            "load",
+            side_effect=redis.exceptions.ConnectionError
+        ):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data["profiles"]), 2)
+
+    def test_explore_followed_by_me(self):
+        """
+        Assert that the explore page shows which of its feeds
+        and profiles are followed by the authed user.
+        """
+        # set up test
+        self._do_login(self.test_signer_2)
+        self._do_login(self.test_signer)
+        feed_id = self._create_feed().data["id"]
+        self._do_login(self.test_signer_2)
+        self.client.get("/api/explore/")
+        self._follow_user(self.test_signer.address)
+
+        # make request
+        resp = self.client.get("/api/explore/")
+
+        # make assertions
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["feeds"][0]["id"], feed_id)
+        self.assertFalse(resp.data["feeds"][0]["followedByMe"])
+        self.assertTrue(resp.data["feeds"][0]["owner"]["followedByMe"])
+        followed = {
+            profile["address"]: profile["followedByMe"]
+            for profile in resp.data["profiles"]
+        }
+        self.assertEqual(followed, {
+            self.test_signer.address: True,
+            self.test_signer_2.address: False,
+        })
+
+
+class NotificationTests(BaseTest):
+    """
+    Test behavior around notifications.
+    """
+
+    def test_get_notifs(self):
+        """
+        Assert that a logged in user can get a list of notifications.
+        """
+        # set up test
+        # user 1 logs in
+        self._do_login(self.test_signer)
+
+        # make request for notifications
+        url = "/api/notifications/"
+        resp = self.client.get(url)
+
+        # make assertions
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["results"], [])
+
+    def test_get_notifs_unauthed(self):
+        """
+        Assert that a logged out user cannot get a list of notifications.
+        """
+        # set up test
+
+        # make request for notifications
+        url = "/api/notifications/"
+        resp = self.client.get(url)
+
+        # make assertions
+        self.assertEqual(resp.status_code, 403)
+
+    def test_comment_on_post_notifs(self):
+        """
+        Assert that a user gets a notification when
+        another user comments on their post.
+        """
+        # set up test
+        # user 1 creates a post
+        self._do_login(self.test_signer)
+        resp = self._create_post()
+        post_id = resp.data["id"]
+        self._do_logout()
+
+        # user 2 comments on user 1's post
+        self._do_login(self.test_signer_2)
+        self._create_comment(post_id, text="hello")
+        self._do_logout()
+
+        # make request to get user 1's notifications
+        self._do_login(self.test_signer)
+        url = "/api/notifications/"
+        resp = self.client.get(url, {"count": "true"})
+
+        # make assertions
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["count"], 1)
+        notification = resp.data["results"][0]
+        self.assertEqual(notification["viewed"], False)
+        event = notification["events"]["commentOnPostEvent"]
+        self.assertEqual(event["post"], post_id)
+        self.assertEqual(
+            event["commentor"]["address"],
+            self.test_signer_2.address
+        )
+
+    def test_mentioned_in_post_notif(self):
+        """
+        Assert that a user gets a notification when
+        another user mentions them in a post.
+        """
+        # set up test
+        # create users 1 and 2
+        self._do_login(self.test_signer)
+        self._do_login(self.test_signer_2)
+        # user 2 tags user 1 in a post
+        tagged = [self.test_signer.address]
+        resp = self._create_post(
+            tagged_users=tagged
+        )
+        post_id = resp.data["id"]
+
+        # make request to get user 1's notifications
+        self._do_login(self.test_signer)
+        url = "/api/notifications/"
+        resp = self.client.get(url, {"count": "true"})
+
+        # assert that user 1 has a notification for post mention
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["count"], 1)
+        notification = resp.data["results"][0]
+        self.assertEqual(notification["viewed"], False)
+        event = notification["events"]["mentionedInPostEvent"]
         self.assertEqual(event["post"], post_id)
         self.assertEqual(
             event["mentionedBy"]["address"],
@@ -3019,7 +4995,7 @@ class NotificationTests(BaseTest):
         # make request to get user 2's notifications
         self._do_login(self.test_signer_2)
         url = "/api/notifications/"
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
 
         # assert that user 2 has a notification for the comment mention
         self.assertEqual(resp.status_code, 200)
@@ -3039,7 +5015,6 @@ class NotificationTests(BaseTest):
         another user follows them.
         """
         # set up test
-        self.mock_responses.add(responses.PUT, alchemy.url)
         # create users 1 and 2
         self._do_login(self.test_signer)
         self._do_login(self.test_signer_2)
@@ -3049,7 +5024,7 @@ class NotificationTests(BaseTest):
         # make request to get user 1's notifications
         self._do_login(self.test_signer)
         url = "/api/notifications/"
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
 
         # assert that user 1 has a notification for the follow
         self.assertEqual(resp.status_code, 200)
@@ -3155,6 +5130,119 @@ class NotificationTests(BaseTest):
 
         # assert that user 2 gets a 403
         self.assertEqual(resp.status_code, 403)
+        self.assertEqual(Notification.objects.filter(viewed=True).count(), 0)
+
+    def _get_num_unread(self):
+        """
+        Utility function that returns the number of
+        unread notifications of the logged in user.
+        """
+        resp = self.client.get("/api/notifications/unread/")
+        self.assertEqual(resp.status_code, 200)
+        return resp.data["numUnread"]
+
+    def test_unread_notifs(self):
+        """
+        Assert that a user's number of unread notifications
+        follows the notifications they get and view.
+        """
+        # set up test
+        # user 2 comments on user 1's post three times
+        self._do_login(self.test_signer)
+        post_id = self._create_post().data["id"]
+        self._do_login(self.test_signer_2)
+        for text in ["gm", "gn", "wagmi"]:
+            self._create_comment(post_id, text=text)
+
+        # make request
+        self._do_login(self.test_signer)
+        self.assertEqual(self._get_num_unread(), 3)
+
+        # mark one notification as viewed twice
+        notif_ids = list(
+            Notification.objects.order_by("id").values_list("id", flat=True)
+        )
+        for i in range(2):
+            resp = self.client.put(
+                "/api/notifications/",
+                {"notifications": [notif_ids[0]]}
+            )
+            self.assertEqual(resp.status_code, 200)
+
+        # make assertions
+        self.assertEqual(self._get_num_unread(), 2)
+
+        # mark all the notifications as viewed
+        self.client.put(
+            "/api/notifications/",
+            {"notifications": notif_ids}
+        )
+        self.assertEqual(self._get_num_unread(), 0)
+        self.assertEqual(
+            Notification.objects.filter(viewed=False).count(),
+            0
+        )
+
+    def test_unread_notifs_unauthed(self):
+        """
+        Assert that a logged out user cannot get
+        their number of unread notifications.
+        """
+        resp = self.client.get("/api/notifications/unread/")
+        self.assertEqual(resp.status_code, 403)
+
+    def test_mark_notifs_before_as_viewed(self):
+        """
+        Assert that a user can mark all their notifications
+        up to an id as viewed, without touching others'.
+        """
+        # set up test
+        # user 2 comments on user 1's post three times
+        self._do_login(self.test_signer)
+        post_id = self._create_post().data["id"]
+        self._do_login(self.test_signer_2)
+        for text in ["gm", "gn", "wagmi"]:
+            self._create_comment(post_id, text=text)
+
+        # user 1 comments on user 2's post
+        post_2_id = self._create_post().data["id"]
+        self._do_login(self.test_signer)
+        self._create_comment(post_2_id, text="gm")
+        other_notif = Notification.objects.get(
+            user__user_id=self.test_signer_2.address
+        )
+
+        # make request to mark notifications up to the second as viewed
+        notif_ids = list(
+            Notification.objects.filter(user__user_id=self.test_signer.address)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        with CaptureQueriesContext(connection) as context:
+            resp = self.client.put(
+                "/api/notifications/",
+                {"before": notif_ids[1]}
+            )
+
+        # make assertions
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data, {"numUnread": 1})
+        updates = [
+            query for query in context.captured_queries
+            if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(
+            list(Notification.objects.filter(viewed=True)
+                 .order_by("id").values_list("id", flat=True)),
+            notif_ids[:2]
+        )
+        other_notif.refresh_from_db()
+        self.assertFalse(other_notif.viewed)
+
+        # assert that an invalid id is rejected
+        resp = self.client.put("/api/notifications/", {"before": "latest"})
+        self.assertEqual(resp.status_code, 400)
 
     def test_liked_your_post_notifs(self):
         """
@@ -3233,7 +5321,7 @@ class NotificationTests(BaseTest):
         # make request to get user 1's notifications
         self._do_login(self.test_signer)
         url = "/api/notifications/"
-        resp = self.client.get(url)
+        resp = self.client.get(url, {"count": "true"})
 
         # assert that user 1 has a notification for the repost
         self.assertEqual(resp.status_code, 200)
@@ -3246,6 +5334,84 @@ class NotificationTests(BaseTest):
             self.test_signer_2.address
         )
 
+    def _add_notifs(self):
+        """
+        Utility function that gives user 1 a notification
+        of every event type, caused by user 2.
+        """
+        # user 1 creates a post and a comment
+        self.create_post_data.update(isShare=False, refPost=None)
+        self._do_login(self.test_signer)
+        post_id = self._create_post().data["id"]
+        comment_id = self._create_comment(post_id, "gm").data["id"]
+
+        # user 2 mentions, comments, likes, and reposts
+        self._do_login(self.test_signer_2)
+        self._create_post(tagged_users=[self.test_signer.address])
+        self._create_comment(
+            post_id,
+            "gm",
+            tagged_users=[self.test_signer.address]
+        )
+        self.client.post(f"/api/post/{post_id}/likes/")
+        self.client.post(
+            f"/api/posts/{post_id}/comments/{comment_id}/likes/"
+        )
+        self._repost(post_id)
+
+        # user 2 follows user 1
+        src = Profile.objects.get(user_id=self.test_signer_2.address)
+        dest = Profile.objects.get(user_id=self.test_signer.address)
+        follow, _ = Follow.objects.get_or_create(src=src, dest=dest)
+        FollowedEvent.objects.create(
+            notification=Notification.objects.create(user=dest),
+            follow=follow,
+            followed_by=src
+        )
+
+    def _count_notif_queries(self):
+        """
+        Utility function that returns user 1's page of notifications
+        and the number of queries run to serve it.
+        """
+        self._do_login(self.test_signer)
+        with CaptureQueriesContext(connection) as context:
+            resp = self.client.get("/api/notifications/")
+
+        self.assertEqual(resp.status_code, 200)
+        return resp, len(context.captured_queries)
+
+    def test_list_notifs_queries(self):
+        """
+        Assert that a page of notifications with every
+        event type is served in a fixed number of queries.
+        """
+        # set up test
+        self._add_notifs()
+        resp, expected = self._count_notif_queries()
+        self.assertEqual(len(resp.data["results"]), 8)
+
+        # add enough notifications to fill the page
+        self._add_notifs()
+        self._add_notifs()
+
+        # make request
+        resp, num_queries = self._count_notif_queries()
+
+        # make assertions
+        self.assertEqual(len(resp.data["results"]), 20)
+        self.assertEqual(num_queries, expected)
+
+        # assert that every event type was serialized
+        events = [
+            name
+            for notif in resp.data["results"]
+            for name, event in notif["events"].items()
+            if event is not None
+        ]
+        self.assertEqual(len(set(events)), 7)
+        self.assertEqual(len(events), 20)
+
 
 class AlchemyWebhookTests(BaseTest):
     """
@@ -3271,27 +5437,307 @@ class AlchemyWebhookTests(BaseTest):
         # make assertions
         self.assertEqual(resp.status_code, 403)
 
-    def test_notify_wh_adds_job_on_rq(self):
+    def _post_webhook(self, data):
         """
-        Assert that a successfully authenticated webhook
-        request is added to a redis queue for
-        processing by one of the workers.
+        Utility function that posts the given data
+        to the webhook with a valid signature.
         """
-        # set up test
         url = "/api/alchemy-notify-webhook/"
-        data={"fakekey":"fakeval"}
-        body = json.dumps(data).replace(" ", "")
-        valid_sig = get_expected_alchemy_sig(body)
+        body = json.dumps(data)
+        valid_sig = alchemy.get_signature(body.encode())
         extra_headers = {"HTTP_X-Alchemy-Signature": valid_sig}
 
-        # make request
         resp = self.client.post(
             url,
-            data=data,
+            data=body,
+            content_type="application/json",
             **extra_headers
         )
+        self.assertEqual(resp.status_code, 200)
+
+    def _get_webhook_data(self, event_id, activity):
+        """
+        Utility function that returns webhook data
+        of the given event id and activity.
+        """
+        data = dict(alchemy_notify_samples.eth_transfer, id=event_id)
+        data["event"] = dict(data["event"], activity=activity)
+        return data
+
+    def test_notify_wh_adds_job_on_rq(self):
+        """
+        Assert that a successfully authenticated webhook
+        request is added to a redis queue as one job per block
+        for processing by the workers.
+        """
+        # set up test
+        eth_transfer = alchemy_notify_samples.eth_transfer
+        eth_transfers = alchemy_notify_samples.multiple_eth_transfers
+        activity = eth_transfers["event"]["activity"] + \
+            eth_transfer["event"]["activity"]
+        data = self._get_webhook_data("whevt_1", activity)
+
+        # make request
+        self._post_webhook(data)
+
+        # make assertions
+        queue = rq.Queue(connection=self.redis_backend, name="tx_processing")
+        jobs = queue.get_jobs()
+        self.assertEqual(len(jobs), 2)
+        for job in jobs:
+            self.assertEqual(job.func, alchemy_jobs.process_activities)
+        self.assertEqual(
+            [job.args[0] for job in jobs],
+            [eth_transfers["event"]["activity"],
+             eth_transfer["event"]["activity"]]
+        )
+
+    def test_notify_wh_drops_duplicates(self):
+        """
+        Assert that retried deliveries and overlapping webhooks
+        are dropped before being queued, but re-orgs are not.
+        """
+        # set up test
+        erc721_transfer = alchemy_notify_samples.erc721_transfer
+        reorged_transfer = alchemy_notify_samples.reorged_erc721_transfer
+        eth_transfer = alchemy_notify_samples.eth_transfer
+        self._post_webhook(erc721_transfer)
+        queue = rq.Queue(connection=self.redis_backend, name="tx_processing")
+        self.assertEqual(len(queue), 1)
+
+        # make requests
+        # alchemy retries the delivery
+        self._post_webhook(erc721_transfer)
+        # another webhook has the same activity and a new one
+        activity = erc721_transfer["event"]["activity"] + \
+            eth_transfer["event"]["activity"] + \
+            eth_transfer["event"]["activity"]
+        self._post_webhook(self._get_webhook_data("whevt_2", activity))
+        # the transfer is re-orged
+        self._post_webhook(dict(reorged_transfer, id="whevt_3"))
 
         # make assertions
-        self.assertEqual(resp.status_code, 200)
+        jobs = queue.get_jobs()
+        self.assertEqual(
+            [job.args[0] for job in jobs],
+            [
+                erc721_transfer["event"]["activity"],
+                eth_transfer["event"]["activity"],
+                reorged_transfer["event"]["activity"],
+            ]
+        )
+
+    def test_notify_wh_keeps_reorgs_in_one_job(self):
+        """
+        Assert that the activity of a delivery with a re-org is queued
+        as one job, so that the removal and the re-inclusion of a
+        transfer in another block are processed in order.
+        """
+        # set up test
+        reorged_transfer = alchemy_notify_samples.reorged_erc721_transfer
+        removed = reorged_transfer["event"]["activity"][0]
+        reincluded = dict(
+            alchemy_notify_samples.erc721_transfer["event"]["activity"][0],
+            blockNum="0xf9eef1"
+        )
+        eth_transfer = alchemy_notify_samples.eth_transfer
+        activity = [removed, reincluded] + eth_transfer["event"]["activity"]
+        data = self._get_webhook_data("whevt_1", activity)
+
+        # make request
+        self._post_webhook(data)
+
+        # make assertions
+        queue = rq.Queue(connection=self.redis_backend, name="tx_processing")
+        jobs = queue.get_jobs()
+        self.assertEqual([job.args[0] for job in jobs], [activity])
+
+    def test_notify_wh_forgets_failed_intake(self):
+        """
+        Assert that a webhook whose jobs could not be queued
+        is processed when Alchemy retries it.
+        """
+        # set up test
+        data = alchemy_notify_samples.erc20_transfer
+        queue = rq.Queue(connection=self.redis_backend, name="tx_processing")
+
+        # make request that fails to queue the jobs
+        with mock.patch.object(
+            rq.Queue,
+            "enqueue_many",
+            side_effect=ConnectionError
+        ):
+            with self.assertRaises(ConnectionError):
+                alchemy.enqueue_webhook_data(data)
+        self.assertEqual(len(queue), 0)
+
+        # make request again
+        self.assertEqual(alchemy.enqueue_webhook_data(data), 1)
+        self.assertEqual(len(queue), 1)
+
+    def test_notify_wh_forgets_failed_dedupe(self):
+        """
+        Assert that a webhook whose activities could not be checked
+        for duplicates is processed when Alchemy retries it.
+        """
+        # set up test
+        data = alchemy_notify_samples.erc20_transfer
+        queue = rq.Queue(connection=self.redis_backend, name="tx_processing")
+
+        # make request that fails to check the activities
+        with mock.patch.object(
+            redis.client.Pipeline,
+            "execute",
+            side_effect=redis.exceptions.ConnectionError
+        ):
+            with self.assertRaises(redis.exceptions.ConnectionError):
+                alchemy.enqueue_webhook_data(data)
+        self.assertEqual(len(queue), 0)
+
+        # make request again
+        self.assertEqual(alchemy.enqueue_webhook_data(data), 1)
+        self.assertEqual(len(queue), 1)
+
+
+class AlchemyWebhookAppTests(BaseTest):
+    """
+    Tests the ASGI app that receives the webhook for Alchemy Notify.
+    """
+
+    def setUp(self):
+        """ Runs before each test. """
+
+        super().setUp()
+
+        # share the fake redis server with an asyncio client
+        server = self.redis_backend.connection_pool.connection_kwargs["server"]
+        mock.patch.object(
+            redis_client,
+            "create_async_client",
+            return_value=fakeredis.aioredis.FakeRedis(server=server)
+        ).start()
+
+        # set up the app in front of an app that answers 404
+        async def not_found(scope, receive, send):
+            await webhooks.send_response(send, 404)
+
+        self.app = AlchemyWebhookApp(not_found)
+
+    def _request(self, body, signature, method="POST", path=webhooks.path):
+        """
+        Utility function that sends a request with the given body
+        and signature header to the app.
+        Returns the status of the response.
+        """
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "headers": [(b"x-alchemy-signature", signature.encode())],
+        }
+
+        async def request():
+            communicator = ApplicationCommunicator(self.app, scope)
+
+            # send the body in two chunks
+            await communicator.send_input({
+                "type": "http.request",
+                "body": body[:10],
+                "more_body": True
+            })
+            await communicator.send_input({
+                "type": "http.request",
+                "body": body[10:]
+            })
+            response = await communicator.receive_output()
+            await communicator.receive_output()
+            await communicator.wait()
+            return response["status"]
+
+        return async_to_sync(request)()
+
+    def test_webhook_app(self):
+        """
+        Assert that a delivery with a valid signature of its raw body
+        is pushed to the intake, and queued by the intake process.
+        """
+        # make request
+        data = alchemy_notify_samples.eth_transfer
+        body = json.dumps(data).encode()
+        status = self._request(body, alchemy.get_signature(body))
+
+        # make assertions
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            self.redis_backend.lrange(alchemy.intake_key, 0, -1),
+            [body]
+        )
+
+        # assert that the intake queues the delivery
+        self.assertTrue(alchemy.process_intake(timeout=1))
         queue = rq.Queue(connection=self.redis_backend, name="tx_processing")
         self.assertEqual(len(queue), 1)
+        self.assertEqual(len(self.redis_backend.keys("alchemy-webhook:*")), 1)
+
+    def test_webhook_app_rejects_requests(self):
+        """
+        Assert that deliveries with a bad signature are rejected,
+        and that other requests are handed to the next app.
+        """
+        # make requests
+        body = json.dumps(alchemy_notify_samples.eth_transfer).encode()
+        sig = alchemy.get_signature(body)
+        bad_sig = self._request(body, sig[:-1] + "0")
+        bad_method = self._request(body, sig, method="GET")
+        other_path = self._request(body, sig, path="/api/posts/")
+
+        # make assertions
+        self.assertEqual(bad_sig, 403)
+        self.assertEqual(bad_method, 405)
+        self.assertEqual(other_path, 404)
+        self.assertEqual(self.redis_backend.llen(alchemy.intake_key), 0)
+
+    def test_requeue_intake(self):
+        """
+        Assert that deliveries that were taken from the intake
+        but not queued are moved back to it.
+        """
+        # take a delivery and fail to queue it
+        body = json.dumps(alchemy_notify_samples.eth_transfer).encode()
+        self.redis_backend.lpush(alchemy.intake_key, body)
+        with mock.patch.object(
+            alchemy,
+            "enqueue_webhook_data",
+            side_effect=ConnectionError
+        ):
+            with self.assertRaises(ConnectionError):
+                alchemy.process_intake(timeout=1)
+
+        # assert that it is moved back, and queued the next time
+        self.assertEqual(alchemy.requeue_intake(), 1)
+        self.assertTrue(alchemy.process_intake(timeout=1))
+        self.assertEqual(
+            len(rq.Queue(connection=self.redis_backend, name="tx_processing")),
+            1
+        )
+        self.assertEqual(self.redis_backend.llen(alchemy.intake_key), 0)
+        self.assertEqual(
+            self.redis_backend.llen(alchemy.intake_processing_key),
+            0
+        )
+
+    def test_intake_drops_malformed_delivery(self):
+        """
+        Assert that a delivery that is not JSON is logged and dropped.
+        """
+        # push a malformed delivery
+        self.redis_backend.lpush(alchemy.intake_key, b"not json")
+
+        # make assertions
+        with self.assertLogs(alchemy.logger, "WARNING") as logs:
+            self.assertTrue(alchemy.process_intake(timeout=1))
+        self.assertIn("malformed", logs.output[0])
+        self.assertEqual(
+            self.redis_backend.llen(alchemy.intake_processing_key),
+            0
+        )
@@ -0,0 +1,643 @@
+"""
+Module containing the materialized timelines of Posts.
+
+A timeline is a redis sorted set of Post ids scored by the time the Post
+was created. Timelines are filled when Posts are written (fan-out-on-write)
+so that reading a page of a feed does not have to scan the posts of every
+profile that the feed is made of.
+There is a home timeline per Profile, backing the profile's own feed,
+and an item timeline per Feed, backing the items of the Feed.
+Timelines are bounded to settings.TIMELINE_MAX_LENGTH entries, and pages
+beyond that are read from the database.
+Timelines that a write fails to reach, e.g. while redis is unavailable,
+are deleted so that they are read from the database and rebuilt.
+"""
+# std lib imports
+from collections import defaultdict
+import datetime
+import logging
+
+# third party imports
+from django.conf import settings
+import redis
+
+# our imports
+from .jobs import timeline_jobs
+from .models import Feed, Follow, Post, Profile
+from . import pagination, redis_client
+
+
+logger = logging.getLogger(__name__)
+
+max_length = settings.TIMELINE_MAX_LENGTH
+ttl = settings.TIMELINE_TTL
+build_timeout = 300
+
+# states of a timeline
+BUILDING = b"building"
+READY = b"ready"
+
+
+class Timeline():
+    """
+    A bounded list of Post ids, sorted from newest to oldest.
+    A timeline holding less than `max_length` entries is complete,
+    otherwise older entries have been trimmed from it.
+    """
+
+    def __init__(self, kind, pk):
+        self.key = f"timeline:{kind}:{pk}"
+        self.state_key = f"{self.key}:state"
+        self.redis = redis_client.RedisConnection().redis_client
+
+    def get_state(self):
+        """ Returns the state of the timeline, None if it does not exist. """
+
+        return self.redis.get(self.state_key)
+
+    def is_ready(self):
+        """ Returns True if the timeline has been built. """
+
+        return self.get_state() == READY
+
+    def count(self):
+        """ Returns the number of entries in the timeline. """
+
+        return self.redis.zcard(self.key)
+
+    def get_post_ids(self, start, stop):
+        """ Returns the Post ids between the given ranks. """
+
+        ids = self.redis.zrevrange(self.key, start, stop - 1)
+        return [int(pk) for pk in ids]
+
+    def get_entries_after(self, position, size):
+        """
+        Returns up to size (post id, score) entries, sorted from newest
+        to oldest by (score, id), that come after the given (created, id)
+        position, or from the newest if the position is None.
+        """
+        # skip the entries that share the score of the position
+        if position is None:
+            max_score = "+inf"
+            num_ties = 0
+        else:
+            max_score = position[0].timestamp()
+            num_ties = self.redis.zcount(self.key, max_score, max_score)
+
+        entries = self.redis.zrevrangebyscore(
+            self.key, max_score, "-inf",
+            start=0, num=size + num_ties, withscores=True
+        )
+        if not entries:
+            return []
+
+        # entries that share a score are not sorted by id,
+        # so get all of those that share the score of the last one
+        last_score = entries[-1][1]
+        entries = set(entries) | set(self.redis.zrangebyscore(
+            self.key, last_score, last_score, withscores=True
+        ))
+
+        entries = [(int(pk), score) for pk, score in entries]
+        if position is not None:
+            entries = [
+                (pk, score) for pk, score in entries
+                if score < max_score or pk < position[1]
+            ]
+        entries.sort(key=lambda entry: (entry[1], entry[0]), reverse=True)
+
+        return entries[:size]
+
+    def get_all_post_ids(self):
+        """ Returns all the Post ids in the timeline. """
+
+        return self.get_post_ids(0, max_length)
+
+    def start_build(self):
+        """
+        Marks the timeline as being built and empties it.
+        Returns False if the timeline is already built or being built.
+        """
+        if not self.redis.set(self.state_key, BUILDING, nx=True,
+                              ex=build_timeout):
+            return False
+
+        self.redis.delete(self.key)
+        return True
+
+    def finish_build(self, entries):
+        """
+        Stores the given (post id, created) entries
+        and marks the timeline as ready.
+        """
+        pipe = self.redis.pipeline()
+        self._add(pipe, entries)
+        pipe.set(self.state_key, READY, ex=ttl)
+        pipe.expire(self.key, ttl)
+        pipe.execute()
+
+    def add(self, entries, pipe=None):
+        """ Adds the given (post id, created) entries to the timeline. """
+
+        if pipe is None:
+            pipe = self.redis.pipeline()
+            self._add(pipe, entries)
+            pipe.execute()
+        else:
+            self._add(pipe, entries)
+
+    def _add(self, pipe, entries):
+        """ Queues the commands that add entries on the given pipeline. """
+
+        if not entries:
+            return
+
+        mapping = {pk: created.timestamp() for pk, created in entries}
+        pipe.zadd(self.key, mapping)
+        pipe.zremrangebyrank(self.key, 0, -(max_length + 1))
+
+    def remove(self, post_ids, pipe=None):
+        """ Removes the given Post ids from the timeline. """
+
+        if not post_ids:
+            return
+
+        if pipe is None:
+            self.redis.zrem(self.key, *post_ids)
+        else:
+            pipe.zrem(self.key, *post_ids)
+
+    def delete(self):
+        """ Deletes the timeline so that it gets rebuilt. """
+
+        self.redis.delete(self.key, self.state_key)
+
+
+class TimelinePosts():
+    """
+    Lazy sequence of the Posts of a timeline that can be paginated.
+    Pages are read from the timeline and hydrated from `queryset`,
+    pages beyond a trimmed timeline are read from `fallback`.
+    Ids of Posts that no longer exist are removed from the timeline
+    as they are read, and the page is filled with the entries after them.
+    """
+
+    def __init__(self, timeline, queryset, fallback):
+        self.timeline = timeline
+        self.queryset = queryset
+        self.fallback = fallback
+        self._length = None
+
+    def _get_length(self):
+        """ Returns the number of entries in the timeline. """
+
+        if self._length is None:
+            self._length = self.timeline.count()
+
+        return self._length
+
+    def count(self):
+        """ Returns the number of Posts. """
+
+        length = self._get_length()
+        if length < max_length:
+            # the timeline may hold ids of Posts that no longer exist
+            ids = self.timeline.get_all_post_ids()
+            return self.queryset.filter(pk__in=ids).count()
+
+        return self.fallback.count()
+
+    def _hydrate(self, ids):
+        """
+        Returns the Posts of the given ids, in order, and removes
+        the ids of the Posts that no longer exist from the timeline.
+        """
+        posts = self.queryset.in_bulk(ids)
+        self.timeline.remove([pk for pk in ids if pk not in posts])
+
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        """ Returns the Posts of the given slice, newest first. """
+
+        length = self._get_length()
+        if length >= max_length and key.stop > length:
+            return self.fallback[key]
+
+        # removed ids shift the ranks, so read the slice until it is whole
+        while True:
+            ids = self.timeline.get_post_ids(key.start, key.stop)
+            posts = self._hydrate(ids)
+            if len(posts) == len(ids):
+                return posts
+
+    def get_page(self, position, size):
+        """
+        Returns up to size Posts, newest first, that come after the given
+        (created, id) position, or from the newest if it is None.
+        Pages that reach beyond a trimmed timeline are read from `fallback`.
+        """
+        posts = []
+        while len(posts) < size:
+            num = size - len(posts)
+            entries = self.timeline.get_entries_after(position, num)
+            if len(entries) < num and self._get_length() >= max_length:
+                fallback = pagination.filter_after(self.fallback, position)
+                return posts + list(fallback[:num])
+
+            posts += self._hydrate([pk for pk, _ in entries])
+            if len(entries) < num:
+                break
+
+            # continue after the last entry read
+            pk, score = entries[-1]
+            created = datetime.datetime.fromtimestamp(
+                score, tz=datetime.timezone.utc
+            )
+            position = (created, pk)
+
+        return posts
+
+
+def get_home_timeline(profile_id):
+    """ Returns the timeline of the home feed of the given profile. """
+
+    return Timeline("home", profile_id)
+
+
+def get_home_authors(profile):
+    """
+    Returns the Profiles that make up the home feed of the given profile:
+    the profile itself, the profiles they follow,
+    and the profiles of the Feeds they follow.
+    """
+    # get user
+    user = Profile.objects.filter(pk=profile.pk)
+
+    # get profiles the user follows
+    follow_src = Follow.objects.filter(src=profile)
+    profiles_followed = Profile.objects.filter(follow_dest__in=follow_src)
+
+    # get profiles of feeds the user follows
+    feeds = Feed.objects.filter(followers__in=user)
+    feed_profiles = Profile.objects.filter(feeds_following_them__in=feeds)
+
+    # combine the three querysets
+    return user | profiles_followed | feed_profiles
+
+
+def get_home_posts(profile, queryset=None):
+    """
+    Returns a queryset of the Posts in the home feed of the given profile,
+    sorted in descending chronological order.
+    Filters the given queryset of Posts if there is one.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+
+    queryset = queryset.filter(author__in=get_home_authors(profile))
+    queryset = queryset.order_by("-created", "-id")
+
+    return queryset
+
+
+def build_home_timeline(profile):
+    """ Fills the home timeline of the given profile from the database. """
+
+    timeline = get_home_timeline(profile.pk)
+    entries = get_home_posts(profile).values_list("id", "created")
+    timeline.finish_build(list(entries[:max_length]))
+
+
+def get_feed_timeline(feed_id):
+    """ Returns the timeline of the items of the given Feed. """
+
+    return Timeline("feed", feed_id)
+
+
+def get_feed_posts(feed, queryset=None):
+    """
+    Returns a queryset of the Posts of all the profiles the given Feed
+    is following, sorted in descending chronological order.
+    Filters the given queryset of Posts if there is one.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+
+    queryset = queryset.filter(author__in=feed.following.all())
+    queryset = queryset.order_by("-created", "-id")
+
+    return queryset
+
+
+def build_feed_timeline(feed):
+    """ Fills the item timeline of the given Feed from the database. """
+
+    timeline = get_feed_timeline(feed.pk)
+    entries = get_feed_posts(feed).values_list("id", "created")
+    timeline.finish_build(list(entries[:max_length]))
+
+
+def _read(timeline, queryset, fallback, build_job, pk):
+    """
+    Returns the Posts of the given timeline when it is built, otherwise
+    queues the job that builds it and returns the fallback queryset.
+    """
+    try:
+        if timeline.is_ready():
+            return TimelinePosts(timeline, queryset, fallback)
+
+        if timeline.start_build():
+            queue = redis_client.RedisConnection().get_high_queue()
+            queue.enqueue(build_job, pk, job_id=timeline.key)
+    except redis.exceptions.RedisError:
+        pass
+
+    return fallback
+
+
+def get_home_feed(profile, queryset):
+    """
+    Returns the Posts of the home feed of the given profile.
+    Reads from the profile's timeline when it is built, otherwise
+    queues a job that builds it and reads from the database.
+    The Posts of a timeline are loaded using the given queryset.
+    """
+    return _read(
+        get_home_timeline(profile.pk),
+        queryset,
+        get_home_posts(profile, queryset),
+        timeline_jobs.build_home_timeline,
+        profile.pk
+    )
+
+
+def get_feed_items(feed, queryset):
+    """
+    Returns the Posts of the items of the given Feed.
+    Reads from the Feed's timeline when it is built, otherwise
+    queues a job that builds it and reads from the database.
+    The Posts of a timeline are loaded using the given queryset.
+    """
+    return _read(
+        get_feed_timeline(feed.pk),
+        queryset,
+        get_feed_posts(feed, queryset),
+        timeline_jobs.build_feed_timeline,
+        feed.pk
+    )
+
+
+def _get_existing(timelines):
+    """ Returns the given timelines that are built or being built. """
+
+    if not timelines:
+        return []
+
+    pipe = timelines[0].redis.pipeline()
+    for timeline in timelines:
+        pipe.exists(timeline.state_key)
+
+    return [t for t, exists in zip(timelines, pipe.execute()) if exists]
+
+
+def _get_home_audience(author_ids):
+    """
+    Returns a dict of author id to the set of profile ids
+    whose home feed contains the author's posts.
+    """
+    audience = defaultdict(set)
+    for author_id in author_ids:
+        audience[author_id].add(author_id)
+
+    # followers of the authors
+    follows = Follow.objects.filter(dest_id__in=author_ids)\
+        .values_list("dest_id", "src_id")
+    for author_id, profile_id in follows:
+        audience[author_id].add(profile_id)
+
+    # followers of the feeds that follow the authors
+    feed_followers = Feed.followers.through.objects.filter(
+        feed__following__in=author_ids
+    ).values_list("feed__following", "profile_id")
+    for author_id, profile_id in feed_followers:
+        audience[author_id].add(profile_id)
+
+    return audience
+
+
+def _get_feed_audience(author_ids):
+    """
+    Returns a dict of author id to the set of Feed ids
+    whose items contain the author's posts.
+    """
+    audience = defaultdict(set)
+
+    following = Feed.following.through.objects.filter(
+        profile_id__in=author_ids
+    ).values_list("profile_id", "feed_id")
+    for author_id, feed_id in following:
+        audience[author_id].add(feed_id)
+
+    return audience
+
+
+def _get_author_timelines(author_ids):
+    """
+    Returns a dict of author id to the timelines that contain the
+    author's posts, whether they exist or not.
+    """
+    audiences = [
+        (_get_home_audience(author_ids), get_home_timeline),
+        (_get_feed_audience(author_ids), get_feed_timeline),
+    ]
+
+    timelines = defaultdict(list)
+    for audience, get_timeline in audiences:
+        for author_id, pks in audience.items():
+            timelines[author_id] += [get_timeline(pk) for pk in pks]
+
+    return timelines
+
+
+def _get_timelines_by_post(posts, author_timelines):
+    """
+    Returns a dict of Post to the existing timelines that contain it,
+    out of the given dict of author id to timelines.
+    """
+    # keep the timelines that are built or being built
+    existing = _get_existing([
+        t for timelines in author_timelines.values() for t in timelines
+    ])
+    existing = set(t.key for t in existing)
+
+    by_post = {}
+    for post in posts:
+        by_post[post] = [
+            timeline for timeline in author_timelines[post.author_id]
+            if timeline.key in existing
+        ]
+
+    return by_post
+
+
+def _invalidate(timelines):
+    """
+    Deletes the given timelines after a write to them failed,
+    so that they are rebuilt rather than missing the write.
+    If redis is still unavailable, they are left to expire.
+    """
+    if not timelines:
+        return
+
+    try:
+        pipe = timelines[0].redis.pipeline()
+        for timeline in timelines:
+            pipe.delete(timeline.key, timeline.state_key)
+        pipe.execute()
+    except redis.exceptions.RedisError:
+        logger.exception("Failed to invalidate %d timelines", len(timelines))
+
+
+def add_posts(posts):
+    """ Fans out the given newly created Posts to the timelines. """
+
+    posts = [post for post in posts if post is not None]
+    if not posts:
+        return
+
+    author_timelines = _get_author_timelines({p.author_id for p in posts})
+    try:
+        by_post = _get_timelines_by_post(posts, author_timelines)
+        pipe = redis_client.RedisConnection().redis_client.pipeline()
+        for post, timelines in by_post.items():
+            for timeline in timelines:
+                timeline.add([(post.id, post.created)], pipe=pipe)
+        pipe.execute()
+    except redis.exceptions.RedisError:
+        logger.exception("Failed to add %d posts to timelines", len(posts))
+        _invalidate([t for ts in author_timelines.values() for t in ts])
+
+
+def remove_posts(posts):
+    """ Removes the given Posts from the timelines that contain them. """
+
+    if not posts:
+        return
+
+    author_timelines = _get_author_timelines({p.author_id for p in posts})
+    try:
+        by_post = _get_timelines_by_post(posts, author_timelines)
+        pipe = redis_client.RedisConnection().redis_client.pipeline()
+        for post, timelines in by_post.items():
+            for timeline in timelines:
+                timeline.remove([post.id], pipe=pipe)
+        pipe.execute()
+    except redis.exceptions.RedisError:
+        logger.exception("Failed to remove %d posts from timelines",
+                         len(posts))
+        _invalidate([t for ts in author_timelines.values() for t in ts])
+
+
+def add_authors(timelines, author_ids):
+    """
+    Adds the latest Posts of the given authors to the given timelines,
+    used when the timelines start following the authors.
+    """
+    try:
+        existing = _get_existing(timelines)
+        if not existing:
+            return
+
+        entries = Post.objects.filter(author_id__in=author_ids)\
+            .order_by("-created")\
+            .values_list("id", "created")[:max_length]
+        entries = list(entries)
+
+        pipe = existing[0].redis.pipeline()
+        for timeline in existing:
+            timeline.add(entries, pipe=pipe)
+        pipe.execute()
+    except redis.exceptions.RedisError:
+        logger.exception("Failed to add authors to %d timelines",
+                         len(timelines))
+        _invalidate(timelines)
+
+
+def prune(timeline, authors):
+    """
+    Removes the Posts from the timeline that are not
+    authored by the given queryset of Profiles,
+    used when the timeline stops following profiles.
+    A trimmed timeline is deleted instead, so that it gets rebuilt.
+    """
+    try:
+        if not _get_existing([timeline]):
+            return
+
+        if timeline.count() >= max_length:
+            timeline.delete()
+            return
+
+        stale = Post.objects.filter(pk__in=timeline.get_all_post_ids())\
+            .exclude(author__in=authors)\
+            .values_list("id", flat=True)
+        timeline.remove(list(stale))
+    except redis.exceptions.RedisError:
+        logger.exception("Failed to prune timeline %s", timeline.key)
+        _invalidate([timeline])
+
+
+def prune_home_timelines(profile_ids):
+    """
+    Prunes the home timelines of the given profiles,
+    used when Feeds they follow stop following profiles.
+    """
+    for profile in Profile.objects.filter(pk__in=profile_ids):
+        prune(get_home_timeline(profile.pk), get_home_authors(profile))
+
+
+def _queue_home_timelines_job(job, profile_ids, *args):
+    """
+    Queues the given job on the home timelines of the given profiles,
+    which takes a few queries per profile.
+    The timelines are invalidated if the job cannot be queued.
+    """
+    profile_ids = list(profile_ids)
+    if not profile_ids:
+        return
+
+    try:
+        queue = redis_client.RedisConnection().get_high_queue()
+        queue.enqueue(job, profile_ids, *args)
+    except redis.exceptions.RedisError:
+        logger.exception("Failed to queue %s", job.__name__)
+        _invalidate([get_home_timeline(pk) for pk in profile_ids])
+
+
+def queue_prune_followers(follower_ids):
+    """
+    Queues a job that prunes the home timelines of the given followers
+    of a Feed, used when the Feed stops following profiles or is deleted.
+    """
+    _queue_home_timelines_job(
+        timeline_jobs.prune_home_timelines,
+        follower_ids
+    )
+
+
+def queue_add_authors_to_followers(follower_ids, author_ids):
+    """
+    Queues a job that adds the latest Posts of the given authors
+    to the home timelines of the given followers of a Feed,
+    used when the Feed starts following the authors.
+    """
+    _queue_home_timelines_job(
+        timeline_jobs.add_authors_to_home_timelines,
+        follower_ids,
+        list(author_ids)
+    )
@@ -0,0 +1,142 @@
+"""
+Module containing the registry of token contracts.
+
+The metadata of a token contract (name, symbol, decimals, logo) is stored
+once per contract as a TokenContract, which transfers reference.
+TokenContracts are cached in redis so that every worker can use them,
+with a small in-process LRU in front of it.
+"""
+# std lib imports
+from collections import OrderedDict
+import json
+
+# third party imports
+
+# our imports
+from .models import TokenContract
+from .web3_client import w3
+from . import redis_client
+
+
+lru_size = 1024
+ttl = 7 * 24 * 60 * 60
+
+# fields of a TokenContract that are cached
+fields = ["id", "chain_id", "address", "name", "symbol", "decimals",
+          "logo_url"]
+
+
+class TokenRegistry():
+    """ Cache of TokenContracts by chain and address. """
+
+    def __init__(self):
+        self.lru = OrderedDict()
+
+    @staticmethod
+    def _get_key(chain_id, address):
+        """ Returns the redis key of the given token contract. """
+
+        return f"token-contract:{chain_id}:{address}"
+
+    def _remember(self, tokens):
+        """ Stores the given TokenContracts in the LRU. """
+
+        for token in tokens:
+            self.lru[(token.chain_id, token.address)] = token
+            self.lru.move_to_end((token.chain_id, token.address))
+
+        while len(self.lru) > lru_size:
+            self.lru.popitem(last=False)
+
+    def _cache(self, tokens):
+        """ Stores the given TokenContracts in the LRU and redis. """
+
+        if not tokens:
+            return
+
+        self._remember(tokens)
+        redis = redis_client.RedisConnection().redis_client
+        pipe = redis.pipeline()
+        for token in tokens:
+            data = {field: getattr(token, field) for field in fields}
+            key = self._get_key(token.chain_id, token.address)
+            pipe.set(key, json.dumps(data), ex=ttl)
+        pipe.execute()
+
+    def get_many(self, addresses, chain_id=1):
+        """
+        Returns a dict of checksum address to TokenContract
+        of the given contract addresses that are registered.
+        """
+        addresses = set(w3.toChecksumAddress(a) for a in addresses)
+        found = {}
+
+        # look up the in-process cache
+        for address in addresses:
+            token = self.lru.get((chain_id, address))
+            if token is not None:
+                self.lru.move_to_end((chain_id, address))
+                found[address] = token
+
+        missing = [a for a in addresses if a not in found]
+        if not missing:
+            return found
+
+        # look up redis
+        redis = redis_client.RedisConnection().redis_client
+        cached = redis.mget([self._get_key(chain_id, a) for a in missing])
+        cached = [TokenContract(**json.loads(data)) for data in cached if data]
+        self._remember(cached)
+        found.update({token.address: token for token in cached})
+
+        missing = [a for a in missing if a not in found]
+        if not missing:
+            return found
+
+        # look up the database
+        tokens = list(TokenContract.objects.filter(
+            chain_id=chain_id,
+            address__in=missing
+        ))
+        self._cache(tokens)
+        found.update({token.address: token for token in tokens})
+
+        return found
+
+    def create_many(self, metadata, chain_id=1):
+        """
+        Registers the token contracts of the given dict of contract address
+        to a dict of name, symbol, decimals, and logo_url, unless they are
+        registered already.
+        Returns a dict of checksum address to TokenContract.
+        """
+        if not metadata:
+            return {}
+
+        tokens = [
+            TokenContract(
+                chain_id=chain_id,
+                address=w3.toChecksumAddress(address),
+                **token_metadata
+            )
+            for address, token_metadata in metadata.items()
+        ]
+        TokenContract.objects.bulk_create(tokens, ignore_conflicts=True)
+
+        # read back the tokens, some may have been created by other workers
+        tokens = list(TokenContract.objects.filter(
+            chain_id=chain_id,
+            address__in=[token.address for token in tokens]
+        ))
+        self._cache(tokens)
+
+        return {token.address: token for token in tokens}
+
+    def clear(self):
+        """ Empties the in-process cache. """
+
+        self.lru.clear()
+
+
+# instance of the registry to be used throughout codebase
+token_registry = TokenRegistry()
@@ -10,8 +10,9 @@ from .views import alchemy_notify_webhook, auth_nonce, auth_login, auth_logout,
         FeedFollowingList, FeedFollowCreateDestroy, FeedFollowingCreateRetrieveDestroy, \
         FeedsOwnedOrEditableList, FeedImageUpdateDestroy, FeedItemsList, \
         FeedRetrieveUpdateDestroy, MyFeedList, FollowCreateDestroy, \
-        FollowersList, FollowingList, NotificationListUpdate, PostCreate, \
-        PostList, PostRetrieveUpdateDestroy, PostLikeCreateListDestroy, \
+        FollowersList, FollowingList, NotificationListUpdate, \
+        NotificationUnreadRetrieve, PostCreate, PostList, \
+        PostRetrieveUpdateDestroy, PostLikeCreateListDestroy, \
         ProfileCreateRetrieveUpdate, RepostDestroy, UserList, UserRetrieve
 
 
@@ -52,6 +53,10 @@ urlpatterns = [
             FeedFollowingCreateRetrieveDestroy.as_view()
         ),
         path("notifications/", NotificationListUpdate.as_view()),
+        path(
+            "notifications/unread/",
+            NotificationUnreadRetrieve.as_view()
+        ),
         path("user/", UserRetrieve.as_view()),
         path("users/", UserList.as_view()),
 ]
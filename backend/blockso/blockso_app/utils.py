@@ -5,24 +5,152 @@ in the blockso_app application.
 # std lib imports
 
 # third party imports
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest, Lower
 
 # local imports
-from blockso_app.models import Feed, Profile
+from blockso_app.models import Comment, CommentLike, Feed, Follow, \
+        Notification, Post, PostLike, Profile
+
+
+# characters of lowercase addresses, in the order they sort in
+address_chars = "0123456789abcdefx"
 
 
 def get_profiles_to_watch():
     """
-    Returns a list of profiles to watch.
+    Returns a queryset of the profiles that are watched.
+    See the watchlist module for what makes a profile watched.
+    """
+    return Profile.objects.filter(is_watched=True)
+
+
+def get_prefix_range(prefix):
+    """
+    Returns the (start, end) range of the lowercase addresses that start
+    with the given lowercase prefix, so that they can be looked up with
+    a range on an index, which unlike LIKE works in any collation.
+    The end is None if the range is unbounded.
+    Returns None if no address can start with the prefix.
+    """
+    if any(char not in address_chars for char in prefix):
+        return None
+
+    # the end is the prefix up to its last character that is not the
+    # last of address_chars, with that character incremented
+    end = prefix
+    while end:
+        i = address_chars.index(end[-1])
+        if i + 1 < len(address_chars):
+            return prefix, end[:-1] + address_chars[i + 1]
+        end = end[:-1]
+
+    return prefix, None
+
+
+def search_profiles(query, bio=False):
+    """
+    Returns a queryset of the profiles whose address starts with the
+    given query, ignoring case, sorted by address. Profiles whose bio
+    contains the query also match if bio is True.
+    """
+    query = query.strip()
+
+    matches = Q(pk__in=[])
+    prefix_range = get_prefix_range(query.lower())
+    if prefix_range is not None:
+        start, end = prefix_range
+        matches = Q(address_lower__gte=start)
+        if end is not None:
+            matches &= Q(address_lower__lt=end)
+
+    if bio and query:
+        matches |= Q(bio__icontains=query)
+
+    return Profile.objects.annotate(address_lower=Lower("user"))\
+        .filter(matches)\
+        .order_by("address_lower")
+
+
+def increment(model, pk, field, amount=1):
+    """
+    Atomically adds amount to the counter field of the given object.
+    Counters never go below zero.
     """
-    # fetch the union of:
-    # - users that have logged in
-    logged_in = Profile.objects.all().exclude(user__last_login=None)
-    # - users that have have followers
-    have_followers = Profile.objects.all().exclude(follow_dest=None)
-    # - users that are on a feed that has followers
-    on_feed = Profile.objects.filter(
-        feeds_following_them__in=Feed.objects.all().exclude(followers=None)
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + amount, 0)}
     )
-    profiles = logged_in | have_followers | on_feed
 
-    return profiles
+
+def decrement(model, pk, field, amount=1):
+    """
+    Atomically subtracts amount from the counter field of the given object.
+    """
+    increment(model, pk, field, -amount)
+
+
+def count_subquery(queryset, field):
+    """
+    Returns an expression that counts the rows of the given queryset,
+    which is filtered on `field` using an OuterRef.
+    """
+    queryset = queryset.order_by().values(field)\
+        .annotate(count=Count("pk"))\
+        .values("count")
+
+    return Coalesce(Subquery(queryset), 0)
+
+
+def get_counters():
+    """
+    Returns a list of (model, counter field, expression) that describe
+    the denormalized counters and how they are computed.
+    """
+    return [
+        (Post, "num_likes", count_subquery(
+            PostLike.objects.filter(post=OuterRef("pk")), "post"
+        )),
+        (Post, "num_comments", count_subquery(
+            Comment.objects.filter(post=OuterRef("pk")), "post"
+        )),
+        (Post, "num_reposts", count_subquery(
+            Post.objects.filter(refPost=OuterRef("pk")), "refPost"
+        )),
+        (Comment, "num_likes", count_subquery(
+            CommentLike.objects.filter(comment=OuterRef("pk")), "comment"
+        )),
+        (Profile, "num_followers", count_subquery(
+            Follow.objects.filter(dest=OuterRef("pk")), "dest"
+        )),
+        (Profile, "num_following", count_subquery(
+            Follow.objects.filter(src=OuterRef("pk")), "src"
+        )),
+        (Profile, "num_unread_notifications", count_subquery(
+            Notification.objects.filter(user=OuterRef("pk"), viewed=False),
+            "user"
+        )),
+        (Feed, "num_followers", count_subquery(
+            Feed.followers.through.objects.filter(feed=OuterRef("pk")),
+            "feed"
+        )),
+        (Feed, "num_following", count_subquery(
+            Feed.following.through.objects.filter(feed=OuterRef("pk")),
+            "feed"
+        )),
+    ]
+
+
+def reconcile_counters():
+    """
+    Recomputes the denormalized counters that have drifted
+    from the rows they count, using one UPDATE per counter.
+    Returns a list of (model, counter field, number of repaired rows).
+    """
+    repaired = []
+    for model, field, expression in get_counters():
+        drifted = model.objects.annotate(actual=expression)\
+            .exclude(**{field: F("actual")})
+        count = drifted.update(**{field: expression})
+        repaired.append((model, field, count))
+
+    return repaired
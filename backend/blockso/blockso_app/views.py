@@ -1,7 +1,5 @@
 # std lib imports
 from datetime import datetime, timedelta
-import hashlib
-import hmac
 import json
 import pytz
 import secrets
@@ -9,7 +7,7 @@ import secrets
 # third party imports
 from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model, login, logout
-from django.db.models import Count
+from django.db import transaction
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.exceptions import ParseError, PermissionDenied, \
     ValidationError
@@ -24,49 +22,30 @@ from web3 import Web3
 import rq
 
 # our imports
-from .jobs import alchemy_jobs
 from .models import Comment, CommentLike, Feed, Follow, Notification, Post, \
         PostLike, Profile, Socials
-from . import alchemy, covalent, pagination, redis_client, serializers, utils
+from . import alchemy, covalent, explore, pagination, serializers, \
+        timelines, utils, watchlist
 
 
 UserModel = get_user_model()
 
 
-def get_expected_alchemy_sig(message):
-    """
-    Returns the value of message signed with settings.ALCHEMY_WH_SIGNING_KEY.
-    """
-    return hmac.new(
-        bytes(settings.ALCHEMY_WH_SIGNING_KEY, "utf-8"),
-        msg=bytes(message, "utf-8"),
-        digestmod=hashlib.sha256,
-    ).hexdigest()
-
-
 @api_view(['POST'])
 def alchemy_notify_webhook(request):
     """
     Wehbook that receives a payload from Alchemy.
-    Creates a job to process the payload, and puts it on a redis queue.
+    Creates jobs to process the payload, and puts them on a redis queue.
     Raises PermissionDenied if the signature in
     the request header does not match Alchemy's signing key.
     """
-    # check request header containing alchemy's signature
-    str_body = str(request.body, request.encoding or "utf-8")
-    given_sig = request.headers["X-Alchemy-Signature"]
-    expected_sig = get_expected_alchemy_sig(str_body)
-
-    # raise PermissionDenied if signature is invalid
-    if given_sig != expected_sig:
+    # raise PermissionDenied if alchemy's signature of the body is invalid
+    given_sig = request.headers.get("X-Alchemy-Signature", "")
+    if not alchemy.is_valid_signature(request.body, given_sig):
         raise PermissionDenied("bad signature")
 
-    # queue job for processing the request payload
-    queue = redis_client.RedisConnection().get_tx_processing_queue()
-    queue.enqueue(
-        alchemy_jobs.process_webhook_data,
-        request.data
-    )
+    # queue jobs for processing the activity that was not seen already
+    alchemy.enqueue_webhook_data(request.data)
 
     return Response(status=200)
 
@@ -129,6 +108,9 @@ def auth_login(request):
             )
             Socials.objects.get_or_create(profile=profile)  # create socials
 
+            # watch the user's address with the Notify webhook
+            watchlist.update([profile.user_id])
+
             return Response(
                 status=200,
                 data=serializers.UserSerializer(request.user).data
@@ -194,6 +176,22 @@ class FollowCreateDestroy(
             dest=target
         )
 
+    def perform_destroy(self, instance):
+        """
+        Deletes the Follow and removes the posts of the unfollowed
+        user from the home timeline of the signed in user.
+        """
+        instance.delete()
+        utils.decrement(Profile, instance.src_id, "num_following")
+        utils.decrement(Profile, instance.dest_id, "num_followers")
+        timelines.prune(
+            timelines.get_home_timeline(instance.src_id),
+            timelines.get_home_authors(instance.src)
+        )
+
+        # the unfollowed user may not need to be watched anymore
+        watchlist.update([instance.dest.user_id])
+
     def post(self, request, *args, **kwargs):
         """ Signed in user follows the given address. """
 
@@ -316,19 +314,21 @@ class UserList(
     """ View that supports querying users. """
 
     permission_classes = [IsAuthenticated]
-    serializer_class = serializers.UserSerializer
+    serializer_class = serializers.UserSearchSerializer
     pagination_class = pagination.UserPagination
 
     def get_queryset(self):
         """
-        Return queryset containing users starting with
-        the given query.
+        Return queryset containing users whose address starts with
+        the given query, ignoring case, and whose bio contains it
+        if bio=true is given.
         """
-        # grab query param
+        # grab query params
         query = self.request.query_params.get("q", "")
+        bio = self.request.query_params.get("bio") == "true"
 
         # grab first 20 results
-        return UserModel.objects.filter(pk__startswith=query)[:20]
+        return utils.search_profiles(query, bio)[:20]
 
     def get(self, request, *args, **kwargs):
         """ Return a list of users matching the query. """
@@ -383,7 +383,7 @@ class PostList(generics.ListAPIView):
         """
         author = Profile.objects.get(user_id=self.kwargs["address"])
         queryset = Post.objects.filter(author=author)
-        return queryset
+        return serializers.PostSerializer.setup_eager_loading(queryset)
 
     def get(self, request, *args, **kwargs):
         """
@@ -415,6 +415,12 @@ class PostRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
     lookup_url_kwarg = "id"
     lookup_field = "id"
 
+    def get_queryset(self):
+        """
+        Return queryset of Posts loaded with what the serializer needs.
+        """
+        return serializers.PostSerializer.setup_eager_loading(self.queryset)
+
     def put(self, request, *args, **kwargs):
         """ Updates a Post with the given id. """
 
@@ -435,7 +441,11 @@ class PostRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
         if instance.author != request.user.profile:
             raise PermissionDenied("User does not own the Post.")
 
+        timelines.remove_posts([instance])
         self.perform_destroy(instance)
+        if instance.refPost_id is not None:
+            utils.decrement(Post, instance.refPost_id, "num_reposts")
+
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -473,6 +483,12 @@ class PostLikeCreateListDestroy(
 
         return queryset
 
+    def perform_destroy(self, instance):
+        """ Deletes the like and updates the post's like count. """
+
+        instance.delete()
+        utils.decrement(Post, instance.post_id, "num_likes")
+
     def get(self, request, *args, **kwargs):
 
         return self.list(request, *args, **kwargs)
@@ -523,6 +539,12 @@ class CommentLikeCreateListDestroy(PostLikeCreateListDestroy):
             pk=self.kwargs["comment_id"],
         )
 
+    def perform_destroy(self, instance):
+        """ Deletes the like and updates the comment's like count. """
+
+        instance.delete()
+        utils.decrement(Comment, instance.comment_id, "num_likes")
+
 
 class RepostDestroy(
     mixins.DestroyModelMixin,
@@ -549,6 +571,13 @@ class RepostDestroy(
             isShare=True
         )
 
+    def perform_destroy(self, instance):
+        """ Deletes the repost and removes it from the timelines. """
+
+        timelines.remove_posts([instance])
+        instance.delete()
+        utils.decrement(Post, instance.refPost_id, "num_reposts")
+
     def delete(self, request, *args, **kwargs):
         """ Signed in user deletes their repost of the given post. """
 
@@ -559,40 +588,14 @@ class ExploreList(views.APIView):
     """
     View that supports retrieving a list of feeds
     and profiles for the explore page.
+    The page is precomputed, see the explore module.
     """
 
-    def _get_feeds(self):
-        """
-        Return Feeds that are featured on the Explore page.
-        The current implementation returns the 4 most followed feeds.
-        """
-        queryset = Feed.objects.all()\
-            .annotate(num_followers=Count('followers'))\
-            .order_by("-num_followers")[:4]
-
-        return serializers.FeedSerializer(queryset, many=True).data
-
-    def _get_profiles(self):
-        """
-        Return Profiles of users that are featured on the Explore page.
-        The current implementation returns the top 8 profiles sorted
-        from most followers to least followers.
-        """
-        queryset = Profile.objects.annotate(
-            num_followers=Count('follow_dest')
-        )
-        queryset = queryset.order_by("-num_followers")
-        queryset = queryset[:8]
-
-        return serializers.ProfileSerializer(queryset, many=True).data
-
     def get(self, request, format=None):
         """
         Handle GET request.
         """
-        feeds = self._get_feeds()
-        profiles = self._get_profiles()
-        body = {"feeds": feeds, "profiles": profiles}
+        body = explore.personalize(explore.get_page(), request)
 
         return Response(status=status.HTTP_200_OK, data=body)
 
@@ -645,8 +648,17 @@ class FeedRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
         if instance.owner != request.user.profile:
             raise PermissionDenied("User does not own the Feed.")
 
+        timelines.get_feed_timeline(instance.pk).delete()
+        addresses = list(instance.following.values_list("user_id", flat=True))
+        follower_ids = list(instance.followers.values_list("pk", flat=True))
         self.perform_destroy(instance)
 
+        # remove the Feed's posts from the timelines of its followers
+        timelines.queue_prune_followers(follower_ids)
+
+        # the users of the Feed may not need to be watched anymore
+        watchlist.update(addresses)
+
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -737,7 +749,20 @@ class FeedFollowCreateDestroy(
         feed = Feed.objects.get(pk=self.kwargs["id"])
 
         # remove the user from the Feed's followers
-        feed.followers.remove(user)
+        if feed.followers.filter(pk=user.pk).exists():
+            feed.followers.remove(user)
+            utils.decrement(Feed, feed.pk, "num_followers")
+
+        # remove the posts of the Feed from the user's home timeline
+        timelines.prune(
+            timelines.get_home_timeline(user.pk),
+            timelines.get_home_authors(user)
+        )
+
+        # the users of the Feed may not need to be watched anymore
+        watchlist.update(
+            feed.following.values_list("user_id", flat=True)
+        )
 
         # return 204 No Content
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -751,8 +776,21 @@ class FeedFollowCreateDestroy(
         # get the Feed
         feed = Feed.objects.get(pk=self.kwargs["id"])
 
-        # remove the user from the Feed's followers
-        feed.followers.add(user)
+        # add the user to the Feed's followers
+        if not feed.followers.filter(pk=user.pk).exists():
+            feed.followers.add(user)
+            utils.increment(Feed, feed.pk, "num_followers")
+
+        # add the posts of the Feed to the user's home timeline
+        timelines.add_authors(
+            [timelines.get_home_timeline(user.pk)],
+            feed.following.values_list("pk", flat=True)
+        )
+
+        # watch the users of the Feed with the Notify webhook
+        watchlist.update(
+            feed.following.values_list("user_id", flat=True)
+        )
 
         # return 201 CREATED
         return Response(status=status.HTTP_201_CREATED)
@@ -807,7 +845,22 @@ class FeedFollowingCreateRetrieveDestroy(
 
         # remove the given profile from the Feed's following
         profile = Profile.objects.get(user_id=self.kwargs["address"])
-        feed.following.remove(profile)
+        if feed.following.filter(pk=profile.pk).exists():
+            feed.following.remove(profile)
+            utils.decrement(Feed, feed.pk, "num_following")
+
+        # remove the profile's posts from the timeline of the Feed,
+        # and from the timelines of the Feed's followers in the background
+        timelines.prune(
+            timelines.get_feed_timeline(feed.pk),
+            feed.following.all()
+        )
+        timelines.queue_prune_followers(
+            feed.followers.values_list("pk", flat=True)
+        )
+
+        # the removed user may not need to be watched anymore
+        watchlist.update([profile.user_id])
 
         # return 204 No Content
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -856,10 +909,23 @@ class FeedFollowingCreateRetrieveDestroy(
         covalent.enqueue_fetch_tx_history(profile)
 
         # add the given profile to the Feed's following
-        feed.following.add(profile)
+        if not feed.following.filter(pk=profile.pk).exists():
+            feed.following.add(profile)
+            utils.increment(Feed, feed.pk, "num_following")
+
+        # add the profile's posts to the timeline of the Feed,
+        # and to the timelines of the Feed's followers in the background
+        timelines.add_authors(
+            [timelines.get_feed_timeline(feed.pk)],
+            [profile.pk]
+        )
+        timelines.queue_add_authors_to_followers(
+            feed.followers.values_list("pk", flat=True),
+            [profile.pk]
+        )
 
-        # make a request to Alchemy to update the Notify webhook
-        alchemy.update_notify_webhook()
+        # watch the added user's address with the Notify webhook
+        watchlist.update([profile.user_id])
 
         # return 201 CREATED
         serializer = serializers.ProfileSerializer(profile)
@@ -896,15 +962,14 @@ class FeedItemsList(generics.ListAPIView):
         """
         Return Posts of a Feed for all the profiles that Feed is following.
         Sort the queryset in descending chronological order.
+        Posts are read from the Feed's item timeline when it is built.
         """
-        # get profiles of feed in question
-        profiles = Feed.objects.get(pk=self.kwargs["id"]).following.all()
-
-        # get all posts by those users
-        queryset = Post.objects.filter(author__in=profiles)
-        queryset = queryset.order_by("-created")
+        feed = Feed.objects.get(pk=self.kwargs["id"])
+        queryset = serializers.PostSerializer.setup_eager_loading(
+            Post.objects.all()
+        )
 
-        return queryset
+        return timelines.get_feed_items(feed, queryset)
 
 
 class FeedsOwnedOrEditableList(generics.ListAPIView):
@@ -943,28 +1008,14 @@ class MyFeedList(generics.ListAPIView):
         """
         Return Posts of logged in user and all of the users that they follow.
         Sort the queryset in descending chronological order.
+        Posts are read from the user's home timeline when it is built.
         """
-        # get user
-        user = self.request.user
-        profile = Profile.objects.filter(
-            user=user
+        profile = self.request.user.profile
+        queryset = serializers.PostSerializer.setup_eager_loading(
+            Post.objects.all()
         )
-        # get profiles the user follows
-        follow_src = Follow.objects.filter(src=user.profile)
-        profiles_followed = Profile.objects.filter(follow_dest__in=follow_src)
 
-        # get profiles of feeds the user follows
-        feeds = Feed.objects.filter(followers__in=profile)
-        feed_profiles = Profile.objects.filter(feeds_following_them__in=feeds)
-
-        # combine the three querysets
-        profiles = profile | profiles_followed | feed_profiles
-
-        # get all posts by those users
-        queryset = Post.objects.filter(author__in=profiles)
-        queryset = queryset.order_by("-created")
-
-        return queryset
+        return timelines.get_home_feed(profile, queryset)
 
 
 class NotificationListUpdate(
@@ -991,6 +1042,9 @@ class NotificationListUpdate(
 
         # get all notifications for the user
         queryset = Notification.objects.filter(user=user.profile)
+        queryset = serializers.NotificationSerializer.setup_eager_loading(
+            queryset
+        )
 
         return queryset
 
@@ -1002,27 +1056,80 @@ class NotificationListUpdate(
     def put(self, request, *args, **kwargs):
         """
         Updates the notifications of an authed user to be marked as viewed.
-        User must own the notifications that are being updated.
-        Returns updated notifications.
+        Either marks the notifications whose ids are given in
+        "notifications", which the user must own, and returns them,
+        or marks all the notifications up to and including the id given
+        in "before", and returns the number of unread notifications.
         """
-        notif_ids = request.data["notifications"]
-        user = request.user
-        updated = []
+        profile = request.user.profile
+        notifs = Notification.objects.filter(user=profile)
+
+        # mark all notifications up to an id as viewed
+        if "before" in request.data:
+            try:
+                before = int(request.data["before"])
+            except (TypeError, ValueError):
+                raise ValidationError("before must be a notification id.")
+
+            with transaction.atomic():
+                marked = notifs.filter(id__lte=before, viewed=False)\
+                    .update(viewed=True)
+                utils.decrement(
+                    Profile,
+                    profile.pk,
+                    "num_unread_notifications",
+                    marked
+                )
+
+            num_unread = Profile.objects.values_list(
+                "num_unread_notifications",
+                flat=True
+            ).get(pk=profile.pk)
+
+            return Response({"numUnread": num_unread})
+
+        # mark the given notifications as viewed
+        notif_ids = request.data.get("notifications")
+        try:
+            notif_ids = set(int(notif_id) for notif_id in notif_ids)
+        except (TypeError, ValueError):
+            raise ValidationError("notifications must be a list of ids.")
+
+        # any id that is not found belongs to somebody else or does not exist
+        if notifs.filter(id__in=notif_ids).count() != len(notif_ids):
+            raise PermissionDenied("User does not own the Notification.")
+
+        with transaction.atomic():
+            # only unread notifications count towards the counter
+            marked = notifs.filter(id__in=notif_ids, viewed=False)\
+                .update(viewed=True)
+            utils.decrement(
+                Profile,
+                profile.pk,
+                "num_unread_notifications",
+                marked
+            )
+
+        updated = serializers.NotificationSerializer.setup_eager_loading(
+            notifs.filter(id__in=notif_ids)
+        )
+        serializer = serializers.NotificationSerializer(updated, many=True)
+        return Response(serializer.data)
 
-        # mark all notifications as viewed
-        for notif_id in notif_ids:
-            notif = Notification.objects.get(id=notif_id)
 
-            # return 403 if trying to update somebody else's notification
-            if notif.user != user.profile:
-                raise PermissionDenied("User does not own the Notification.")
+class NotificationUnreadRetrieve(views.APIView):
+    """
+    View that supports retrieving the number of
+    unread notifications of an authenticated user.
+    """
 
-            notif.viewed = True
-            notif.save()
-            updated.append(notif)
+    permission_classes = [IsAuthenticated]
 
-        serializer = serializers.NotificationSerializer(updated, many=True)
-        return Response(serializer.data)
+    def get(self, request, format=None):
+        """ Returns the number of unread notifications of the authed user. """
+
+        num_unread = request.user.profile.num_unread_notifications
+        return Response({"numUnread": num_unread})
 
 
 class CommentCreateList(generics.ListCreateAPIView):
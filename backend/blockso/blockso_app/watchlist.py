@@ -0,0 +1,89 @@
+"""
+Module containing the watchlist, the profiles whose on-chain activity
+is watched by the Alchemy Notify webhook.
+
+A profile is watched if its user has logged in, if it has followers,
+or if it is followed by a Feed that has followers. Instead of evaluating
+that union whenever it is needed, it is materialized in Profile.is_watched,
+which is updated on the writes that can change it: logins, follows,
+and edits of Feeds. `reconcile` recomputes it for every profile.
+"""
+# std lib imports
+
+# third party imports
+
+# our imports
+from .models import Feed, Profile
+from . import alchemy
+
+
+def compute_profiles_to_watch():
+    """
+    Returns a queryset of the profiles that should be watched,
+    computed from the rows that make a profile watched.
+    """
+    # fetch the union of:
+    # - users that have logged in
+    logged_in = Profile.objects.all().exclude(user__last_login=None)
+    # - users that have have followers
+    have_followers = Profile.objects.all().exclude(follow_dest=None)
+    # - users that are on a feed that has followers
+    on_feed = Profile.objects.filter(
+        feeds_following_them__in=Feed.objects.all().exclude(followers=None)
+    )
+    profiles = logged_in | have_followers | on_feed
+
+    return profiles
+
+
+def is_watched(address):
+    """ Returns True if the profile of the given address is watched. """
+
+    return Profile.objects.filter(user_id=address, is_watched=True).exists()
+
+
+def _set_watched(profiles, watched):
+    """
+    Flags the given profiles as watched if they are in the given queryset
+    of watched profiles, and as not watched otherwise.
+    Returns the addresses of the profiles whose flag changed.
+    """
+    watched = watched.values("pk")
+    to_watch = profiles.filter(is_watched=False, pk__in=watched)
+    to_unwatch = profiles.filter(is_watched=True).exclude(pk__in=watched)
+
+    changed = list(to_watch.values_list("user_id", flat=True)) + \
+        list(to_unwatch.values_list("user_id", flat=True))
+    to_watch.update(is_watched=True)
+    to_unwatch.update(is_watched=False)
+
+    return changed
+
+
+def update(addresses):
+    """
+    Recomputes whether the profiles of the given addresses are watched,
+    and queues a sync of the ones that changed with the Notify webhook.
+    """
+    addresses = list(addresses)
+    if not addresses:
+        return
+
+    changed = _set_watched(
+        Profile.objects.filter(user_id__in=addresses),
+        compute_profiles_to_watch().filter(user_id__in=addresses)
+    )
+    alchemy.queue_watch_sync(changed)
+
+
+def reconcile():
+    """
+    Recomputes whether every profile is watched, repairing the flags
+    that have drifted, and queues a sync of the repaired profiles
+    with the Notify webhook.
+    Returns the addresses of the repaired profiles.
+    """
+    changed = _set_watched(Profile.objects.all(), compute_profiles_to_watch())
+    alchemy.queue_watch_sync(changed)
+
+    return changed
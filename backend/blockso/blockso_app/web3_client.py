@@ -2,6 +2,7 @@
 Module containing singleton of connection to web3 provider.
 """
 # std lib imports
+import json
 
 # third party imports
 from django.conf import settings
@@ -11,6 +12,17 @@ import web3
 # our imports
 
 
+# maximum number of requests sent in one JSON-RPC batch
+max_batch_size = 100
+
+# seconds to wait for the response to a batch
+timeout = settings.ALCHEMY_RPC_TIMEOUT
+
+
+class RPCError(Exception):
+    """ Raised when a JSON-RPC batch or one of its requests fails. """
+
+
 class Web3Provider():
     """ Singleton for web3 provider. """
 
@@ -22,14 +34,102 @@ class Web3Provider():
 
     def __init__(self):
         # configure requests session used for the underlying connection
-        session = requests.Session()
+        self.session = requests.Session()
 
         # the main entrypoint to the provider
         self.provider = web3.Web3.HTTPProvider(
             settings.ALCHEMY_HTTPS_URL,
-            session=session
+            session=self.session
+        )
+
+
+class BatchRequest():
+    """
+    Collects JSON-RPC requests and sends them to the provider
+    in as few batches as possible.
+    Identical requests are only sent once.
+    """
+
+    def __init__(self, endpoint_uri=None, session=None):
+        self.endpoint_uri = endpoint_uri or settings.ALCHEMY_HTTPS_URL
+        self.session = session or web3_provider.session
+        self.requests = {}
+        self.results = {}
+
+    @staticmethod
+    def _get_key(method, params):
+        """ Returns the key that identifies the given request. """
+
+        return method, json.dumps(params, sort_keys=True)
+
+    def add(self, method, params):
+        """ Queues the given request, unless it is queued already. """
+
+        key = self._get_key(method, params)
+        self.requests.setdefault(key, (method, params))
+
+    def execute(self):
+        """ Sends the queued requests that have not been sent yet. """
+
+        pending = [key for key in self.requests if key not in self.results]
+        for start in range(0, len(pending), max_batch_size):
+            self._send(pending[start:start + max_batch_size])
+
+    def _send(self, keys):
+        """ Sends the requests of the given keys as one batch. """
+
+        payload = []
+        for request_id, key in enumerate(keys):
+            method, params = self.requests[key]
+            payload.append({
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": method,
+                "params": params
+            })
+
+        resp = self.session.post(
+            self.endpoint_uri,
+            json=payload,
+            timeout=timeout
         )
+        resp.raise_for_status()
+
+        # a batch that fails as a whole, e.g. when rate limited,
+        # gets a single error object back
+        body = resp.json()
+        if not isinstance(body, list):
+            raise RPCError(f"Batch failed: {body.get('error', body)}")
+
+        # responses of a batch can come back in any order,
+        # and errors that the node could not attribute have no id
+        unmatched = []
+        for item in body:
+            request_id = item.get("id")
+            if isinstance(request_id, int) and 0 <= request_id < len(keys):
+                self.results[keys[request_id]] = item
+            else:
+                unmatched.append(item)
+
+        missing = [key for key in keys if key not in self.results]
+        if unmatched and missing:
+            raise RPCError(f"Batch failed: {unmatched}")
+
+    def get(self, method, params):
+        """
+        Returns the result of the given request.
+        Raises RPCError if the request failed or was never sent.
+        """
+        item = self.results.get(self._get_key(method, params))
+        if item is None:
+            raise RPCError(f"No response for {method} {params}")
+
+        if "error" in item:
+            raise RPCError(f"{method} {params} failed: {item['error']}")
+
+        return item["result"]
 
 
 # instance of web3 to be used throughout codebase
-w3 = web3.Web3(Web3Provider().provider)
+web3_provider = Web3Provider()
+w3 = web3.Web3(web3_provider.provider)
@@ -0,0 +1,92 @@
+"""
+Module containing the ASGI app that receives Alchemy Notify webhooks.
+
+The app is served by blockso/asgi.py in front of Django. It verifies the
+signature of a delivery over the raw body and pushes the body onto a
+redis list with an asyncio client, without going through Django, so that
+bursts of deliveries are answered quickly and do not hold up the workers
+serving the API. `python manage.py webhook-intake` moves the deliveries
+from the list onto the rq queues.
+"""
+# std lib imports
+
+# third party imports
+from django.conf import settings
+
+# our imports
+from . import alchemy, redis_client
+
+
+path = "/api/alchemy-notify-webhook/"
+
+
+async def read_body(receive):
+    """
+    Returns the body of the request that is received from the given
+    ASGI receive callable, or None if it exceeds
+    settings.DATA_UPLOAD_MAX_MEMORY_SIZE.
+    """
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if len(body) > settings.DATA_UPLOAD_MAX_MEMORY_SIZE:
+            return None
+
+    return body
+
+
+async def send_response(send, status):
+    """
+    Sends an empty response with the given status
+    using the given ASGI send callable.
+    """
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-length", b"0")],
+    })
+    await send({"type": "http.response.body", "body": b""})
+
+
+class AlchemyWebhookApp():
+    """
+    ASGI app that receives the Alchemy Notify webhook,
+    and hands every other request to the given ASGI app.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.redis = None
+
+    def get_redis(self):
+        """ Returns the asyncio redis client, creating it on first use. """
+
+        if self.redis is None:
+            self.redis = redis_client.create_async_client()
+
+        return self.redis
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != path:
+            return await self.app(scope, receive, send)
+
+        if scope["method"] != "POST":
+            return await send_response(send, 405)
+
+        body = await read_body(receive)
+        if body is None:
+            return await send_response(send, 413)
+
+        # return 403 if alchemy's signature of the body is invalid
+        headers = dict(scope["headers"])
+        signature = headers.get(b"x-alchemy-signature", b"")
+        if not alchemy.is_valid_signature(body, signature):
+            return await send_response(send, 403)
+
+        # hand the delivery over to the intake
+        await self.get_redis().lpush(alchemy.intake_key, body)
+
+        return await send_response(send, 200)